@@ -0,0 +1,5 @@
+"""Benchmarks of db2model on synthetic PostgreSQL databases, run from the root of
+the repository as modules, e.g. `uv run python -m benchmarks.suite --help`.
+
+Every benchmark creates its databases through the url given by --admin-url.
+"""
@@ -0,0 +1,169 @@
+"""Synthetic PostgreSQL and SQLite schemas used by the benchmarks."""
+
+import random
+from pathlib import Path
+
+from sqlalchemy import Connection, create_engine, text
+from sqlalchemy.engine import URL
+
+BENCH_SCHEMA = "bench"
+# Tables are created by batches, a single transaction would exhaust the lock table.
+BATCH_SIZE = 200
+COLUMN_TYPES = ["text", "int", "numeric(10, 2)", "timestamptz", "boolean"]
+
+
+def _table_ddl(index: int, referenced_public_tables: int) -> list[str]:
+    fk_prev = f" REFERENCES {BENCH_SCHEMA}.t{index - 1}(id)" if index > 1 else ""
+    fk_public = (
+        f", public_id int REFERENCES public.p{index % referenced_public_tables}(id)"
+        if referenced_public_tables
+        else ""
+    )
+    return [
+        f"CREATE TABLE {BENCH_SCHEMA}.t{index} ("
+        "id serial PRIMARY KEY, "
+        "name text NOT NULL UNIQUE, "
+        "price numeric(10, 2), "
+        "status bench.status, "
+        "created_at timestamptz NOT NULL DEFAULT now(), "
+        f"prev_id int{fk_prev}"
+        f"{fk_public})",
+        f"CREATE INDEX ON {BENCH_SCHEMA}.t{index} (created_at)",
+        f"COMMENT ON TABLE {BENCH_SCHEMA}.t{index} IS 'synthetic table {index}'",
+    ]
+
+
+def _execute_batches(connection: Connection, statements: list[str]) -> None:
+    for start in range(0, len(statements), BATCH_SIZE):
+        with connection.begin():
+            for statement in statements[start : start + BATCH_SIZE]:
+                connection.execute(text(statement))
+
+
+def _recreate_database(admin_url: URL, db_name: str) -> None:
+    admin_engine = create_engine(admin_url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin_engine.connect() as connection:
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{db_name}"'))
+            connection.execute(text(f'CREATE DATABASE "{db_name}"'))
+    finally:
+        admin_engine.dispose()
+
+
+def suite_schema_names(schemas: int) -> list[str]:
+    return [BENCH_SCHEMA] + [f"{BENCH_SCHEMA}_{index}" for index in range(1, schemas)]
+
+
+def _suite_table_ddl(
+    index: int,
+    columns: int,
+    fk_density: float,
+    enums: int,
+    schema_names: list[str],
+    rng: random.Random,
+    sqlite: bool,
+) -> str:
+    def qualified(table_index: int) -> str:
+        table_name = f"t{table_index}"
+        if sqlite:
+            return table_name
+        return f"{schema_names[table_index % len(schema_names)]}.{table_name}"
+
+    column_ddls = ["id integer PRIMARY KEY" if sqlite else "id serial PRIMARY KEY"]
+    for column_index in range(columns):
+        column_type = COLUMN_TYPES[column_index % len(COLUMN_TYPES)]
+        if enums and column_index % len(COLUMN_TYPES) == 0:
+            column_type = f"{BENCH_SCHEMA}.e{column_index % enums}"
+        not_null = " NOT NULL" if column_index % 2 else ""
+        column_ddls.append(f"c{column_index} {column_type}{not_null}")
+
+    # fk_density foreign keys per table on average, towards earlier tables so
+    # that every schema refers to the other ones
+    fk_count = int(fk_density) + (rng.random() < fk_density - int(fk_density))
+    for fk_index in range(fk_count if index else 0):
+        column_ddls.append(
+            f"ref{fk_index}_id int REFERENCES {qualified(rng.randrange(index))}(id)"
+        )
+    return f"CREATE TABLE {qualified(index)} ({', '.join(column_ddls)})"
+
+
+def create_suite_database(
+    admin_url: URL,
+    db_name: str,
+    tables: int,
+    columns: int,
+    fk_density: float,
+    enums: int,
+    schemas: int,
+    seed: int,
+) -> None:
+    """(Re)creates `db_name` with `tables` tables spread over `schemas` schemas,
+    each with `columns` columns besides its id and `fk_density` foreign keys on
+    average. The same arguments always give the same database."""
+
+    _recreate_database(admin_url, db_name)
+    schema_names = suite_schema_names(schemas)
+    rng = random.Random(seed)
+    statements = [f"CREATE SCHEMA {schema_name}" for schema_name in schema_names]
+    for index in range(enums):
+        statements.append(
+            f"CREATE TYPE {BENCH_SCHEMA}.e{index} AS ENUM ('draft', 'active', 'archived')"
+        )
+    for index in range(tables):
+        statements.append(
+            _suite_table_ddl(
+                index, columns, fk_density, enums, schema_names, rng, False
+            )
+        )
+
+    engine = create_engine(admin_url.set(database=db_name))
+    try:
+        with engine.connect() as connection:
+            _execute_batches(connection, statements)
+    finally:
+        engine.dispose()
+
+
+def create_suite_sqlite_database(
+    filepath: Path, tables: int, columns: int, fk_density: float, seed: int
+) -> None:
+    """SQLite counterpart of create_suite_database, without schemas nor enums."""
+
+    filepath.unlink(missing_ok=True)
+    rng = random.Random(seed)
+    statements = [
+        _suite_table_ddl(index, columns, fk_density, 0, [], rng, True)
+        for index in range(tables)
+    ]
+    engine = create_engine(f"sqlite:///{filepath}")
+    try:
+        with engine.connect() as connection:
+            _execute_batches(connection, statements)
+    finally:
+        engine.dispose()
+
+
+def create_synthetic_database(
+    admin_url: URL, db_name: str, tables: int, referenced_public_tables: int
+) -> None:
+    """(Re)creates `db_name` with `tables` tables in the bench schema, each one
+    referring to the previous one and to one of the `referenced_public_tables`
+    tables living in public."""
+
+    _recreate_database(admin_url, db_name)
+
+    statements: list[str] = [
+        f"CREATE SCHEMA {BENCH_SCHEMA}",
+        f"CREATE TYPE {BENCH_SCHEMA}.status AS ENUM ('draft', 'active', 'archived')",
+    ]
+    for index in range(referenced_public_tables):
+        statements.append(f"CREATE TABLE public.p{index} (id serial PRIMARY KEY)")
+    for index in range(1, tables + 1):
+        statements.extend(_table_ddl(index, referenced_public_tables))
+
+    engine = create_engine(admin_url.set(database=db_name))
+    try:
+        with engine.connect() as connection:
+            _execute_batches(connection, statements)
+    finally:
+        engine.dispose()
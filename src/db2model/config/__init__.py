@@ -1,7 +1,9 @@
+from .filters import TableFilter
 from .settings import Db2ModelSettings, DbSettings, PathSettings
 
 __all__ = [
     "Db2ModelSettings",
     "DbSettings",
     "PathSettings",
+    "TableFilter",
 ]
@@ -0,0 +1,77 @@
+import fnmatch
+import re
+from functools import lru_cache
+
+# Prefix of the patterns that are regular expressions rather than globs
+REGEX_PATTERN_PREFIX = "re:"
+
+
+@lru_cache(maxsize=None)
+def _compile_patterns(patterns: tuple[str, ...]) -> re.Pattern[str] | None:
+    """Regular expression matching a whole name if one of the patterns does, None
+    without patterns. Compiled once per set of patterns in a run.
+
+    Patterns are globs, exact names matching themselves, or regular expressions
+    if prefixed by "re:".
+    """
+
+    if not patterns:
+        return None
+    regexes = [
+        (
+            pattern[len(REGEX_PATTERN_PREFIX) :]
+            if pattern.startswith(REGEX_PATTERN_PREFIX)
+            else fnmatch.translate(pattern)
+        )
+        for pattern in patterns
+    ]
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+
+class TableFilter:
+    """Ignore and include rules of the schemas and tables of a database, each set
+    of patterns compiled into a single regular expression.
+
+    A table is generated if its schema is not ignored, it matches an include
+    pattern when there are some, and it matches no ignore pattern.
+    """
+
+    def __init__(
+        self,
+        ignored_schema_patterns: list[str],
+        ignored_table_patterns: list[str],
+        schema_to_ignored_table_patterns_map: dict[str, list[str]],
+        included_table_patterns: list[str],
+    ) -> None:
+        self.ignored_schema_regex = _compile_patterns(tuple(ignored_schema_patterns))
+        self.ignored_table_regex = _compile_patterns(tuple(ignored_table_patterns))
+        self.schema_to_ignored_table_regex_map = {
+            schema_name: _compile_patterns(tuple(patterns))
+            for schema_name, patterns in schema_to_ignored_table_patterns_map.items()
+        }
+        self.included_table_regex = _compile_patterns(tuple(included_table_patterns))
+
+    def is_schema_included(self, schema_name: str) -> bool:
+        return (
+            self.ignored_schema_regex is None
+            or self.ignored_schema_regex.fullmatch(schema_name) is None
+        )
+
+    def is_table_included(self, schema_name: str | None, table_name: str) -> bool:
+        if (
+            self.included_table_regex is not None
+            and self.included_table_regex.fullmatch(table_name) is None
+        ):
+            return False
+        if (
+            self.ignored_table_regex is not None
+            and self.ignored_table_regex.fullmatch(table_name) is not None
+        ):
+            return False
+        schema_ignored_table_regex = self.schema_to_ignored_table_regex_map.get(
+            schema_name or ""
+        )
+        return (
+            schema_ignored_table_regex is None
+            or schema_ignored_table_regex.fullmatch(table_name) is None
+        )
@@ -1,10 +1,19 @@
 import shutil
 from pathlib import Path
 
+from pydantic import NonNegativeFloat, NonNegativeInt, PositiveInt
 from pydantic.fields import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from db2model.types import Language, SqlDialect
+from db2model.config.filters import TableFilter
+from db2model.types import (
+    Emitter,
+    Language,
+    LazyStrategy,
+    ModelStyle,
+    ModuleLayout,
+    SqlDialect,
+)
 
 
 class DbSettings(BaseSettings):
@@ -17,6 +26,23 @@ class DbSettings(BaseSettings):
 
     sql_dialect: SqlDialect
 
+    # Reflection connections open at once across every database, one per
+    # reflection job if None
+    max_connections: PositiveInt | None = None
+    # Set on every reflection connection, 0 keeping the server defaults
+    statement_timeout_ms: NonNegativeInt = 0
+    lock_timeout_ms: NonNegativeInt = 0
+    application_name: str = "db2model"
+    # Reflection transactions are read only
+    read_only: bool = True
+    # Each unit of reflection, as a whole database, runs in one repeatable read
+    # transaction, all of its queries seeing the same catalog
+    repeatable_read: bool = False
+    # Attempts after a transient failure, the delay before each one doubling from
+    # retry_backoff_seconds
+    retry_count: NonNegativeInt = 3
+    retry_backoff_seconds: NonNegativeFloat = 0.5
+
     def db_url(self, db_name: str, schema_name: str | None = None) -> str:
         match self.sql_dialect:
             case SqlDialect.POSTGRESQL:
@@ -32,6 +58,33 @@ class DbSettings(BaseSettings):
             case _:
                 raise ValueError(f"No support yet for the {sql_dialect=}")
 
+    def reflection_db_url(self, db_name: str) -> str:
+        match self.sql_dialect:
+            case SqlDialect.POSTGRESQL:
+                # pg_catalog as default schema keeps every reflected foreign key
+                # schema qualified, while types living in public stay resolvable.
+                return self.db_url(db_name, "pg_catalog")
+            case _:
+                raise ValueError(f"No support yet for the {self.sql_dialect=}")
+
+    def session_settings(self) -> dict[str, str]:
+        """name -> value of the run-time parameters of the reflection connections"""
+
+        match self.sql_dialect:
+            case SqlDialect.POSTGRESQL:
+                session_settings = {"application_name": self.application_name}
+                if self.statement_timeout_ms:
+                    session_settings["statement_timeout"] = str(
+                        self.statement_timeout_ms
+                    )
+                if self.lock_timeout_ms:
+                    session_settings["lock_timeout"] = str(self.lock_timeout_ms)
+                if self.read_only:
+                    session_settings["default_transaction_read_only"] = "on"
+                return session_settings
+            case _:
+                raise ValueError(f"No support yet for the {self.sql_dialect=}")
+
 
 class PathSettings(BaseSettings):
     model_config = SettingsConfigDict(frozen=True)
@@ -39,68 +92,96 @@ class PathSettings(BaseSettings):
     output_folder_root_path: Path
 
     @property
-    def raw_path(self) -> Path:
-        path = self.output_folder_root_path / "raw"
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+    def manifest_filepath(self) -> Path:
+        return self.output_folder_root_path / "manifest.json"
+
+    @property
+    def format_cache_path(self) -> Path:
+        return self.output_folder_root_path / ".cache" / "format"
 
     @property
     def python_path(self) -> Path:
-        path = self.output_folder_root_path / "python"
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+        # Directories of the generated files are created by their writer
+        return self.output_folder_root_path / "python"
 
-    def raw_filepath(
+    def table_filepath(
         self,
         language: Language,
         sql_dialect: SqlDialect,
         db_name: str,
+        table_name: str,
         schema_name: str | None = None,
-    ) -> Path:
+    ):
         match sql_dialect:
             case SqlDialect.POSTGRESQL:
                 if not schema_name:
                     raise RuntimeError(
                         "Schema name must be provided when using postgresql."
                     )
-                folder_path = self.raw_path / db_name
-                folder_path.mkdir(parents=True, exist_ok=True)
-                base_filename = schema_name
+                base_folder_path = self.python_path / db_name / schema_name
             case _:
                 raise ValueError(f"No support yet for the {sql_dialect=}")
 
         match language:
             case Language.PYTHON:
-                return folder_path / f"{base_filename}.py"
+                return base_folder_path / f"{table_name}.py"
             case _:
                 raise ValueError(f"No support yet for the {language=}")
 
-    def table_filepath(
+    def schema_filepath(
         self,
         language: Language,
         sql_dialect: SqlDialect,
         db_name: str,
-        table_name: str,
         schema_name: str | None = None,
-    ):
+        module_name: str | None = None,
+    ) -> Path:
+        """Module holding every table of a schema, or `module_name` of the package
+        of the schema if given"""
+
         match sql_dialect:
             case SqlDialect.POSTGRESQL:
                 if not schema_name:
                     raise RuntimeError(
                         "Schema name must be provided when using postgresql."
                     )
-                base_folder_path = self.python_path / db_name / schema_name
+                if module_name:
+                    folder_path = self.python_path / db_name / schema_name
+                    base_filename = module_name
+                else:
+                    folder_path = self.python_path / db_name
+                    base_filename = schema_name
             case _:
                 raise ValueError(f"No support yet for the {sql_dialect=}")
 
         match language:
             case Language.PYTHON:
-                folder_path = self.python_path / base_folder_path
-                folder_path.mkdir(parents=True, exist_ok=True)
-                return folder_path / f"{table_name}.py"
+                return folder_path / f"{base_filename}.py"
             case _:
                 raise ValueError(f"No support yet for the {language=}")
 
+    def bulk_table_filepath(
+        self,
+        sql_dialect: SqlDialect,
+        db_name: str,
+        table_name: str,
+        schema_name: str | None = None,
+    ) -> Path:
+        """Bulk module of a python table, under python/bulk along with the base
+        module they share"""
+
+        match sql_dialect:
+            case SqlDialect.POSTGRESQL:
+                if not schema_name:
+                    raise RuntimeError(
+                        "Schema name must be provided when using postgresql."
+                    )
+                folder_path = self.python_path / "bulk" / db_name / schema_name
+            case _:
+                raise ValueError(f"No support yet for the {sql_dialect=}")
+
+        return folder_path / f"{table_name}.py"
+
 
 class Db2ModelSettings(BaseSettings):
     model_config = SettingsConfigDict(frozen=True)
@@ -112,10 +193,79 @@ class Db2ModelSettings(BaseSettings):
 
     init_false_column_names: list[str] = list()
 
+    # Maximum number of schemas reflected concurrently, across databases
+    jobs: PositiveInt = 1
+    # Number of processes formatting the generated files, 1 formats serially
+    format_jobs: PositiveInt = 1
+    # Skip databases whose catalog fingerprint matches the last generation
+    skip_unchanged: bool = False
+    # Size bound in bytes of the formatted code cache, 0 disables it
+    format_cache_max_size: NonNegativeInt = 256 * 1024 * 1024
+    # NATIVE renders the code directly, falling back to the formatters on
+    # constructs it does not support, and when they are not the versions it
+    # mirrors. Both give the same files.
+    emitter: Emitter = Emitter.FORMATTERS
+    # CORE generates a module of SQLAlchemy Core Table objects per schema, on a
+    # MetaData shared by all of them, instead of the ORM classes
+    model_style: ModelStyle = ModelStyle.ORM
+    # SCHEMA generates the ORM classes of a schema in one module instead of a
+    # module per table, as Core tables always are
+    module_layout: ModuleLayout = ModuleLayout.TABLE
+    # Schema modules are split into a package of modules of this many tables, 0
+    # keeps each schema in one module
+    tables_per_module: NonNegativeInt = 0
+    # Generated __init__.py files import their models on first access instead of
+    # all of them up front
+    lazy_init_files: bool = False
+    # Tables reflected, parsed and written together, bounding memory on very large
+    # databases at the cost of reflecting the keys of their neighbors with every
+    # chunk. 0 generates each database at once. Both give the same files. Memory
+    # is not bounded with schema modules, written once every chunk is parsed
+    stream_chunk_size: NonNegativeInt = 0
+    # Sets lazy= on relationships from the estimated row counts of their tables,
+    # so that they are not loaded with one query per row by default
+    lazy_from_statistics: bool = False
+    # lazy= of relationships by "db_name.schema_name.table_name.attribute_name",
+    # over the one from statistics
+    relationship_to_lazy_map: dict[str, LazyStrategy] = dict()
+    # Every model comes with a frozen slotted dataclass of its columns, built from
+    # Core rows, for read paths that do not need the ORM
+    record_classes: bool = False
+    # Models get get_by_... and list_by_... class methods for their primary key,
+    # unique constraints and the leading columns of their indexes
+    lookup_helpers: bool = False
+    # Every table gets a module under python/bulk, with its row type and its
+    # multi-row insert, upserts on each of its keys and COPY
+    bulk_modules: bool = False
+
+    # Tables and schemas are ignored or included by globs, exact names matching
+    # themselves, or regular expressions prefixed by "re:", matching whole names.
+    # Ignored tables referred to by generated tables are generated along with them.
     globally_ignored_tables: list[str] = list()
     db_to_ignored_tables_map: dict[str, list[str]] = dict()
+    # When given, only the tables matching one of them are generated
+    globally_included_tables: list[str] = list()
+    db_to_included_tables_map: dict[str, list[str]] = dict()
 
     # postgres specific
     db_to_schemas: dict[str, list[str]] = dict()
     db_to_schemas_to_ignored_tables_map: dict[str, dict[str, list[str]]] = dict()
     globally_ignored_schemas: list[str] = list()
+
+    def table_filter(self, db_name: str) -> TableFilter:
+        """Ignore and include rules of the database"""
+
+        return TableFilter(
+            ignored_schema_patterns=self.globally_ignored_schemas,
+            ignored_table_patterns=[
+                *self.globally_ignored_tables,
+                *self.db_to_ignored_tables_map.get(db_name, list()),
+            ],
+            schema_to_ignored_table_patterns_map=self.db_to_schemas_to_ignored_tables_map.get(
+                db_name, dict()
+            ),
+            included_table_patterns=[
+                *self.globally_included_tables,
+                *self.db_to_included_tables_map.get(db_name, list()),
+            ],
+        )
@@ -1,5 +1,15 @@
 from .generator import generate_python_models
+from .snapshot import (
+    export_python_snapshot,
+    generate_python_models_from_snapshot,
+    load_snapshot,
+)
+from .watch import watch_python_models
 
 __all__ = [
+    "export_python_snapshot",
     "generate_python_models",
+    "generate_python_models_from_snapshot",
+    "load_snapshot",
+    "watch_python_models",
 ]
@@ -0,0 +1,348 @@
+import ast
+import keyword
+from functools import partial
+from logging import Logger
+
+from sqlalchemy import Connection, text
+
+from db2model.config import Db2ModelSettings
+from db2model.models import ColumnDef, TableDef
+from db2model.profiling import Profiler
+from db2model.types import ModelStyle, SqlDialect
+
+from .connections import ConnectionPool
+from .parser import STRING_LITERAL_PATTERN, _get_call_name, _get_keyword
+from .table import LOADED_NAME_PATTERN, _get_used_imports_code
+from .utils import _python_core_table_name, _python_table_name
+
+# Positional arguments of mapped_column making the database or SQLAlchemy fill
+# the column
+DEFAULT_CALL_NAMES = {"Identity", "Computed", "Sequence"}
+# sqlacodegen leaves out the default of a serial column, the next value of its
+# own sequence, so those are read from the catalog
+POSTGRESQL_SERIAL_COLUMN_QUERY = """
+SELECT n.nspname, c.relname, a.attname
+FROM pg_catalog.pg_attrdef d
+JOIN pg_catalog.pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+JOIN pg_catalog.pg_class c ON c.oid = d.adrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE pg_catalog.pg_get_expr(d.adbin, d.adrelid) LIKE 'nextval(%'
+    AND NOT a.attisdropped
+    AND n.nspname NOT LIKE 'pg\\_%' AND n.nspname <> 'information_schema'
+ORDER BY n.nspname, c.relname, a.attnum
+"""
+
+
+def _get_serial_columns(
+    connection: Connection, sql_dialect: SqlDialect
+) -> dict[str, dict[str, list[str]]]:
+    """schema_name -> table_name -> names of the columns defaulting to the next
+    value of a sequence"""
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            schema_to_table_to_serial_column_names_map: dict[
+                str, dict[str, list[str]]
+            ] = dict()
+            for schema_name, table_name, column_name in connection.execute(
+                text(POSTGRESQL_SERIAL_COLUMN_QUERY)
+            ):
+                schema_to_table_to_serial_column_names_map.setdefault(
+                    schema_name, dict()
+                ).setdefault(table_name, list()).append(column_name)
+            return schema_to_table_to_serial_column_names_map
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+def _get_db_serial_columns(
+    settings: Db2ModelSettings,
+    db_names: list[str],
+    pool: ConnectionPool,
+    profiler: Profiler,
+    logger: Logger,
+) -> dict[str, dict[str, dict[str, list[str]]]]:
+    """db_name -> schema_name -> table_name -> names of the serial columns"""
+
+    db_to_serial_columns_map: dict[str, dict[str, dict[str, list[str]]]] = dict()
+    for db_name in db_names:
+        logger.info(f"Reading serial columns of {db_name=}.")
+        with profiler.phase("serial_columns", db_name) as record:
+            db_to_serial_columns_map[db_name] = pool.run(
+                db_name,
+                partial(
+                    _get_serial_columns, sql_dialect=settings.db_settings.sql_dialect
+                ),
+            )
+            record.item_count = sum(
+                len(column_names)
+                for table_to_serial_column_names_map in db_to_serial_columns_map[
+                    db_name
+                ].values()
+                for column_names in table_to_serial_column_names_map.values()
+            )
+    return db_to_serial_columns_map
+
+
+def _code_bulk_base_file() -> str:
+    """Writes shared by the bulk modules of every table"""
+
+    return "\n".join(
+        [
+            "from collections.abc import Iterable, Iterator, Mapping",
+            "from itertools import chain",
+            "from typing import Any",
+            "",
+            "from sqlalchemy import Connection, Table",
+            "from sqlalchemy.dialects.postgresql import insert",
+            "",
+            "",
+            "def _get_batches(",
+            "    rows: Iterable[Mapping[str, Any]], batch_size: int",
+            ") -> Iterator[list[Mapping[str, Any]]]:",
+            "    # Consecutive rows with the same keys, so that every row of a statement",
+            "    # binds the same columns and the ones left out keep their default",
+            "    batch: list[Mapping[str, Any]] = []",
+            "    for row in rows:",
+            "        if batch and (len(batch) == batch_size or row.keys() != batch[0].keys()):",
+            "            yield batch",
+            "            batch = []",
+            "        batch.append(row)",
+            "    if batch:",
+            "        yield batch",
+            "",
+            "",
+            "def insert_rows(",
+            "    connection: Connection,",
+            "    table: Table,",
+            "    rows: Iterable[Mapping[str, Any]],",
+            "    batch_size: int,",
+            ") -> int:",
+            "    count = 0",
+            "    for batch in _get_batches(rows, batch_size):",
+            "        connection.execute(insert(table), batch)",
+            "        count += len(batch)",
+            "    return count",
+            "",
+            "",
+            "def upsert_rows(",
+            "    connection: Connection,",
+            "    table: Table,",
+            "    rows: Iterable[Mapping[str, Any]],",
+            "    conflict_column_names: list[str],",
+            "    batch_size: int,",
+            ") -> int:",
+            "    count = 0",
+            "    for batch in _get_batches(rows, batch_size):",
+            "        statement = insert(table)",
+            "        updated_column_names = [",
+            "            name for name in batch[0] if name not in conflict_column_names",
+            "        ]",
+            "        if updated_column_names:",
+            "            statement = statement.on_conflict_do_update(",
+            "                index_elements=conflict_column_names,",
+            "                set_={name: statement.excluded[name] for name in updated_column_names},",
+            "            )",
+            "        else:",
+            "            statement = statement.on_conflict_do_nothing(",
+            "                index_elements=conflict_column_names",
+            "            )",
+            "        connection.execute(statement, batch)",
+            "        count += len(batch)",
+            "    return count",
+            "",
+            "",
+            "def copy_rows(",
+            "    connection: Connection, table: Table, rows: Iterable[Mapping[str, Any]]",
+            ") -> int:",
+            "    iterator = iter(rows)",
+            "    first_row = next(iterator, None)",
+            "    if first_row is None:",
+            "        return 0",
+            "    # psycopg only needed by COPY, the other writes going through SQLAlchemy",
+            "    from psycopg import sql",
+            "",
+            "    column_names = list(first_row)",
+            "    statement = sql.SQL('COPY {} ({}) FROM STDIN').format(",
+            "        sql.Identifier(*([table.schema] if table.schema else []), table.name),",
+            "        sql.SQL(', ').join(sql.Identifier(name) for name in column_names),",
+            "    )",
+            "    count = 0",
+            "    with connection.connection.driver_connection.cursor() as cursor:",
+            "        with cursor.copy(statement) as copy:",
+            "            for row in chain([first_row], iterator):",
+            "                if row.keys() != first_row.keys():",
+            "                    raise ValueError(",
+            "                        f'Rows copied must all have the same keys, {sorted(row)} differ from {sorted(first_row)}.'",
+            "                    )",
+            "                copy.write_row([row[name] for name in column_names])",
+            "                count += 1",
+            "    return count",
+            "",
+        ]
+    )
+
+
+def _has_default(column: ColumnDef, serial_column_names: list[str]) -> bool:
+    """Whether the database fills the column when not given, `serial_column_names`
+    being the columns of its table read by `_get_serial_columns`."""
+
+    if column.nullable or column.column_name in serial_column_names:
+        return True
+    call = ast.parse(column.call, mode="eval").body
+    if not isinstance(call, ast.Call):
+        return False
+    if _get_keyword(call, "server_default") is not None:
+        return True
+    return any(_get_call_name(argument) in DEFAULT_CALL_NAMES for argument in call.args)
+
+
+def _get_row_classes_code(
+    row_class_name: str,
+    required_items: list[tuple[str, str]],
+    optional_items: list[tuple[str, str]],
+) -> str:
+    """TypedDict of the rows, the keys of `required_items` being required"""
+
+    if not all(
+        name.isidentifier() and not keyword.iskeyword(name)
+        for name, _ in required_items + optional_items
+    ):
+        # Only the functional syntax takes any column name, but it cannot mix
+        # required and optional keys on python 3.10
+        return (
+            f"{row_class_name} = TypedDict({row_class_name!r}, {{"
+            + ", ".join(
+                f"{name!r}: {annotation}"
+                for name, annotation in required_items + optional_items
+            )
+            + "}, total=False)"
+        )
+
+    required_row_class_name = row_class_name.removesuffix("Row") + "RequiredRow"
+    lines = [f"class {required_row_class_name}(TypedDict):"]
+    lines.extend(f"    {name}: {annotation}" for name, annotation in required_items)
+    if not required_items:
+        lines.append("    pass")
+    lines.extend(
+        ["", "", f"class {row_class_name}({required_row_class_name}, total=False):"]
+    )
+    lines.extend(f"    {name}: {annotation}" for name, annotation in optional_items)
+    if not optional_items:
+        lines.append("    pass")
+    return "\n".join(lines)
+
+
+def _get_bulk_table_code(
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]],
+    table_def: TableDef,
+    serial_column_names: list[str],
+    sql_dialect: SqlDialect,
+    model_style: ModelStyle = ModelStyle.ORM,
+) -> str:
+    """Code of the bulk module of the table: its row type, keyed by column name,
+    and its multi-row insert, upserts on each of its keys and COPY."""
+
+    match model_style:
+        case ModelStyle.ORM:
+            imported_name = _python_table_name(table_def.table_name)
+            table_code = f"{imported_name}.__table__"
+        case ModelStyle.CORE:
+            imported_name = _python_core_table_name(table_def.table_name)
+            table_code = imported_name
+        case _:
+            raise ValueError(f"No support yet for the {model_style=}")
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            python_table_name = _python_table_name(table_def.table_name)
+            required_items: list[tuple[str, str]] = list()
+            optional_items: list[tuple[str, str]] = list()
+            for column in table_def.columns:
+                item = (column.column_name, column.annotation[len("Mapped[") : -1])
+                if _has_default(column, serial_column_names):
+                    optional_items.append(item)
+                else:
+                    required_items.append(item)
+
+            row_class_name = f"{python_table_name}Row"
+            lines = [
+                _get_row_classes_code(row_class_name, required_items, optional_items)
+            ]
+            lines.extend(
+                [
+                    "",
+                    "",
+                    "def insert_rows(",
+                    f"    connection: Connection, rows: Iterable[{row_class_name}], batch_size: int = 1000",
+                    ") -> int:",
+                    f"    return base.insert_rows(connection, {table_code}, rows, batch_size)",
+                ]
+            )
+
+            key_column_names: list[list[str]] = list()
+            for column_names in [
+                table_def.primary_key_column_names,
+                *(index.column_names for index in table_def.indexes if index.unique),
+            ]:
+                if column_names and column_names not in key_column_names:
+                    key_column_names.append(column_names)
+            attribute_name_map = {
+                column.column_name: column.attribute_name
+                for column in table_def.columns
+            }
+            for column_names in key_column_names:
+                if not all(name in attribute_name_map for name in column_names):
+                    continue
+                function_name = "upsert_rows_on_" + "_and_".join(
+                    attribute_name_map[name] for name in column_names
+                )
+                lines.extend(
+                    [
+                        "",
+                        "",
+                        f"def {function_name}(",
+                        f"    connection: Connection, rows: Iterable[{row_class_name}], batch_size: int = 1000",
+                        ") -> int:",
+                        f"    return base.upsert_rows(connection, {table_code}, rows, {column_names!r}, batch_size)",
+                    ]
+                )
+
+            lines.extend(
+                [
+                    "",
+                    "",
+                    f"def copy_rows(connection: Connection, rows: Iterable[{row_class_name}]) -> int:",
+                    f"    return base.copy_rows(connection, {table_code}, rows)",
+                ]
+            )
+
+            used_names = set(
+                LOADED_NAME_PATTERN.findall(
+                    STRING_LITERAL_PATTERN.sub(
+                        "''",
+                        "\n".join(
+                            annotation
+                            for _, annotation in required_items + optional_items
+                        ),
+                    )
+                )
+            )
+            return (
+                "\n".join(
+                    [
+                        "from collections.abc import Iterable",
+                        "from typing import TypedDict",
+                        "from sqlalchemy import Connection",
+                        _get_used_imports_code(name_to_imports_map, used_names),
+                        f"from ....{table_def.db_name}.{table_def.schema_name} import {imported_name}",
+                        "from ... import base",
+                        "",
+                        "",
+                    ]
+                )
+                + "\n".join(lines)
+                + "\n"
+            )
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
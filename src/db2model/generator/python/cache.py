@@ -0,0 +1,66 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+class FormatCache:
+    """On disk cache of formatted code, addressed by the hash of the input code
+    and of everything that can change the formatting of it.
+
+    One file per entry, so concurrent writers never corrupt each other. Hits
+    refresh the entry mtime, eviction removes the least recently used entries.
+    Folders are created with their first entry.
+    """
+
+    def __init__(self, folder_path: Path, max_size: int, formatter_key: str) -> None:
+        self.folder_path = folder_path
+        self.max_size = max_size
+        self.formatter_key = formatter_key
+
+    def _entry_path(self, code: str) -> Path:
+        digest = hashlib.sha256(
+            (self.formatter_key + "\0" + code).encode("utf-8")
+        ).hexdigest()
+        return self.folder_path / digest[:2] / digest
+
+    def get(self, code: str) -> str | None:
+        entry_path = self._entry_path(code)
+        try:
+            formatted_code = entry_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # Evicted by another process since read
+            pass
+        return formatted_code
+
+    def set(self, code: str, formatted_code: str) -> None:
+        entry_path = self._entry_path(code)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(formatted_code)
+        os.replace(tmp_path, entry_path)
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in max_size."""
+
+        entries: list[tuple[float, int, Path]] = list()
+        total_size = 0
+        for entry_path in self.folder_path.glob("*/*"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                # Evicted or renamed over by another process sharing the cache
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total_size += stat.st_size
+
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= size
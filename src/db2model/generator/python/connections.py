@@ -0,0 +1,243 @@
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from logging import Logger
+from types import TracebackType
+from typing import TypeVar
+
+from sqlalchemy import Connection, Engine, create_engine, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.pool import NullPool
+
+from db2model.config import Db2ModelSettings, DbSettings
+from db2model.profiling import Profiler
+from db2model.types import SqlDialect
+
+T = TypeVar("T")
+
+# Connection exceptions, exhausted resources, serialization failures, deadlocks,
+# lock and statement timeouts and server shutdowns
+_POSTGRESQL_TRANSIENT_SQLSTATE_PREFIXES = (
+    "08",
+    "53",
+    "40001",
+    "40P01",
+    "55P03",
+    "57014",
+    "57P01",
+    "57P02",
+    "57P03",
+)
+
+
+def _is_transient(error: DBAPIError, sql_dialect: SqlDialect) -> bool:
+    """Whether the same work can succeed on another attempt"""
+
+    if error.connection_invalidated:
+        return True
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            sqlstate = getattr(error.orig, "sqlstate", None)
+            if sqlstate is None:
+                # Raised while connecting, before the server could answer
+                return isinstance(error, OperationalError)
+            return sqlstate.startswith(_POSTGRESQL_TRANSIENT_SQLSTATE_PREFIXES)
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+class ConnectionPool:
+    """Reflection connections of a run, shared by all of its phases and databases.
+
+    At most `max_connections` are open at once across every database, callers
+    waiting for one to be returned. Returned connections are kept for the next
+    checkout on their database, the oldest idle one being closed to make room for
+    another database. Connections are opened with the session settings of
+    `db_settings`, repeatable read if `db_settings.repeatable_read`, and every
+    checkout runs in a transaction of its own.
+    """
+
+    def __init__(
+        self,
+        db_settings: DbSettings,
+        max_connections: int,
+        profiler: Profiler,
+        logger: Logger,
+    ) -> None:
+        self.db_settings = db_settings
+        self.max_connections = max_connections
+        self.profiler = profiler
+        self.logger = logger
+        self.db_to_engine_map: dict[str, Engine] = dict()
+        # Oldest first
+        self.idle_connections: list[tuple[str, Connection]] = list()
+        self.open_count = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def engine(self, db_name: str) -> Engine:
+        """Engine of the database, opening a connection on each connect. The ones
+        opened from it directly are neither counted by the pool nor given the
+        session settings."""
+
+        with self.condition:
+            engine = self.db_to_engine_map.get(db_name)
+            if engine is None:
+                engine = create_engine(
+                    self.db_settings.reflection_db_url(db_name),
+                    poolclass=NullPool,
+                    isolation_level=(
+                        "REPEATABLE READ" if self.db_settings.repeatable_read else None
+                    ),
+                )
+                self.db_to_engine_map[db_name] = engine
+            return engine
+
+    def _should_retry(self, error: DBAPIError, attempt: int) -> bool:
+        return attempt < self.db_settings.retry_count and _is_transient(
+            error, self.db_settings.sql_dialect
+        )
+
+    def _wait_before_retry(self, db_name: str, attempt: int, error: DBAPIError) -> None:
+        # Doubling delays, jittered so that concurrent workers do not retry in step
+        delay = self.db_settings.retry_backoff_seconds * 2**attempt
+        delay = random.uniform(delay / 2, delay)
+        self.logger.warning(
+            f"Transient failure on {db_name=}, retrying in {delay:.1f}s. {str(error)}"
+        )
+        time.sleep(delay)
+
+    def _open(self, db_name: str) -> Connection:
+        """Opens a connection with the session settings, retried on transient
+        failures"""
+
+        attempt = 0
+        while True:
+            try:
+                with self.profiler.phase("connect", db_name):
+                    connection = self.engine(db_name).connect()
+                    try:
+                        for name, value in self.db_settings.session_settings().items():
+                            connection.execute(
+                                text("SELECT set_config(:name, :value, false)"),
+                                {"name": name, "value": value},
+                            )
+                        connection.commit()
+                    except BaseException:
+                        connection.close()
+                        raise
+                return connection
+            except DBAPIError as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                self._wait_before_retry(db_name, attempt, e)
+                attempt += 1
+
+    def _checkout(self, db_name: str) -> Connection:
+        with self.condition:
+            while True:
+                for index, (idle_db_name, connection) in enumerate(
+                    self.idle_connections
+                ):
+                    if idle_db_name == db_name:
+                        del self.idle_connections[index]
+                        return connection
+                if self.open_count < self.max_connections:
+                    break
+                if self.idle_connections:
+                    _, connection = self.idle_connections.pop(0)
+                    connection.close()
+                    self.open_count -= 1
+                    break
+                self.condition.wait()
+            self.open_count += 1
+
+        try:
+            return self._open(db_name)
+        except BaseException:
+            with self.condition:
+                self.open_count -= 1
+                self.condition.notify()
+            raise
+
+    def _checkin(self, db_name: str, connection: Connection, discard: bool) -> None:
+        with self.condition:
+            if discard:
+                connection.close()
+                self.open_count -= 1
+            else:
+                self.idle_connections.append((db_name, connection))
+            self.condition.notify()
+
+    @contextmanager
+    def connect(self, db_name: str) -> Iterator[Connection]:
+        """Checks out a connection of the database, its transaction being rolled
+        back once returned. Connections failing are closed rather than kept."""
+
+        connection = self._checkout(db_name)
+        discard = False
+        try:
+            yield connection
+        except DBAPIError:
+            discard = True
+            raise
+        finally:
+            if not discard and not connection.invalidated:
+                try:
+                    connection.rollback()
+                except DBAPIError:
+                    discard = True
+            self._checkin(db_name, connection, discard or connection.invalidated)
+
+    def run(self, db_name: str, work: Callable[[Connection], T]) -> T:
+        """Runs `work` on a connection of the database, again on a new one after
+        a transient failure, up to `db_settings.retry_count` times."""
+
+        attempt = 0
+        while True:
+            with self.connect(db_name) as connection:
+                try:
+                    return work(connection)
+                except DBAPIError as e:
+                    if not self._should_retry(e, attempt):
+                        raise
+                    # Not kept, as possibly broken
+                    connection.invalidate()
+                    error = e
+            self._wait_before_retry(db_name, attempt, error)
+            attempt += 1
+
+    def close(self) -> None:
+        """Closes the idle connections and disposes of the engines"""
+
+        with self.condition:
+            for _, connection in self.idle_connections:
+                connection.close()
+                self.open_count -= 1
+            self.idle_connections = list()
+            for engine in self.db_to_engine_map.values():
+                engine.dispose()
+            self.db_to_engine_map = dict()
+
+
+def _get_connection_pool(
+    settings: Db2ModelSettings, profiler: Profiler, logger: Logger
+) -> ConnectionPool:
+    return ConnectionPool(
+        settings.db_settings,
+        settings.db_settings.max_connections or settings.jobs,
+        profiler,
+        logger,
+    )
@@ -3,3 +3,23 @@ EMPTY_FILE_TEMPLATE = """from sqlalchemy import MetaData
 metadata = MetaData()
 
 """
+
+# Relationships to dimension tables, referring to no other table, of up to this
+# many rows are joined into the queries of the tables referring to them
+JOINED_MAX_ROW_ESTIMATE = 10_000
+# Collections of up to this many rows per parent row on average are loaded with
+# their parents, larger ones raise unless loaded explicitly
+SELECTIN_MAX_ROWS_PER_PARENT = 100
+
+# Imports of the record classes, added to the ones of sqlacodegen
+RECORD_IMPORTS_RAW_TEXT = """from dataclasses import dataclass
+from typing import Any
+from sqlalchemy import Result, Row, Select, select"""
+# Methods of the record classes, fields of the same name getting a trailing _
+RECORD_METHOD_NAMES = ("select_statement", "from_row", "from_result")
+# Imports of the lookup helpers
+LOOKUP_HELPERS_IMPORTS_RAW_TEXT = """from typing import Optional
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session"""
+# Imports of the Core tables, besides the MetaData they share
+CORE_IMPORTS_RAW_TEXT = "from sqlalchemy import Column, Table"
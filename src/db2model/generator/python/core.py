@@ -0,0 +1,175 @@
+import ast
+import re
+
+from db2model.models import ColumnDef, TableDef
+from db2model.types import SqlDialect
+
+from .parser import STRING_LITERAL_PATTERN
+from .table import (
+    LOADED_NAME_PATTERN,
+    _get_modules_imports_code,
+    _get_record_code,
+    _get_used_imports_code,
+)
+from .utils import _python_core_table_name
+
+INLINE_FOREIGN_KEY_PATTERN = re.compile(r"\bForeignKey\((['\"])([^'\"]+)\1")
+
+
+def _get_referred_key(referred_column: str) -> tuple[str, str] | None:
+    """(schema_name, table_name) of a "schema_name.table_name.column_name" foreign
+    key target"""
+
+    parts = referred_column.split(".")
+    return (parts[0], parts[1]) if len(parts) == 3 else None
+
+
+def _get_core_column_code(column: ColumnDef) -> str:
+    """Column(...) of the column, sqlacodegen rendering mapped_column(...) with the
+    same arguments but its name, left out when it is the attribute name."""
+
+    arguments = column.call[len("mapped_column(") : -1]
+    if arguments[:1] in ("'", '"'):
+        return f"Column({arguments})"
+    if not arguments:
+        return f"Column({column.column_name!r})"
+    return f"Column({column.column_name!r}, {arguments})"
+
+
+def _get_table_arguments(
+    table_def: TableDef,
+) -> tuple[list[str], set[tuple[str, str] | None]]:
+    """(arguments, referred_keys) of Table(...) after its columns, from
+    the __table_args__ of the class, constraints being passed as they are and its
+    dict as keyword arguments, or from the Table(...) statement sqlacodegen gave."""
+
+    arguments: list[str] = list()
+    keyword_arguments: list[str] = list()
+    referred_keys: set[tuple[str, str] | None] = set()
+    table_args_values: list[ast.expr] = list()
+    match ast.parse(table_def.header_str).body[0]:
+        case ast.ClassDef(body=body):
+            for statement in body:
+                match statement:
+                    case ast.Assign(
+                        targets=[ast.Name(id="__table_args__")], value=value
+                    ):
+                        table_args_values.append(value)
+        case ast.Assign(
+            value=ast.Call(func=ast.Name(id="Table"), args=args, keywords=keywords)
+        ):
+            table_args_values.extend(args[2:])
+            keyword_arguments.extend(
+                f"{keyword.arg}={ast.get_source_segment(table_def.header_str, keyword.value)}"
+                for keyword in keywords
+            )
+        case _:
+            raise ValueError(
+                f"Problem during python file generation, unexpected table header. {table_def.table_name=}"
+            )
+    for value in table_args_values:
+        for table_arg in value.elts if isinstance(value, ast.Tuple) else [value]:
+            if isinstance(table_arg, ast.Dict):
+                for key, dict_value in zip(table_arg.keys, table_arg.values):
+                    if not (
+                        isinstance(key, ast.Constant) and isinstance(key.value, str)
+                    ):
+                        raise ValueError(
+                            f"Problem during python file generation, unexpected table argument. {table_def.table_name=}"
+                        )
+                    keyword_arguments.append(
+                        f"{key.value}={ast.get_source_segment(table_def.header_str, dict_value)}"
+                    )
+                continue
+            if (
+                isinstance(table_arg, ast.Call)
+                and isinstance(table_arg.func, ast.Name)
+                and table_arg.func.id == "ForeignKeyConstraint"
+                and len(table_arg.args) >= 2
+                and isinstance(table_arg.args[1], ast.List)
+            ):
+                for referred_column in table_arg.args[1].elts:
+                    if isinstance(referred_column, ast.Constant) and isinstance(
+                        referred_column.value, str
+                    ):
+                        referred_keys.add(_get_referred_key(referred_column.value))
+            arguments.append(ast.get_source_segment(table_def.header_str, table_arg))
+    return arguments + keyword_arguments, referred_keys
+
+
+def _get_core_table_code(
+    table_def: TableDef,
+) -> tuple[str, set[tuple[str, str] | None]]:
+    """(code, referred_keys) of the Table of `table_def`"""
+
+    arguments, referred_keys = _get_table_arguments(table_def)
+    for column in table_def.columns:
+        if column.foreign_key:
+            for match in INLINE_FOREIGN_KEY_PATTERN.finditer(column.call):
+                referred_keys.add(_get_referred_key(match.group(2)))
+    code = (
+        f"{_python_core_table_name(table_def.table_name)} = Table("
+        + ", ".join(
+            [
+                repr(table_def.table_name),
+                "metadata",
+                *(_get_core_column_code(column) for column in table_def.columns),
+                *arguments,
+            ]
+        )
+        + ")"
+    )
+    return code, referred_keys
+
+
+def _get_core_module_code(
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]],
+    tables_def: list[TableDef],
+    key_to_module_map: dict[tuple[str, str], tuple[str, str]],
+    sql_dialect: SqlDialect,
+    record_classes: bool = False,
+    db_package_prefix: str = ".",
+) -> str:
+    """Code of a module with a Table of each of `tables_def` on the shared
+    MetaData, followed by their record classes if `record_classes`.
+
+    The modules of the tables their foreign keys refer to are imported with it,
+    see `_get_modules_imports_code`.
+    """
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            codes: list[str] = list()
+            record_codes: list[str] = list()
+            referred_keys: set[tuple[str, str] | None] = set()
+            for table_def in tables_def:
+                code, table_referred_keys = _get_core_table_code(table_def)
+                codes.append(code)
+                referred_keys.update(table_referred_keys)
+                if record_classes:
+                    record_codes.append(
+                        _get_record_code(
+                            table_def, _python_core_table_name(table_def.table_name)
+                        )
+                    )
+
+            used_names = set(
+                LOADED_NAME_PATTERN.findall(
+                    STRING_LITERAL_PATTERN.sub("''", "\n".join(codes + record_codes))
+                )
+            )
+            return (
+                _get_used_imports_code(name_to_imports_map, used_names)
+                + "\n"
+                + _get_modules_imports_code(
+                    tables_def,
+                    {key for key in referred_keys if key is not None},
+                    key_to_module_map,
+                    db_package_prefix,
+                )
+                + "\n\n"
+                + "\n\n".join(codes + record_codes)
+                + "\n"
+            )
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
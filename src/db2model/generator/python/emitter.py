@@ -0,0 +1,1141 @@
+import ast
+import io
+import keyword
+import re
+import tokenize
+from collections.abc import Callable, Iterator
+
+from isort import place_module
+
+# Mirrors black's default mode and the import layout of isort's default profile,
+# on the subset of python generated here.
+# Major versions of the formatters mirrored. black only changes its stable style
+# with a new major version, once a year.
+BLACK_MAJOR_VERSION = 25
+ISORT_MAJOR_VERSION = 7
+LINE_LENGTH = 88
+INDENT = "    "
+
+COMMA_PRIORITY = 18
+DOT_PRIORITY = 1
+
+OPENING_BRACKETS = {"LPAR": "RPAR", "LSQB": "RSQB", "LBRACE": "RBRACE"}
+CLOSING_BRACKETS = set(OPENING_BRACKETS.values())
+BRACKETS = set(OPENING_BRACKETS) | CLOSING_BRACKETS
+OPERATOR_TYPES = {
+    "(": "LPAR",
+    ")": "RPAR",
+    "[": "LSQB",
+    "]": "RSQB",
+    "{": "LBRACE",
+    "}": "RBRACE",
+    ",": "COMMA",
+    ".": "DOT",
+    "=": "EQUAL",
+    ":": "COLON",
+    "-": "MINUS",
+}
+ALLOWED_KEYWORDS = {"class", "if", "pass", "True", "False", "None"}
+FORCE_OPTIONAL_PARENTHESES = "force_optional_parentheses"
+
+IMPORT_SECTIONS = ("FUTURE", "STDLIB", "THIRDPARTY", "FIRSTPARTY", "LOCALFOLDER")
+STATEMENT_DECLARATIONS = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class UnsupportedCode(ValueError):
+    """Raised on code outside of the subset the emitter reproduces exactly."""
+
+
+class _CannotSplit(Exception):
+    pass
+
+
+class _Leaf:
+    __slots__ = (
+        "type",
+        "value",
+        "whitespace",
+        "kind",
+        "in_arglist",
+        "has_parent",
+        "prefix",
+        "bracket_depth",
+        "opening_bracket",
+    )
+
+    def __init__(
+        self,
+        type: str,
+        value: str,
+        whitespace: str = "",
+        kind: str | None = None,
+        in_arglist: bool = False,
+        has_parent: bool = True,
+    ) -> None:
+        self.type = type
+        self.value = value
+        # Whitespace black puts before this leaf when it is not the first of a line
+        self.whitespace = whitespace
+        # Brackets: "atom", "trailer" or "classdef". Equal signs: "kwarg" or "assign"
+        self.kind = kind
+        # Commas directly inside the parentheses of a call or of a class definition
+        self.in_arglist = in_arglist
+        # False for the trailing commas added while splitting
+        self.has_parent = has_parent
+        self.prefix = ""
+        self.bracket_depth = 0
+        self.opening_bracket: _Leaf | None = None
+
+    def copy(self) -> "_Leaf":
+        return _Leaf(
+            self.type,
+            self.value,
+            self.whitespace,
+            self.kind,
+            self.in_arglist,
+            self.has_parent,
+        )
+
+
+class _Line:
+    def __init__(self, depth: int, inside_brackets: bool = False) -> None:
+        self.depth = depth
+        self.inside_brackets = inside_brackets
+        self.leaves: list[_Leaf] = list()
+        self.should_split_rhs = False
+        self.magic_trailing_comma: _Leaf | None = None
+        self.delimiters: dict[int, int] = dict()
+        self.invisible: list[_Leaf] = list()
+        self._bracket_depth = 0
+        self._bracket_match: dict[tuple[int, str], _Leaf] = dict()
+        self._previous: _Leaf | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.leaves)
+
+    def __str__(self) -> str:
+        if not self.leaves:
+            return "\n"
+        first, *others = self.leaves
+        return (
+            f"{first.prefix}{INDENT * self.depth}{first.value}"
+            + "".join(leaf.prefix + leaf.value for leaf in others)
+            + "\n"
+        )
+
+    @property
+    def is_chained_assignment(self) -> bool:
+        return [leaf.type for leaf in self.leaves].count("EQUAL") > 1
+
+    def clone(self) -> "_Line":
+        line = _Line(self.depth, self.inside_brackets)
+        line.should_split_rhs = self.should_split_rhs
+        line.magic_trailing_comma = self.magic_trailing_comma
+        return line
+
+    def append(
+        self, leaf: _Leaf, preformatted: bool = False, track_bracket: bool = False
+    ) -> None:
+        if self.leaves and not preformatted:
+            leaf.prefix += leaf.whitespace
+        if self.inside_brackets or not preformatted or track_bracket:
+            self._mark(leaf)
+            if self._has_magic_trailing_comma(leaf):
+                self.magic_trailing_comma = leaf
+        self.leaves.append(leaf)
+
+    def max_delimiter_priority(self, exclude: set[int] = set()) -> int:
+        """Raises ValueError on no delimiters."""
+        return max(v for k, v in self.delimiters.items() if k not in exclude)
+
+    def delimiter_count_with_priority(self, priority: int) -> int:
+        return sum(1 for p in self.delimiters.values() if p == priority)
+
+    def enumerate_with_length(
+        self, is_reversed: bool = False
+    ) -> Iterator[tuple[int, _Leaf, int]]:
+        indexes = range(len(self.leaves))
+        for index in reversed(indexes) if is_reversed else indexes:
+            leaf = self.leaves[index]
+            yield index, leaf, len(leaf.prefix) + len(leaf.value)
+
+    def _mark(self, leaf: _Leaf) -> None:
+        if (
+            self._bracket_depth == 0
+            and leaf.type in CLOSING_BRACKETS
+            and (self._bracket_depth, leaf.type) not in self._bracket_match
+        ):
+            return
+        if leaf.type in CLOSING_BRACKETS:
+            self._bracket_depth -= 1
+            leaf.opening_bracket = self._bracket_match.pop(
+                (self._bracket_depth, leaf.type)
+            )
+            if not leaf.value:
+                self.invisible.append(leaf)
+        leaf.bracket_depth = self._bracket_depth
+        if self._bracket_depth == 0:
+            if (
+                leaf.type == "DOT"
+                and self._previous is not None
+                and self._previous.type in CLOSING_BRACKETS
+            ):
+                self.delimiters[id(self._previous)] = DOT_PRIORITY
+            elif leaf.type == "COMMA":
+                self.delimiters[id(leaf)] = COMMA_PRIORITY
+        if leaf.type in OPENING_BRACKETS:
+            self._bracket_match[self._bracket_depth, OPENING_BRACKETS[leaf.type]] = leaf
+            self._bracket_depth += 1
+            if not leaf.value:
+                self.invisible.append(leaf)
+        self._previous = leaf
+
+    def _has_magic_trailing_comma(self, closing: _Leaf) -> bool:
+        if not (
+            closing.type in CLOSING_BRACKETS
+            and self.leaves
+            and self.leaves[-1].type == "COMMA"
+        ):
+            return False
+        if closing.type == "RBRACE":
+            return True
+        if closing.type == "RSQB":
+            return not (
+                closing.kind == "trailer"
+                and closing.opening_bracket is not None
+                and _is_one_sequence_between(
+                    closing.opening_bracket, closing, self.leaves, ("LSQB", "RSQB")
+                )
+            )
+        return closing.opening_bracket is not None and not _is_one_sequence_between(
+            closing.opening_bracket, closing, self.leaves
+        )
+
+
+class _RHSResult:
+    def __init__(
+        self,
+        head: _Line,
+        body: _Line,
+        tail: _Line,
+        opening_bracket: _Leaf,
+        closing_bracket: _Leaf,
+    ) -> None:
+        self.head = head
+        self.body = body
+        self.tail = tail
+        self.opening_bracket = opening_bracket
+        self.closing_bracket = closing_bracket
+
+
+def _is_one_sequence_between(
+    opening: _Leaf,
+    closing: _Leaf,
+    leaves: list[_Leaf],
+    brackets: tuple[str, str] = ("LPAR", "RPAR"),
+) -> bool:
+    if (opening.type, closing.type) != brackets:
+        return False
+    depth = closing.bracket_depth + 1
+    for opening_index, leaf in enumerate(leaves):
+        if leaf is opening:
+            break
+    else:
+        raise LookupError("Opening paren not found in leaves")
+    commas = 0
+    for leaf in leaves[opening_index + 1 :]:
+        if leaf is closing:
+            break
+        if leaf.bracket_depth == depth and leaf.type == "COMMA":
+            commas += 1
+            if leaf.in_arglist:
+                commas += 1
+                break
+    return commas < 2
+
+
+def _line_to_string(line: _Line) -> str:
+    return str(line).strip("\n")
+
+
+def _is_line_short_enough(
+    line: _Line, line_str: str = "", line_length: int = LINE_LENGTH
+) -> bool:
+    if not line_str:
+        line_str = _line_to_string(line)
+    return len(line_str) <= line_length and "\n" not in line_str
+
+
+def _transform_line(line: _Line, features: frozenset[str]) -> Iterator[_Line]:
+    line_str = _line_to_string(line)
+    transformers: list[Callable[[_Line, frozenset[str]], Iterator[_Line]]]
+    if (
+        not line.should_split_rhs
+        and not line.magic_trailing_comma
+        and _is_line_short_enough(line, line_str)
+    ):
+        transformers = list()
+    elif line.inside_brackets:
+        transformers = [_delimiter_split, _rhs]
+    else:
+        transformers = [_rhs]
+
+    for transform in transformers:
+        try:
+            result = _run_transformer(line, transform, features, line_str)
+        except _CannotSplit:
+            continue
+        yield from result
+        return
+    yield line
+
+
+def _run_transformer(
+    line: _Line,
+    transform: Callable[[_Line, frozenset[str]], Iterator[_Line]],
+    features: frozenset[str],
+    line_str: str,
+) -> list[_Line]:
+    result: list[_Line] = list()
+    for transformed_line in transform(line, features):
+        if _line_to_string(transformed_line) == line_str:
+            raise _CannotSplit("Line transformer returned an unchanged result")
+        result.extend(_transform_line(transformed_line, features))
+
+    if (
+        FORCE_OPTIONAL_PARENTHESES in features
+        or transform is not _rhs
+        or not line.invisible
+        or any(bracket.value for bracket in line.invisible)
+        or _is_line_short_enough(result[0])
+        or any(not leaf.has_parent for leaf in line.leaves)
+    ):
+        return result
+
+    line_copy = line.clone()
+    for leaf in line.leaves:
+        line_copy.append(leaf.copy())
+    second_opinion = _run_transformer(
+        line_copy, transform, features | {FORCE_OPTIONAL_PARENTHESES}, line_str
+    )
+    if all(_is_line_short_enough(ln) for ln in second_opinion):
+        result = second_opinion
+    return result
+
+
+def _delimiter_split(line: _Line, features: frozenset[str]) -> Iterator[_Line]:
+    if not line.leaves:
+        raise _CannotSplit("Line empty")
+    try:
+        delimiter_priority = line.max_delimiter_priority(exclude={id(line.leaves[-1])})
+    except ValueError:
+        raise _CannotSplit("No delimiters found")
+    if (
+        delimiter_priority == DOT_PRIORITY
+        and line.delimiter_count_with_priority(delimiter_priority) == 1
+    ):
+        raise _CannotSplit("Splitting a single attribute from its owner looks wrong")
+
+    current_line = _Line(line.depth, line.inside_brackets)
+    for leaf in line.leaves:
+        current_line.append(leaf, preformatted=True)
+        if line.delimiters.get(id(leaf)) == delimiter_priority:
+            current_line.leaves[0].prefix = ""
+            yield current_line
+            current_line = _Line(line.depth, line.inside_brackets)
+    if current_line:
+        if (
+            delimiter_priority == COMMA_PRIORITY
+            and current_line.leaves[-1].type != "COMMA"
+        ):
+            current_line.append(_Leaf("COMMA", ",", has_parent=False))
+        current_line.leaves[0].prefix = ""
+        yield current_line
+
+
+def _rhs(line: _Line, features: frozenset[str]) -> Iterator[_Line]:
+    """Right hand split, increasingly omitting the trailers of the line."""
+
+    for omit in _generate_trailers_to_omit(line):
+        lines = list(_right_hand_split(line, features, omit))
+        if _is_line_short_enough(lines[0]):
+            yield from lines
+            return
+    yield from _right_hand_split(line, features, set())
+
+
+def _generate_trailers_to_omit(line: _Line) -> Iterator[set[int]]:
+    omit: set[int] = set()
+    if not line.magic_trailing_comma:
+        yield omit
+
+    length = 4 * line.depth
+    opening_bracket: _Leaf | None = None
+    closing_bracket: _Leaf | None = None
+    inner_brackets: set[int] = set()
+    for index, leaf, leaf_length in line.enumerate_with_length(is_reversed=True):
+        length += leaf_length
+        if length > LINE_LENGTH:
+            break
+        if opening_bracket:
+            if leaf is opening_bracket:
+                opening_bracket = None
+            elif leaf.type in CLOSING_BRACKETS:
+                prev = line.leaves[index - 1] if index > 0 else None
+                if (
+                    prev
+                    and prev.type == "COMMA"
+                    and leaf.opening_bracket is not None
+                    and not _is_one_sequence_between(
+                        leaf.opening_bracket, leaf, line.leaves
+                    )
+                ):
+                    break
+                inner_brackets.add(id(leaf))
+        elif leaf.type in CLOSING_BRACKETS:
+            prev = line.leaves[index - 1] if index > 0 else None
+            if prev and prev.type in OPENING_BRACKETS:
+                inner_brackets.add(id(leaf))
+                continue
+            if closing_bracket:
+                omit.add(id(closing_bracket))
+                omit.update(inner_brackets)
+                inner_brackets.clear()
+                yield omit
+            if (
+                prev
+                and prev.type == "COMMA"
+                and leaf.opening_bracket is not None
+                and not _is_one_sequence_between(
+                    leaf.opening_bracket, leaf, line.leaves
+                )
+            ):
+                break
+            if leaf.value:
+                opening_bracket = leaf.opening_bracket
+                closing_bracket = leaf
+
+
+def _right_hand_split(
+    line: _Line, features: frozenset[str], omit: set[int]
+) -> Iterator[_Line]:
+    rhs = _first_right_hand_split(line, omit)
+    yield from _maybe_split_omitting_optional_parens(rhs, line, features, omit)
+
+
+def _first_right_hand_split(line: _Line, omit: set[int]) -> _RHSResult:
+    tail_leaves: list[_Leaf] = list()
+    body_leaves: list[_Leaf] = list()
+    head_leaves: list[_Leaf] = list()
+    current_leaves = tail_leaves
+    opening_bracket: _Leaf | None = None
+    closing_bracket: _Leaf | None = None
+    for leaf in reversed(line.leaves):
+        if current_leaves is body_leaves:
+            if leaf is opening_bracket:
+                current_leaves = head_leaves if body_leaves else tail_leaves
+        current_leaves.append(leaf)
+        if current_leaves is tail_leaves:
+            if leaf.type in CLOSING_BRACKETS and id(leaf) not in omit:
+                opening_bracket = leaf.opening_bracket
+                closing_bracket = leaf
+                current_leaves = body_leaves
+    if not (opening_bracket and closing_bracket and head_leaves):
+        raise _CannotSplit("No brackets found")
+
+    tail_leaves.reverse()
+    body_leaves.reverse()
+    head_leaves.reverse()
+    head = _bracket_split_build_line(head_leaves, line, opening_bracket, "head")
+    body = _bracket_split_build_line(body_leaves, line, opening_bracket, "body")
+    tail = _bracket_split_build_line(tail_leaves, line, opening_bracket, "tail")
+    tail_len = len(str(tail).strip())
+    if not body and tail_len < 3:
+        raise _CannotSplit("Splitting brackets on an empty body is not worth it")
+    return _RHSResult(head, body, tail, opening_bracket, closing_bracket)
+
+
+def _maybe_split_omitting_optional_parens(
+    rhs: _RHSResult, line: _Line, features: frozenset[str], omit: set[int]
+) -> Iterator[_Line]:
+    if (
+        FORCE_OPTIONAL_PARENTHESES not in features
+        and rhs.opening_bracket.type == "LPAR"
+        and not rhs.opening_bracket.value
+        and rhs.closing_bracket.type == "RPAR"
+        and not rhs.closing_bracket.value
+        and _can_omit_invisible_parens(rhs)
+    ):
+        omit = {id(rhs.closing_bracket), *omit}
+        try:
+            rhs_oop = _first_right_hand_split(line, omit)
+            if _prefer_split_rhs_oop_over_rhs(rhs_oop, rhs):
+                yield from _maybe_split_omitting_optional_parens(
+                    rhs_oop, line, features, omit
+                )
+                return
+        except _CannotSplit as e:
+            if line.is_chained_assignment:
+                pass
+            elif not _can_be_split(rhs.body) and not _is_line_short_enough(rhs.body):
+                raise _CannotSplit("Body is still too long and can't be split") from e
+
+    for bracket in (rhs.opening_bracket, rhs.closing_bracket):
+        if bracket.type == "LPAR":
+            bracket.value = "("
+        elif bracket.type == "RPAR":
+            bracket.value = ")"
+    for result in (rhs.head, rhs.body, rhs.tail):
+        if result:
+            yield result
+
+
+def _prefer_split_rhs_oop_over_rhs(rhs_oop: _RHSResult, rhs: _RHSResult) -> bool:
+    if not (len(rhs.head.leaves) >= 2 and rhs.head.leaves[-2].type == "EQUAL"):
+        return True
+    if not any(leaf.type in BRACKETS for leaf in rhs.head.leaves[:-1]):
+        return True
+    if not _is_line_short_enough(rhs.head, line_length=LINE_LENGTH - 1):
+        return True
+    if rhs.head.magic_trailing_comma is not None:
+        return True
+
+    rhs_head_equal_count = [leaf.type for leaf in rhs.head.leaves].count("EQUAL")
+    rhs_oop_head_equal_count = [leaf.type for leaf in rhs_oop.head.leaves].count(
+        "EQUAL"
+    )
+    if rhs_head_equal_count > 1 and rhs_head_equal_count > rhs_oop_head_equal_count:
+        return False
+
+    has_closing_bracket_after_assign = False
+    for leaf in reversed(rhs_oop.head.leaves):
+        if leaf.type == "EQUAL":
+            break
+        if leaf.type in CLOSING_BRACKETS:
+            has_closing_bracket_after_assign = True
+            break
+    return has_closing_bracket_after_assign or (
+        any(leaf.type == "EQUAL" for leaf in rhs_oop.head.leaves)
+        and _is_line_short_enough(rhs_oop.head)
+    )
+
+
+def _can_omit_invisible_parens(rhs: _RHSResult) -> bool:
+    line = rhs.body
+    if not line.delimiters:
+        return True
+    max_priority = line.max_delimiter_priority()
+    if line.delimiter_count_with_priority(max_priority) > 1:
+        return False
+    if max_priority == DOT_PRIORITY:
+        return True
+
+    first = line.leaves[0]
+    second = line.leaves[1]
+    if first.type in OPENING_BRACKETS and second.type not in CLOSING_BRACKETS:
+        if _can_omit_opening_paren(line, first):
+            return True
+
+    penultimate = line.leaves[-2]
+    last = line.leaves[-1]
+    if (
+        last.type == "RPAR"
+        or last.type == "RBRACE"
+        or (last.type == "RSQB" and last.kind != "trailer")
+    ):
+        if penultimate.type in OPENING_BRACKETS:
+            return False
+        if _can_omit_closing_paren(line, last):
+            return True
+    return False
+
+
+def _can_omit_opening_paren(line: _Line, first: _Leaf) -> bool:
+    remainder = False
+    length = 4 * line.depth
+    index = -1
+    for index, leaf, leaf_length in line.enumerate_with_length():
+        if leaf.type in CLOSING_BRACKETS and leaf.opening_bracket is first:
+            remainder = True
+        if remainder:
+            length += leaf_length
+            if length > LINE_LENGTH:
+                break
+            if leaf.type in OPENING_BRACKETS:
+                remainder = False
+    else:
+        if len(line.leaves) == index + 1:
+            return True
+    return False
+
+
+def _can_omit_closing_paren(line: _Line, last: _Leaf) -> bool:
+    length = 4 * line.depth
+    seen_other_brackets = False
+    for _, leaf, leaf_length in line.enumerate_with_length():
+        length += leaf_length
+        if leaf is last.opening_bracket:
+            if seen_other_brackets or length <= LINE_LENGTH:
+                return True
+        elif leaf.type in OPENING_BRACKETS:
+            seen_other_brackets = True
+    return False
+
+
+def _can_be_split(line: _Line) -> bool:
+    leaves = line.leaves
+    if len(leaves) < 2:
+        return False
+    if leaves[0].type == "STRING" and leaves[1].type == "DOT":
+        call_count = 0
+        dot_count = 0
+        next = leaves[-1]
+        for leaf in leaves[-2::-1]:
+            if leaf.type in OPENING_BRACKETS:
+                if next.type not in CLOSING_BRACKETS:
+                    return False
+                call_count += 1
+            elif leaf.type == "DOT":
+                dot_count += 1
+            elif leaf.type == "NAME":
+                if not (next.type == "DOT" or next.type in OPENING_BRACKETS):
+                    return False
+            elif leaf.type not in CLOSING_BRACKETS:
+                return False
+            if dot_count > 1 and call_count > 1:
+                return False
+            next = leaf
+    return True
+
+
+def _get_leaves_inside_matching_brackets(leaves: list[_Leaf]) -> set[int]:
+    try:
+        start_index = next(
+            i for i, leaf in enumerate(leaves) if leaf.type in OPENING_BRACKETS
+        )
+    except StopIteration:
+        return set()
+    bracket_stack: list[tuple[str, int]] = list()
+    ids: set[int] = set()
+    for i in range(start_index, len(leaves)):
+        leaf = leaves[i]
+        if leaf.type in OPENING_BRACKETS:
+            bracket_stack.append((OPENING_BRACKETS[leaf.type], i))
+        if leaf.type in CLOSING_BRACKETS:
+            if bracket_stack and leaf.type == bracket_stack[-1][0]:
+                _, start = bracket_stack.pop()
+                for j in range(start, i + 1):
+                    ids.add(id(leaves[j]))
+            else:
+                break
+    return ids
+
+
+def _bracket_split_build_line(
+    leaves: list[_Leaf], original: _Line, opening_bracket: _Leaf, component: str
+) -> _Line:
+    result = _Line(original.depth)
+    if component == "body":
+        result.inside_brackets = True
+        result.depth += 1
+    leaves_to_track = (
+        _get_leaves_inside_matching_brackets(leaves) if component == "head" else set()
+    )
+    for leaf in leaves:
+        result.append(
+            leaf, preformatted=True, track_bracket=id(leaf) in leaves_to_track
+        )
+    if component == "body" and _should_split_line(result, opening_bracket):
+        result.should_split_rhs = True
+    return result
+
+
+def _should_split_line(line: _Line, opening_bracket: _Leaf) -> bool:
+    """Should the body of a right hand split be exploded one element per line"""
+
+    if not opening_bracket.has_parent:
+        return False
+    exclude: set[int] = set()
+    trailing_comma = False
+    try:
+        last_leaf = line.leaves[-1]
+        if last_leaf.type == "COMMA":
+            trailing_comma = True
+            exclude.add(id(last_leaf))
+        max_priority = line.max_delimiter_priority(exclude=exclude)
+    except (IndexError, ValueError):
+        return False
+    return max_priority == COMMA_PRIORITY and (
+        trailing_comma or opening_bracket.kind == "atom"
+    )
+
+
+def _normalize_string_quotes(value: str) -> str:
+    """Prefers double quotes, as long as it does not add escapes."""
+
+    if value[0] == '"':
+        orig_quote, new_quote = '"', "'"
+    else:
+        orig_quote, new_quote = "'", '"'
+    unescaped_new_quote = re.compile(rf"(([^\\]|^)(\\\\)*){new_quote}")
+    escaped_new_quote = re.compile(rf"([^\\]|^)\\((?:\\\\)*){new_quote}")
+    escaped_orig_quote = re.compile(rf"([^\\]|^)\\((?:\\\\)*){orig_quote}")
+    body = value[1:-1]
+    new_body = _sub_twice(escaped_new_quote, rf"\1\2{new_quote}", body)
+    if body != new_body:
+        body = new_body
+        value = f"{orig_quote}{body}{orig_quote}"
+    new_body = _sub_twice(escaped_orig_quote, rf"\1\2{orig_quote}", new_body)
+    new_body = _sub_twice(unescaped_new_quote, rf"\1\\{new_quote}", new_body)
+    orig_escape_count = body.count("\\")
+    new_escape_count = new_body.count("\\")
+    if new_escape_count > orig_escape_count:
+        return value
+    if new_escape_count == orig_escape_count and orig_quote == '"':
+        return value
+    return f"{new_quote}{new_body}{new_quote}"
+
+
+def _sub_twice(regex: re.Pattern[str], replacement: str, original: str) -> str:
+    return regex.sub(replacement, regex.sub(replacement, original))
+
+
+def _format_float_or_int_string(text: str) -> str:
+    if "." not in text:
+        return text
+    before, after = text.split(".")
+    return f"{before or 0}.{after or 0}"
+
+
+def _normalize_numeric_literal(value: str) -> str:
+    text = value.lower()
+    if text.startswith(("0o", "0b")):
+        return text
+    if text.startswith("0x"):
+        return text[:2] + text[2:].upper()
+    if "e" in text:
+        before, after = text.split("e")
+        sign = ""
+        if after.startswith("-"):
+            after = after[1:]
+            sign = "-"
+        elif after.startswith("+"):
+            after = after[1:]
+        return f"{_format_float_or_int_string(before)}e{sign}{after}"
+    if text.endswith("j"):
+        return _format_float_or_int_string(text[:-1]) + "j"
+    return _format_float_or_int_string(text)
+
+
+def _logical_lines(code: str) -> dict[int, tuple[list[tokenize.TokenInfo], int]]:
+    """start row -> (tokens, blank lines before) of every logical line"""
+
+    logical_lines: dict[int, tuple[list[tokenize.TokenInfo], int]] = dict()
+    tokens: list[tokenize.TokenInfo] = list()
+    blank_lines = 0
+    bracket_depth = 0
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        match token.type:
+            case tokenize.COMMENT:
+                raise UnsupportedCode(f"Comments are not supported. {token.line=}")
+            case tokenize.NL:
+                if not tokens:
+                    blank_lines += 1
+            case tokenize.NEWLINE:
+                logical_lines[tokens[0].start[0]] = (tokens, blank_lines)
+                tokens = list()
+                blank_lines = 0
+            case tokenize.INDENT | tokenize.DEDENT | tokenize.ENDMARKER:
+                pass
+            case _:
+                if tokens and bracket_depth == 0 and token.start[0] > tokens[-1].end[0]:
+                    raise UnsupportedCode(
+                        f"Backslash continuations are not supported. {token.line=}"
+                    )
+                if token.type == tokenize.OP and token.string in "([{":
+                    bracket_depth += 1
+                elif token.type == tokenize.OP and token.string in ")]}":
+                    bracket_depth -= 1
+                tokens.append(token)
+    return logical_lines
+
+
+def _top_level_index(tokens: list[tokenize.TokenInfo], operator: str) -> int | None:
+    bracket_depth = 0
+    for index, token in enumerate(tokens):
+        if token.type != tokenize.OP:
+            continue
+        if token.string in "([{":
+            bracket_depth += 1
+        elif token.string in ")]}":
+            bracket_depth -= 1
+        elif token.string == operator and bracket_depth == 0:
+            return index
+    return None
+
+
+def _with_invisible_parens(
+    tokens: list[tokenize.TokenInfo],
+) -> list[tokenize.TokenInfo | str]:
+    """Invisible parentheses black puts around assigned values and annotations"""
+
+    if not tokens:
+        raise UnsupportedCode("Empty expression.")
+    if _top_level_index(tokens, ",") is not None:
+        raise UnsupportedCode("Unparenthesized tuples are not supported.")
+    if tokens[0].string == "(" and _top_level_index(tokens[1:], ")") == len(tokens) - 2:
+        inner_tokens = tokens[1:-1]
+        if inner_tokens and _top_level_index(inner_tokens, ",") is None:
+            raise UnsupportedCode("Redundant parentheses are not supported.")
+        return list(tokens)
+    return ["(", *tokens, ")"]
+
+
+def _build_line(
+    items: list[tokenize.TokenInfo | str], depth: int, is_class: bool = False
+) -> _Line:
+    """Line of leaves out of tokens, a "(" or ")" string being an invisible paren"""
+
+    line = _Line(depth)
+    stack: list[_Leaf] = list()
+    prev: _Leaf | None = None
+    for item in items:
+        if isinstance(item, str):
+            leaf = _Leaf("LPAR" if item == "(" else "RPAR", "", kind="atom")
+        else:
+            leaf = _token_leaf(item, prev, stack, is_class)
+
+        if leaf.type in OPENING_BRACKETS:
+            stack.append(leaf)
+        elif leaf.type in CLOSING_BRACKETS:
+            if not stack or OPENING_BRACKETS[stack[-1].type] != leaf.type:
+                raise UnsupportedCode(f"Unbalanced brackets. {items=}")
+            leaf.kind = stack.pop().kind
+
+        if prev is None:
+            leaf.whitespace = ""
+        elif leaf.type in CLOSING_BRACKETS or leaf.type in ("COMMA", "COLON"):
+            leaf.whitespace = ""
+        elif prev.type in OPENING_BRACKETS:
+            leaf.whitespace = ""
+        elif leaf.type == "DOT" or prev.type == "DOT":
+            leaf.whitespace = ""
+        elif leaf.type in ("LPAR", "LSQB") and leaf.kind in ("trailer", "classdef"):
+            leaf.whitespace = ""
+        elif leaf.type == "EQUAL" and leaf.kind == "kwarg":
+            leaf.whitespace = ""
+        elif prev.type == "EQUAL" and prev.kind == "kwarg":
+            leaf.whitespace = ""
+        elif prev.type == "MINUS":
+            leaf.whitespace = ""
+        else:
+            leaf.whitespace = " "
+        line.append(leaf)
+        prev = leaf
+    if stack:
+        raise UnsupportedCode(f"Unbalanced brackets. {items=}")
+    return line
+
+
+def _token_leaf(
+    token: tokenize.TokenInfo, prev: _Leaf | None, stack: list[_Leaf], is_class: bool
+) -> _Leaf:
+    match token.type:
+        case tokenize.NAME:
+            if keyword.iskeyword(token.string) and token.string not in ALLOWED_KEYWORDS:
+                raise UnsupportedCode(f"Unsupported keyword. {token.string=}")
+            return _Leaf("NAME", token.string)
+        case tokenize.NUMBER:
+            return _Leaf("NUMBER", _normalize_numeric_literal(token.string))
+        case tokenize.STRING:
+            if token.string[0] not in "'\"" or token.string[:3] in ('"""', "'''"):
+                raise UnsupportedCode(f"Unsupported string. {token.string=}")
+            if prev is not None and prev.type == "STRING":
+                raise UnsupportedCode(f"Implicit concatenation. {token.string=}")
+            return _Leaf("STRING", _normalize_string_quotes(token.string))
+        case tokenize.OP if token.string in OPERATOR_TYPES:
+            leaf_type = OPERATOR_TYPES[token.string]
+        case _:
+            raise UnsupportedCode(f"Unsupported token. {token.string=}")
+
+    leaf = _Leaf(leaf_type, token.string)
+    innermost = stack[-1] if stack else None
+    match leaf_type:
+        case "LPAR" | "LSQB":
+            if is_class and leaf_type == "LPAR" and not stack:
+                leaf.kind = "classdef"
+            elif prev is not None and (
+                prev.type in CLOSING_BRACKETS
+                or prev.type == "STRING"
+                or (prev.type == "NAME" and not keyword.iskeyword(prev.value))
+            ):
+                leaf.kind = "trailer"
+            else:
+                leaf.kind = "atom"
+        case "LBRACE":
+            leaf.kind = "atom"
+        case "COMMA":
+            leaf.in_arglist = (
+                innermost is not None
+                and innermost.type == "LPAR"
+                and innermost.kind in ("trailer", "classdef")
+            )
+        case "EQUAL":
+            if innermost is None:
+                leaf.kind = "assign"
+            elif innermost.type == "LPAR" and innermost.kind in ("trailer", "classdef"):
+                leaf.kind = "kwarg"
+            else:
+                raise UnsupportedCode(f"Unsupported assignment. {token.line=}")
+        case "COLON":
+            if innermost is not None and innermost.type != "LBRACE":
+                raise UnsupportedCode(f"Unsupported colon. {token.line=}")
+        case "MINUS":
+            if not (
+                prev is None
+                or prev.type in OPENING_BRACKETS
+                or prev.type in ("COMMA", "EQUAL", "COLON")
+            ):
+                raise UnsupportedCode(
+                    f"Binary operators are not supported. {token.line=}"
+                )
+    return leaf
+
+
+def _natural_key(text: str) -> list[int | str]:
+    return [int(c) if c.isdigit() else c for c in re.split(r"(\d+)", text)]
+
+
+def _module_sort_key(module_name: str) -> list[int | str]:
+    relative_match = re.match(r"^(\.+)\s*(.*)", module_name)
+    if relative_match:
+        module_name = "_".join(relative_match.groups())
+    return _natural_key("B" + module_name.lower())
+
+
+def _imported_name_sort_key(name: str) -> list[int | str]:
+    if name.isupper() and len(name) > 1:
+        prefix = "A"
+    elif name[0:1].isupper():
+        prefix = "B"
+    else:
+        prefix = "C"
+    return _natural_key("B" + prefix + name.lower())
+
+
+class _Block:
+    """A statement with its rendering, for the blank lines computation"""
+
+    def __init__(
+        self,
+        depth: int,
+        code: str,
+        blank_lines: int,
+        is_import: bool = False,
+        is_class: bool = False,
+    ) -> None:
+        self.depth = depth
+        self.code = code
+        self.blank_lines = blank_lines
+        self.is_import = is_import
+        self.is_class = is_class
+
+
+def _import_blocks(
+    imports: list[ast.Import | ast.ImportFrom], depth: int
+) -> list[_Block]:
+    """Sorted, merged and wrapped imports"""
+
+    section_to_straight_map: dict[str, set[str]] = dict()
+    section_to_from_map: dict[str, dict[str, set[str]]] = dict()
+    for node in imports:
+        for alias in node.names:
+            if alias.asname is not None or alias.name == "*":
+                raise UnsupportedCode(f"Unsupported import. {ast.dump(node)=}")
+        match node:
+            case ast.Import():
+                for alias in node.names:
+                    section_to_straight_map.setdefault(
+                        place_module(alias.name), set()
+                    ).add(alias.name)
+            case ast.ImportFrom():
+                module_name = "." * node.level + (node.module or "")
+                for alias in node.names:
+                    section_to_from_map.setdefault(
+                        place_module(module_name), dict()
+                    ).setdefault(module_name, set()).add(alias.name)
+
+    indent = INDENT * depth
+    blocks: list[_Block] = list()
+    for section in IMPORT_SECTIONS:
+        codes: list[str] = list()
+        for module_name in sorted(
+            section_to_straight_map.get(section, set()), key=_module_sort_key
+        ):
+            codes.append(f"{indent}import {module_name}\n")
+        module_to_names_map = section_to_from_map.get(section, dict())
+        for module_name in sorted(module_to_names_map, key=_module_sort_key):
+            names = sorted(
+                module_to_names_map[module_name], key=_imported_name_sort_key
+            )
+            code = f"{indent}from {module_name} import {', '.join(names)}"
+            if len(code) <= LINE_LENGTH:
+                codes.append(code + "\n")
+            else:
+                codes.append(
+                    f"{indent}from {module_name} import (\n"
+                    + "".join(f"{indent}{INDENT}{name},\n" for name in names)
+                    + f"{indent})\n"
+                )
+        for index, code in enumerate(codes):
+            blocks.append(
+                _Block(depth, code, 1 if blocks and index == 0 else 0, is_import=True)
+            )
+    return blocks
+
+
+def _render_line(line: _Line) -> str:
+    return "".join(str(result) for result in _transform_line(line, frozenset()))
+
+
+def _statement_blocks(
+    node: ast.stmt,
+    depth: int,
+    logical_lines: dict[int, tuple[list[tokenize.TokenInfo], int]],
+) -> list[_Block]:
+    if node.lineno not in logical_lines:
+        raise UnsupportedCode(f"Statement not found. {ast.dump(node)=}")
+    tokens, blank_lines = logical_lines[node.lineno]
+
+    match node:
+        case ast.ClassDef() | ast.If():
+            if not (tokens[-1].string == ":" and node.body[0].lineno > node.lineno):
+                raise UnsupportedCode(f"Unsupported block. {ast.dump(node)=}")
+            blocks: list[_Block] = list()
+            if isinstance(node, ast.ClassDef):
+                if node.decorator_list:
+                    raise UnsupportedCode(f"Decorators. {ast.dump(node)=}")
+                if [token.string for token in tokens[2:4]] == ["(", ")"]:
+                    raise UnsupportedCode(f"Empty class parentheses. {node.name=}")
+                line = _build_line(list(tokens), depth, is_class=True)
+                blocks.append(
+                    _Block(depth, _render_line(line), blank_lines, is_class=True)
+                )
+                for child in node.body:
+                    blocks.extend(_statement_blocks(child, depth + 1, logical_lines))
+                return blocks
+
+            if not (
+                isinstance(node.test, ast.Name)
+                and node.test.id == "TYPE_CHECKING"
+                and not node.orelse
+                and all(isinstance(c, (ast.Import, ast.ImportFrom)) for c in node.body)
+                and len(tokens) == 3
+            ):
+                raise UnsupportedCode(f"Unsupported if block. {ast.dump(node)=}")
+            line = _build_line([tokens[0], "(", tokens[1], ")", tokens[2]], depth)
+            blocks.append(
+                _Block(
+                    depth,
+                    _render_line(line),
+                    blank_lines,
+                )
+            )
+            return blocks + _import_blocks(node.body, depth + 1)
+
+        case ast.Pass():
+            items: list[tokenize.TokenInfo | str] = list(tokens)
+        case ast.Assign(targets=[ast.Name()]):
+            equal_index = _top_level_index(tokens, "=")
+            if equal_index != 1:
+                raise UnsupportedCode(f"Unsupported assignment. {ast.dump(node)=}")
+            items = [*tokens[:2], *_with_invisible_parens(tokens[2:])]
+        case ast.AnnAssign(target=ast.Name(), simple=1):
+            if _top_level_index(tokens, ":") != 1:
+                raise UnsupportedCode(f"Unsupported annotation. {ast.dump(node)=}")
+            equal_index = _top_level_index(tokens, "=")
+            if equal_index is None:
+                items = [*tokens[:2], *_with_invisible_parens(tokens[2:])]
+            else:
+                items = [
+                    *tokens[:2],
+                    *_with_invisible_parens(tokens[2:equal_index]),
+                    tokens[equal_index],
+                    *_with_invisible_parens(tokens[equal_index + 1 :]),
+                ]
+        case _:
+            raise UnsupportedCode(f"Unsupported statement. {ast.dump(node)=}")
+
+    if (tokens[-1].end[0], tokens[-1].end[1]) != (node.end_lineno, node.end_col_offset):
+        raise UnsupportedCode(f"Several statements on one line. {ast.dump(node)=}")
+    return [_Block(depth, _render_line(_build_line(items, depth)), blank_lines)]
+
+
+def _join_blocks(blocks: list[_Block]) -> str:
+    """Joins the blocks with the empty lines black would put between them."""
+
+    codes: list[str] = list()
+    previous_block: _Block | None = None
+    previous_class_depths: list[int] = list()
+    for block in blocks:
+        before = min(block.blank_lines, 2 if block.depth == 0 else 1)
+        user_had_newline = bool(before)
+
+        previous_class_depth = None
+        while previous_class_depths and previous_class_depths[-1] >= block.depth:
+            previous_class_depth = previous_class_depths.pop()
+        if block.is_class:
+            previous_class_depths.append(block.depth)
+
+        if previous_block is None:
+            before = 0
+        else:
+            if previous_class_depth is not None:
+                before = 1 if block.depth else 2
+            if block.is_class:
+                if previous_block.depth < block.depth and previous_block.is_class:
+                    before = 1 if user_had_newline else 0
+                else:
+                    before = 1 if block.depth else 2
+            elif (
+                previous_block.is_import
+                and not block.is_import
+                and block.depth == previous_block.depth
+            ):
+                before = before or 1
+
+        codes.append("\n" * before + block.code)
+        previous_block = block
+    return "".join(codes)
+
+
+def _emit_code(code: str) -> str:
+    """Same code as `_formate_code` gives, for the subset of python this package
+    generates. Raises UnsupportedCode on anything else."""
+
+    if not code.isascii():
+        # black measures the width of non ascii characters with its own table
+        raise UnsupportedCode("Non ascii code is not supported.")
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise UnsupportedCode(f"Could not parse code. {str(e)}")
+    logical_lines = _logical_lines(code)
+
+    index = 0
+    while index < len(tree.body) and isinstance(
+        tree.body[index], (ast.Import, ast.ImportFrom)
+    ):
+        index += 1
+    blocks = _import_blocks(tree.body[:index], 0)
+    for position, node in enumerate(tree.body[index:]):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            raise UnsupportedCode(f"Imports after code. {ast.dump(node)=}")
+        node_blocks = _statement_blocks(node, 0, logical_lines)
+        if position == 0 and blocks:
+            # isort sets the empty lines after the imports
+            node_blocks[0].blank_lines = (
+                2 if isinstance(node, STATEMENT_DECLARATIONS) else 1
+            )
+        blocks.extend(node_blocks)
+    return _join_blocks(blocks)
@@ -1,9 +1,21 @@
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from logging import Logger
 from pathlib import Path
 
-from db2model.models import TableDef
-from db2model.types import SqlDialect
+from db2model.models import TableIndexEntry
+from db2model.profiling import Profiler
+from db2model.types import Emitter, ModelStyle, SqlDialect
 
-from .utils import _formate_code, _python_table_name
+from .cache import FormatCache
+from .utils import (
+    _python_core_table_name,
+    _python_table_name,
+    _render_code,
+    _split_schema_tables,
+)
+from .writer import OutputWriter
 
 
 def _code_base_file() -> str:
@@ -18,28 +30,169 @@ def _code_base_file() -> str:
     )
 
 
-def _write_code_init_file(
-    folder_path: Path, lines_import: list[str], lines__all__: list[str]
-) -> None:
+def _code_core_base_file() -> str:
+    return "\n".join(
+        [
+            "from sqlalchemy import MetaData",
+            "",
+            "metadata = MetaData()",
+            "",
+        ]
+    )
+
+
+def _code_init_file(lines_import: list[str], lines__all__: list[str]) -> str:
     lines: list[str] = list()
     lines.extend(lines_import)
     lines.append("__all__ = [")
     lines.extend(lines__all__)
     lines.append("]")
-    with open(folder_path / "__init__.py", "w") as f:
-        f.write(_formate_code("\n".join(lines)))
+    return "\n".join(lines)
 
 
-def _generate_all_init_files(
-    python_rootpath: Path, tables_def: list[TableDef], sql_dialect: SqlDialect
+def _code_lazy_init_file(
+    lines_import: list[str], lines__all__: list[str], lines_getattr: list[str]
+) -> str:
+    """Init file importing its names on first access through a module __getattr__
+    (PEP 562), type checkers still seeing them through the TYPE_CHECKING block and
+    dir() through __dir__."""
+
+    lines: list[str] = [
+        "from importlib import import_module",
+        "from typing import TYPE_CHECKING",
+        "",
+        "if TYPE_CHECKING:",
+    ]
+    lines.extend(f"    {line}" for line in lines_import)
+    lines.append("__all__ = [")
+    lines.extend(lines__all__)
+    lines.append("]")
+    lines.extend(lines_getattr)
+    lines.extend(
+        [
+            "def __dir__() -> list[str]:",
+            "    return sorted(set(globals()) | set(__all__))",
+        ]
+    )
+    return "\n".join(lines)
+
+
+def _lines_schema_getattr() -> list[str]:
+    # Names are loaded by the database package, along with their related classes
+    return [
+        "def __getattr__(name: str):",
+        "    if name not in __all__:",
+        '        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")',
+        '    return getattr(import_module("..", __name__), name)',
+    ]
+
+
+def _lines_db_getattr(
+    name_to_module_map: dict[str, str], name_to_related_names_map: dict[str, list[str]]
+) -> list[str]:
+    """Loading a class also loads the classes its relationships refer to, as its
+    mapper cannot be configured without them."""
+
+    lines: list[str] = ["_NAME_TO_MODULE_MAP = {"]
+    lines.extend(
+        f'"{name}": "{module}",' for name, module in name_to_module_map.items()
+    )
+    lines.append("}")
+    lines.append("_NAME_TO_RELATED_NAMES_MAP = {")
+    for name, related_names in name_to_related_names_map.items():
+        quoted_related_names = ", ".join(
+            f'"{related_name}"' for related_name in related_names
+        )
+        lines.append(f'"{name}": [{quoted_related_names}],')
+    lines.append("}")
+    lines.extend(
+        [
+            "def __getattr__(name: str):",
+            "    if name not in _NAME_TO_MODULE_MAP:",
+            '        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")',
+            "    names_to_load = [name]",
+            "    while names_to_load:",
+            "        name_to_load = names_to_load.pop()",
+            "        if name_to_load not in globals():",
+            "            module = import_module(_NAME_TO_MODULE_MAP[name_to_load], __name__)",
+            "            globals()[name_to_load] = getattr(module, name_to_load)",
+            "            names_to_load.extend(_NAME_TO_RELATED_NAMES_MAP.get(name_to_load, []))",
+            "    return globals()[name]",
+        ]
+    )
+    return lines
+
+
+def _write_code_files(
+    filepath_to_code_map: dict[Path, str],
+    writer: OutputWriter,
+    emitter: Emitter,
+    format_cache: FormatCache | None,
+    executor: Executor | None,
+    profiler: Profiler,
+    db_name: str,
+    logger: Logger,
 ) -> None:
+    """Renders the codes, in parallel if an executor is given, and writes them
+    through `writer` in the order of the map."""
+
+    filepaths = list(filepath_to_code_map.keys())
+    codes = list(filepath_to_code_map.values())
+    formatted_codes: list[str] | None = None
+    with profiler.phase("render", db_name) as record:
+        record.item_count = len(codes)
+        if executor is not None:
+            try:
+                formatted_codes = list(
+                    executor.map(
+                        _render_code,
+                        codes,
+                        repeat(emitter),
+                        repeat(format_cache),
+                        chunksize=max(1, len(codes) // 64),
+                    )
+                )
+            except BrokenProcessPool as e:
+                logger.warning(
+                    f"Formatting workers are unavailable, formatting serially. {str(e)}"
+                )
+        if formatted_codes is None:
+            formatted_codes = [
+                _render_code(code, emitter, format_cache) for code in codes
+            ]
+
+    with profiler.phase("write", db_name) as record:
+        record.item_count = len(filepaths)
+        writer.write(dict(zip(filepaths, formatted_codes)))
+
+
+def _generate_all_init_files(
+    python_rootpath: Path,
+    tables_index: list[TableIndexEntry],
+    sql_dialect: SqlDialect,
+    lazy: bool,
+    record_classes: bool = False,
+    model_style: ModelStyle = ModelStyle.ORM,
+    schema_modules: bool = False,
+    tables_per_module: int = 0,
+) -> dict[Path, str]:
+    """filepath -> code of every __init__.py file, exporting the record classes of
+    the models along with them if `record_classes`.
+
+    Schemas are packages of a module per table, unless `schema_modules`. They are
+    then modules of their own, only the database getting an __init__.py, or
+    packages of modules of `tables_per_module` tables if given.
+    """
+
+    filepath_to_code_map: dict[Path, str] = dict()
     match sql_dialect:
         case SqlDialect.POSTGRESQL:
             db_to_schema_to_tables_map: dict[str, dict[str, list[str]]] = dict()
-            for table_def in tables_def:
-                db_name = table_def.db_name
-                schema_name = table_def.schema_name
-                table_name = table_def.table_name
+            name_to_related_names_map: dict[str, list[str]] = dict()
+            for table_index_entry in tables_index:
+                db_name = table_index_entry.db_name
+                schema_name = table_index_entry.schema_name
+                table_name = table_index_entry.table_name
                 if not schema_name:
                     raise ValueError(
                         f"Postgresql tables should have schema defined, {db_name=}, {schema_name=}, {table_name=}."
@@ -47,10 +200,15 @@ def _generate_all_init_files(
                 db_to_schema_to_tables_map.setdefault(db_name, dict()).setdefault(
                     schema_name, list()
                 ).append(table_name)
+                python_table_name = _python_table_name(table_name)
+                name_to_related_names_map[python_table_name] = (
+                    table_index_entry.related_python_table_names
+                )
 
             for db_name, schema_to_tables_map in db_to_schema_to_tables_map.items():
                 lines_db_import: list[str] = list()
                 lines_db__all__: list[str] = list()
+                name_to_module_map: dict[str, str] = dict()
                 for schema_name, tables_name in schema_to_tables_map.items():
                     if not tables_name:
                         continue
@@ -59,36 +217,79 @@ def _generate_all_init_files(
 
                     lines_schema_import: list[str] = list()
                     lines_schema__all__: list[str] = list()
-                    for table_name in tables_name:
-                        python_table_name = _python_table_name(table_name)
-                        lines_db_import.append(f"{python_table_name},")
-                        lines_db__all__.append(f'"{python_table_name}",')
-                        lines_schema_import.append(
-                            f"from .{table_name} import {python_table_name}"
+                    modules: list[tuple[str | None, list[str]]] = (
+                        _split_schema_tables(
+                            schema_name, tables_name, tables_per_module
                         )
-                        lines_schema__all__.append(f'"{python_table_name}",')
+                        if schema_modules
+                        else [(table_name, [table_name]) for table_name in tables_name]
+                    )
+                    for module_name, module_tables_name in modules:
+                        names: list[str] = list()
+                        for table_name in module_tables_name:
+                            python_table_name = _python_table_name(table_name)
+                            match model_style:
+                                case ModelStyle.ORM:
+                                    names.append(python_table_name)
+                                case ModelStyle.CORE:
+                                    names.append(_python_core_table_name(table_name))
+                                case _:
+                                    raise ValueError(
+                                        f"No support yet for the {model_style=}"
+                                    )
+                            if record_classes:
+                                names.append(f"{python_table_name}Record")
+                        if module_name is not None:
+                            lines_schema_import.append(
+                                f"from .{module_name} import {', '.join(names)}"
+                            )
+                        for name in names:
+                            lines_db_import.append(f"{name},")
+                            lines_db__all__.append(f'"{name}",')
+                            lines_schema__all__.append(f'"{name}",')
+                            name_to_module_map[name] = f".{schema_name}" + (
+                                f".{module_name}" if module_name is not None else ""
+                            )
 
                     lines_db_import.append(f")")
 
+                    # Schema being a module of its own
+                    if not lines_schema_import:
+                        continue
                     folder_path = python_rootpath / db_name / schema_name
-                    folder_path.mkdir(parents=True, exist_ok=True)
-                    _write_code_init_file(
-                        folder_path,
-                        lines_schema_import,
-                        lines_schema__all__,
+                    filepath_to_code_map[folder_path / "__init__.py"] = (
+                        _code_lazy_init_file(
+                            lines_schema_import,
+                            lines_schema__all__,
+                            _lines_schema_getattr(),
+                        )
+                        if lazy
+                        else _code_init_file(lines_schema_import, lines_schema__all__)
                     )
 
                 if not lines_db_import:
-                    return
+                    return filepath_to_code_map
 
                 folder_path = python_rootpath / db_name
-                folder_path.mkdir(parents=True, exist_ok=True)
-                _write_code_init_file(
-                    folder_path,
-                    lines_db_import,
-                    lines_db__all__,
+                filepath_to_code_map[folder_path / "__init__.py"] = (
+                    _code_lazy_init_file(
+                        lines_db_import,
+                        lines_db__all__,
+                        _lines_db_getattr(
+                            name_to_module_map,
+                            {
+                                name: related_names
+                                for name, related_names in name_to_related_names_map.items()
+                                if related_names and name in name_to_module_map
+                            },
+                        ),
+                    )
+                    if lazy
+                    else _code_init_file(lines_db_import, lines_db__all__)
                 )
 
+            return filepath_to_code_map
+
         case _:
             raise ValueError(
                 f"No support yet for the {settings.db_settings.sql_dialect=}"
@@ -0,0 +1,319 @@
+import hashlib
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from logging import Logger
+from pathlib import Path
+
+from sqlalchemy import Connection, text
+
+from db2model.config import Db2ModelSettings
+from db2model.models import DbManifest, Manifest
+from db2model.profiling import Profiler
+from db2model.types import SqlDialect
+
+from .connections import ConnectionPool
+
+# One md5 per schema over every catalog row the generated models depend on.
+# Domains and composite types come with their base type and attributes, the
+# constraints of domains being rows of pg_constraint as those of tables.
+POSTGRESQL_FINGERPRINT_QUERY = """
+SELECT n.nspname, md5(string_agg(rows.line, E'\\n' ORDER BY rows.line))
+FROM pg_catalog.pg_namespace n
+JOIN (
+    SELECT c.relnamespace AS nsp,
+        concat_ws(':', 'r', c.relname, c.relkind, obj_description(c.oid, 'pg_class')) AS line
+    FROM pg_catalog.pg_class c
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+    UNION ALL
+    SELECT c.relnamespace,
+        concat_ws(
+            ':', 'a', c.relname, a.attnum, a.attname,
+            format_type(a.atttypid, a.atttypmod), a.attnotnull, a.attidentity,
+            a.attgenerated, pg_get_expr(d.adbin, d.adrelid), col_description(c.oid, a.attnum)
+        )
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND a.attnum > 0 AND NOT a.attisdropped
+    UNION ALL
+    SELECT con.connamespace,
+        concat_ws(
+            ':', 'c', con.conrelid::regclass::text, con.conname,
+            pg_get_constraintdef(con.oid), obj_description(con.oid, 'pg_constraint')
+        )
+    FROM pg_catalog.pg_constraint con
+    UNION ALL
+    SELECT c.relnamespace, concat_ws(':', 'i', c.relname, pg_get_indexdef(c.oid))
+    FROM pg_catalog.pg_class c
+    WHERE c.relkind IN ('i', 'I')
+    UNION ALL
+    SELECT t.typnamespace, concat_ws(':', 'e', t.typname, e.enumsortorder, e.enumlabel)
+    FROM pg_catalog.pg_type t
+    JOIN pg_catalog.pg_enum e ON e.enumtypid = t.oid
+    UNION ALL
+    SELECT t.typnamespace,
+        concat_ws(
+            ':', 't', t.typname, t.typtype, format_type(t.typbasetype, t.typtypmod),
+            t.typnotnull, t.typdefault, a.attnum, a.attname,
+            format_type(a.atttypid, a.atttypmod)
+        )
+    FROM pg_catalog.pg_type t
+    LEFT JOIN pg_catalog.pg_class c ON c.oid = t.typrelid
+    LEFT JOIN pg_catalog.pg_attribute a
+        ON a.attrelid = t.typrelid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE t.typtype = 'd' OR c.relkind = 'c'
+) rows ON rows.nsp = n.oid
+WHERE n.nspname NOT LIKE 'pg\\_%' AND n.nspname <> 'information_schema'
+GROUP BY n.nspname
+"""
+
+# Same rows grouped by table, objects not tied to a table such as enums being
+# grouped under an empty table name.
+POSTGRESQL_TABLE_FINGERPRINT_QUERY = """
+SELECT n.nspname, rows.relname, md5(string_agg(rows.line, E'\\n' ORDER BY rows.line))
+FROM pg_catalog.pg_namespace n
+JOIN (
+    SELECT c.relnamespace AS nsp, c.relname,
+        concat_ws(':', 'r', c.relname, c.relkind, obj_description(c.oid, 'pg_class')) AS line
+    FROM pg_catalog.pg_class c
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+    UNION ALL
+    SELECT c.relnamespace, c.relname,
+        concat_ws(
+            ':', 'a', c.relname, a.attnum, a.attname,
+            format_type(a.atttypid, a.atttypmod), a.attnotnull, a.attidentity,
+            a.attgenerated, pg_get_expr(d.adbin, d.adrelid), col_description(c.oid, a.attnum)
+        )
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND a.attnum > 0 AND NOT a.attisdropped
+    UNION ALL
+    SELECT con.connamespace, coalesce(c.relname, ''),
+        concat_ws(
+            ':', 'c', con.conrelid::regclass::text, con.conname,
+            pg_get_constraintdef(con.oid), obj_description(con.oid, 'pg_constraint')
+        )
+    FROM pg_catalog.pg_constraint con
+    LEFT JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+    UNION ALL
+    SELECT c.relnamespace, t.relname, concat_ws(':', 'i', c.relname, pg_get_indexdef(c.oid))
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_index i ON i.indexrelid = c.oid
+    JOIN pg_catalog.pg_class t ON t.oid = i.indrelid
+    WHERE c.relkind IN ('i', 'I')
+    UNION ALL
+    SELECT t.typnamespace, '', concat_ws(':', 'e', t.typname, e.enumsortorder, e.enumlabel)
+    FROM pg_catalog.pg_type t
+    JOIN pg_catalog.pg_enum e ON e.enumtypid = t.oid
+    UNION ALL
+    SELECT t.typnamespace, '',
+        concat_ws(
+            ':', 't', t.typname, t.typtype, format_type(t.typbasetype, t.typtypmod),
+            t.typnotnull, t.typdefault, a.attnum, a.attname,
+            format_type(a.atttypid, a.atttypmod)
+        )
+    FROM pg_catalog.pg_type t
+    LEFT JOIN pg_catalog.pg_class c ON c.oid = t.typrelid
+    LEFT JOIN pg_catalog.pg_attribute a
+        ON a.attrelid = t.typrelid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE t.typtype = 'd' OR c.relkind = 'c'
+) rows ON rows.nsp = n.oid
+WHERE n.nspname NOT LIKE 'pg\\_%' AND n.nspname <> 'information_schema'
+GROUP BY n.nspname, rows.relname
+"""
+
+POSTGRESQL_FOREIGN_KEY_QUERY = """
+SELECT sn.nspname, s.relname, tn.nspname, t.relname
+FROM pg_catalog.pg_constraint con
+JOIN pg_catalog.pg_class s ON s.oid = con.conrelid
+JOIN pg_catalog.pg_namespace sn ON sn.oid = s.relnamespace
+JOIN pg_catalog.pg_class t ON t.oid = con.confrelid
+JOIN pg_catalog.pg_namespace tn ON tn.oid = t.relnamespace
+WHERE con.contype = 'f'
+"""
+
+
+def _get_schema_fingerprints(
+    connection: Connection, sql_dialect: SqlDialect
+) -> dict[str, str]:
+    """schema_name -> fingerprint, for every schema of the database.
+
+    Every schema is covered since tables of the requested schemas can be related
+    to tables of any other one.
+    """
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            rows = connection.execute(text(POSTGRESQL_FINGERPRINT_QUERY))
+            return {schema_name: fingerprint for schema_name, fingerprint in rows}
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+def _get_table_fingerprints(
+    connection: Connection, sql_dialect: SqlDialect
+) -> dict[tuple[str, str], str]:
+    """(schema_name, table_name) -> fingerprint, table_name being empty for the
+    objects of the schema not tied to a table."""
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            rows = connection.execute(text(POSTGRESQL_TABLE_FINGERPRINT_QUERY))
+            return {
+                (schema_name, table_name): fingerprint
+                for schema_name, table_name, fingerprint in rows
+            }
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+def _get_foreign_key_edges(
+    connection: Connection, sql_dialect: SqlDialect
+) -> set[tuple[tuple[str, str], tuple[str, str]]]:
+    """((schema_name, table_name), (referred_schema_name, referred_table_name)) of
+    every foreign key"""
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            rows = connection.execute(text(POSTGRESQL_FOREIGN_KEY_QUERY))
+            return {
+                ((schema_name, table_name), (referred_schema_name, referred_table_name))
+                for schema_name, table_name, referred_schema_name, referred_table_name in rows
+            }
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+def _get_settings_hash(settings: Db2ModelSettings) -> str:
+    try:
+        db2model_version = version("db2model")
+    except PackageNotFoundError:
+        db2model_version = "unknown"
+    dumped_settings = settings.model_dump_json(
+        exclude={
+            "db_settings": {
+                "user",
+                "password",
+                "host",
+                "port",
+                "max_connections",
+                "statement_timeout_ms",
+                "lock_timeout_ms",
+                "application_name",
+                "read_only",
+                "repeatable_read",
+                "retry_count",
+                "retry_backoff_seconds",
+            },
+            "jobs": True,
+            "format_jobs": True,
+            "skip_unchanged": True,
+            "format_cache_max_size": True,
+            "emitter": True,
+            "stream_chunk_size": True,
+        }
+    )
+    return hashlib.sha256(
+        (db2model_version + dumped_settings).encode("utf-8")
+    ).hexdigest()
+
+
+def _load_manifest(filepath: Path) -> Manifest:
+    if not filepath.exists():
+        return Manifest()
+    try:
+        return Manifest.model_validate_json(filepath.read_text())
+    except ValueError:
+        return Manifest()
+
+
+def _write_manifest(filepath: Path, manifest: Manifest) -> None:
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w") as f:
+        f.write(manifest.model_dump_json(indent=2))
+
+
+def _merge_manifest(
+    manifest: Manifest,
+    generated_db_names: list[str],
+    db_to_manifest_map: dict[str, DbManifest],
+) -> Manifest:
+    """Manifest after generating `generated_db_names`. Databases of other runs, and
+    failed ones, keep their entries, the generated ones without fingerprint being
+    dropped so that the next run skipping unchanged catalogs generates them again."""
+
+    merged_db_to_manifest_map = {
+        db_name: db_manifest
+        for db_name, db_manifest in manifest.db_to_manifest_map.items()
+        if db_name not in generated_db_names
+    }
+    merged_db_to_manifest_map.update(
+        {
+            db_name: db_manifest
+            for db_name, db_manifest in db_to_manifest_map.items()
+            if db_name in generated_db_names
+        }
+    )
+    return Manifest(db_to_manifest_map=merged_db_to_manifest_map)
+
+
+def _get_db_manifests(
+    settings: Db2ModelSettings,
+    pool: ConnectionPool,
+    profiler: Profiler,
+    logger: Logger,
+) -> dict[str, DbManifest]:
+    """db_name -> manifest describing the current state of its catalog"""
+
+    settings_hash = _get_settings_hash(settings)
+    db_to_manifest_map: dict[str, DbManifest] = dict()
+    for db_name in settings.db_names:
+        logger.info(f"Computing catalog fingerprint of {db_name=}.")
+        with profiler.phase("fingerprint", db_name) as record:
+            schema_to_fingerprint_map = pool.run(
+                db_name,
+                partial(
+                    _get_schema_fingerprints,
+                    sql_dialect=settings.db_settings.sql_dialect,
+                ),
+            )
+            record.item_count = len(schema_to_fingerprint_map)
+        db_to_manifest_map[db_name] = DbManifest(
+            settings_hash=settings_hash,
+            schema_to_fingerprint_map=schema_to_fingerprint_map,
+        )
+    return db_to_manifest_map
+
+
+def _get_changed_db_names(
+    manifest: Manifest,
+    db_to_manifest_map: dict[str, DbManifest],
+    python_rootpath: Path,
+    logger: Logger,
+) -> list[str]:
+    changed_db_names: list[str] = list()
+    for db_name, db_manifest in db_to_manifest_map.items():
+        previous_db_manifest = manifest.db_to_manifest_map.get(db_name)
+        if previous_db_manifest is None or not (python_rootpath / db_name).exists():
+            changed_db_names.append(db_name)
+            continue
+        if previous_db_manifest.settings_hash != db_manifest.settings_hash:
+            logger.info(f"Settings changed since last generation of {db_name=}.")
+            changed_db_names.append(db_name)
+            continue
+        changed_schema_names = sorted(
+            schema_name
+            for schema_name in (
+                db_manifest.schema_to_fingerprint_map.keys()
+                | previous_db_manifest.schema_to_fingerprint_map.keys()
+            )
+            if db_manifest.schema_to_fingerprint_map.get(schema_name)
+            != previous_db_manifest.schema_to_fingerprint_map.get(schema_name)
+        )
+        if changed_schema_names:
+            logger.info(f"Catalog changed in {db_name=}, {changed_schema_names=}.")
+            changed_db_names.append(db_name)
+            continue
+        logger.info(f"Catalog unchanged in {db_name=}, skipping.")
+    return changed_db_names
@@ -1,126 +1,768 @@
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
 from logging import Logger
+from pathlib import Path
 
-from db2model.config import Db2ModelSettings
-from db2model.models import TableDef
-from db2model.types import Language, SqlDialect
+from db2model.config import Db2ModelSettings, TableFilter
+from db2model.models import DbManifest, Snapshot, TableDef, TableIndexEntry
+from db2model.profiling import Profiler
+from db2model.types import Language, ModelStyle, SqlDialect
 
-from .files import _code_base_file, _generate_all_init_files
-from .parser import _parse_file
-from .raw import _run_sqlacodegen
+from .bulk import (
+    _code_bulk_base_file,
+    _get_bulk_table_code,
+    _get_db_serial_columns,
+    _get_serial_columns,
+)
+from .cache import FormatCache
+from .connections import ConnectionPool, _get_connection_pool
+from .constants import (
+    CORE_IMPORTS_RAW_TEXT,
+    LOOKUP_HELPERS_IMPORTS_RAW_TEXT,
+    RECORD_IMPORTS_RAW_TEXT,
+)
+from .core import _get_core_module_code
+from .files import (
+    _code_base_file,
+    _code_core_base_file,
+    _generate_all_init_files,
+    _write_code_files,
+)
+from .fingerprint import (
+    _get_changed_db_names,
+    _get_db_manifests,
+    _load_manifest,
+    _merge_manifest,
+    _write_manifest,
+)
+from .parser import _parse_code, _parse_imports
+from .raw import (
+    _generate_raw_code,
+    _get_schema_names,
+    _get_table_chunks,
+    _raise_failed_dbs,
+    _run_sqlacodegen,
+)
+from .statistics import _get_db_row_estimates, _get_row_estimates
 from .table import (
     _fill_table_imports,
-    _fusion_tables,
+    _get_module_code,
     _get_python_name_to_table_def_map,
-    _get_table_code,
-    _group_table_per_name,
+    _get_table_index_entry,
     _set_table_default_none,
     _set_table_inits_false,
+    _set_table_lazy,
+)
+from .utils import (
+    _check_emitter,
+    _check_stream,
+    _db_package_prefix,
+    _formatter_key,
+    _has_schema_modules,
+    _join_imports_raw_text,
+    _python_table_name,
+    _render_code,
+    _split_schema_tables,
 )
-from .utils import _formate_code, _join_imports_raw_text
+from .writer import OutputWriter
 
 
-def generate_python_models(settings: Db2ModelSettings, logger: Logger) -> None:
-    _run_sqlacodegen(settings, logger)
-    with open(settings.path_settings.python_path / "base.py", "w") as f:
-        f.write(_formate_code(_code_base_file()))
+def _get_generated_python_table_names(
+    tables_def: list[TableDef], table_filter: TableFilter
+) -> set[str]:
+    """Python names of the tables included by `table_filter` and of the ones their
+    relationships refer to, transitively, as their models cannot be mapped
+    without them."""
 
-    for db_name in settings.db_names:
-        imports_raw_texts: set[str] = {"from typing import TYPE_CHECKING"}
-        db_tables_def: list[TableDef] = list()
+    python_name_to_table_def_map = _get_python_name_to_table_def_map(tables_def)
+    python_table_names = {
+        python_table_name
+        for python_table_name, table_def in python_name_to_table_def_map.items()
+        if table_filter.is_table_included(table_def.schema_name, table_def.table_name)
+    }
+    python_table_names_to_visit = list(python_table_names)
+    while python_table_names_to_visit:
+        table_def = python_name_to_table_def_map[python_table_names_to_visit.pop()]
+        for relationship in table_def.relationships:
+            target_python_table_name = relationship.target_python_table_name
+            if (
+                target_python_table_name in python_name_to_table_def_map
+                and target_python_table_name not in python_table_names
+            ):
+                python_table_names.add(target_python_table_name)
+                python_table_names_to_visit.append(target_python_table_name)
+    return python_table_names
 
-        match settings.db_settings.sql_dialect:
-            case SqlDialect.POSTGRESQL:
-                imports_raw_texts.add("from ...base import Base")
-                for schema_name in settings.db_to_schemas.get(db_name, list()):
-                    if schema_name in settings.globally_ignored_schemas:
-                        logger.info(f"Ignoring schema {schema_name=}.")
-                        continue
 
-                    raw_filepath = settings.path_settings.raw_filepath(
-                        Language.PYTHON,
-                        settings.db_settings.sql_dialect,
-                        db_name,
-                        schema_name,
+def _get_db_tables_def(
+    settings: Db2ModelSettings,
+    db_name: str,
+    raw_code: str,
+    table_filter: TableFilter | None,
+    profiler: Profiler,
+    logger: Logger,
+) -> tuple[dict[str, list[tuple[str | None, str]]], list[TableDef]] | None:
+    """(name_to_imports_map, tables_def) of the tables to generate, None if there
+    are none. Every parsed table is generated without `table_filter`, as when its
+    tables were already picked."""
+
+    imports_raw_texts: set[str] = {"from typing import TYPE_CHECKING"}
+    db_tables_def: list[TableDef] = list()
+
+    match settings.db_settings.sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            match settings.model_style:
+                case ModelStyle.ORM:
+                    imports_raw_texts.add(
+                        f"from {_db_package_prefix(settings)}.base import Base"
+                    )
+                case ModelStyle.CORE:
+                    imports_raw_texts.add(CORE_IMPORTS_RAW_TEXT)
+                    imports_raw_texts.add(
+                        f"from {_db_package_prefix(settings)}.base import metadata"
+                    )
+                case _:
+                    raise ValueError(f"No support yet for the {settings.model_style=}")
+            if settings.record_classes:
+                imports_raw_texts.add(RECORD_IMPORTS_RAW_TEXT)
+            if settings.lookup_helpers:
+                imports_raw_texts.add(LOOKUP_HELPERS_IMPORTS_RAW_TEXT)
+            with profiler.phase("parse", db_name) as record:
+                parsed_code = _parse_code(
+                    raw_code,
+                    db_name,
+                    settings.db_settings.sql_dialect,
+                    logger,
+                    settings.model_style,
+                )
+                record.item_count = len(parsed_code[1]) if parsed_code else 0
+            if parsed_code is None:
+                logger.info(f"No tables found in {db_name=}, skipping.")
+                return None
+            imports_raw_text, tables_def = parsed_code
+
+            generated_python_table_names = (
+                _get_generated_python_table_names(tables_def, table_filter)
+                if table_filter is not None
+                else None
+            )
+            for table_def in tables_def:
+                if (
+                    generated_python_table_names is not None
+                    and _python_table_name(table_def.table_name)
+                    not in generated_python_table_names
+                ):
+                    logger.info(
+                        f"Ignoring table {table_def.schema_name=}, {table_def.table_name=}."
+                    )
+                    continue
+                db_tables_def.append(table_def)
+
+            if not db_tables_def:
+                logger.info(f"All tables were ignored for {db_name=}.")
+                return None
+
+            imports_raw_texts.add(imports_raw_text)
+        case _:
+            raise ValueError(
+                f"No support yet for the {settings.db_settings.sql_dialect=}"
+            )
+
+    return (
+        _parse_imports(_join_imports_raw_text(imports_raw_texts)),
+        db_tables_def,
+    )
+
+
+def _get_schema_to_tables_def_map(
+    tables_def: Iterable[TableDef],
+) -> dict[str | None, list[TableDef]]:
+    schema_to_tables_def_map: dict[str | None, list[TableDef]] = dict()
+    for table_def in tables_def:
+        schema_to_tables_def_map.setdefault(table_def.schema_name, list()).append(
+            table_def
+        )
+    return schema_to_tables_def_map
+
+
+def _get_tables_codes(
+    settings: Db2ModelSettings,
+    db_name: str,
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]],
+    python_name_to_table_def_map: dict[str, TableDef],
+    tables_def: list[TableDef],
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] | None,
+    schema_to_table_to_serial_column_names_map: dict[str, dict[str, list[str]]] | None,
+    profiler: Profiler,
+) -> dict[Path, str]:
+    """filepath -> unformatted code of the files of `tables_def`, whose
+    relationships are looked up in `python_name_to_table_def_map`.
+
+    Relationships get their loader strategy from the row estimates if given. With
+    schema modules, `tables_def` holds every table of their schemas. The serial
+    columns are needed by the bulk modules only.
+    """
+
+    if settings.model_style == ModelStyle.CORE and (
+        settings.lookup_helpers
+        or settings.lazy_from_statistics
+        or settings.relationship_to_lazy_map
+    ):
+        raise ValueError(
+            "Lookup helpers and relationship loader strategies need the ORM models."
+        )
+    if settings.bulk_modules and schema_to_table_to_serial_column_names_map is None:
+        raise ValueError("Bulk modules need the serial columns of the tables.")
+
+    sql_dialect = settings.db_settings.sql_dialect
+    db_package_prefix = _db_package_prefix(settings)
+    # (package, module_name) of every table, relative to the database package, for
+    # schema modules to import the ones their tables refer to
+    key_to_module_map: dict[tuple[str, str], tuple[str, str]] | None = None
+    if _has_schema_modules(settings):
+        key_to_module_map = dict()
+        for schema_name, schema_tables_def in _get_schema_to_tables_def_map(
+            python_name_to_table_def_map.values()
+        ).items():
+            for module_name, module_tables_def in _split_schema_tables(
+                schema_name or "", schema_tables_def, settings.tables_per_module
+            ):
+                for table_def in module_tables_def:
+                    key_to_module_map[(schema_name or "", table_def.table_name)] = (
+                        ("", schema_name or "")
+                        if module_name is None
+                        else (schema_name or "", module_name)
                     )
 
-                    parsed_file = _parse_file(
-                        raw_filepath, db_name, settings.db_settings.sql_dialect
+    filepath_to_code_map: dict[Path, str] = dict()
+    for schema_name, schema_tables_def in _get_schema_to_tables_def_map(
+        tables_def
+    ).items():
+        with profiler.phase("transform", db_name, schema_name) as record:
+            record.item_count = len(schema_tables_def)
+            if settings.model_style == ModelStyle.ORM:
+                for table_def in schema_tables_def:
+                    _fill_table_imports(table_def, python_name_to_table_def_map)
+                    _set_table_inits_false(table_def, settings.init_false_column_names)
+                    _set_table_default_none(table_def)
+                    _set_table_lazy(
+                        table_def,
+                        python_name_to_table_def_map,
+                        schema_to_table_to_row_estimate_map,
+                        settings.relationship_to_lazy_map,
                     )
-                    if parsed_file is None:
-                        logger.info(
-                            f"No tables found in {db_name=}, {schema_name=}, skipping."
+
+                    if (
+                        settings.record_classes
+                        and f"{_python_table_name(table_def.table_name)}Record"
+                        in python_name_to_table_def_map
+                    ):
+                        raise ValueError(
+                            f"Record class named as another table. {table_def.table_name=}"
+                        )
+
+            if _has_schema_modules(settings):
+                filepath_to_tables_def_map = {
+                    settings.path_settings.schema_filepath(
+                        language=Language.PYTHON,
+                        sql_dialect=sql_dialect,
+                        db_name=db_name,
+                        schema_name=schema_name,
+                        module_name=module_name,
+                    ): module_tables_def
+                    for module_name, module_tables_def in _split_schema_tables(
+                        schema_name or "",
+                        schema_tables_def,
+                        settings.tables_per_module,
+                    )
+                }
+            else:
+                filepath_to_tables_def_map = {
+                    settings.path_settings.table_filepath(
+                        language=Language.PYTHON,
+                        sql_dialect=sql_dialect,
+                        db_name=db_name,
+                        table_name=table_def.table_name,
+                        schema_name=table_def.schema_name,
+                    ): [table_def]
+                    for table_def in schema_tables_def
+                }
+
+            for filepath, module_tables_def in filepath_to_tables_def_map.items():
+                match settings.model_style:
+                    case ModelStyle.ORM:
+                        filepath_to_code_map[filepath] = _get_module_code(
+                            name_to_imports_map,
+                            module_tables_def,
+                            sql_dialect,
+                            settings.record_classes,
+                            settings.lookup_helpers,
+                            db_package_prefix,
+                            key_to_module_map,
                         )
-                        continue
-                    imports_raw_text, tables_def = parsed_file
-
-                    final_tables_def: list[TableDef] = list()
-                    for table_def in tables_def:
-                        if (
-                            (table_def.table_name in settings.globally_ignored_tables)
-                            or (
-                                table_def.table_name
-                                in settings.db_to_ignored_tables_map.get(
-                                    db_name, list()
-                                )
-                            )
-                            or (
-                                table_def.table_name
-                                in settings.db_to_schemas_to_ignored_tables_map.get(
-                                    db_name, dict()
-                                ).get(schema_name, list())
-                            )
-                        ):
-                            logger.info(
-                                f"Ignoring table {schema_name=}, {table_def.table_name=}."
-                            )
-                            continue
-                        final_tables_def.append(table_def)
-
-                    if not final_tables_def:
-                        logger.info(f"All tables were ignores for {schema_name=}.")
-                        continue
-
-                    imports_raw_texts.add(imports_raw_text)
-                    db_tables_def.extend(final_tables_def)
-            case _:
-                raise ValueError(
-                    f"No support yet for the {settings.db_settings.sql_dialect=}"
+                    case ModelStyle.CORE:
+                        filepath_to_code_map[filepath] = _get_core_module_code(
+                            name_to_imports_map,
+                            module_tables_def,
+                            key_to_module_map or dict(),
+                            sql_dialect,
+                            settings.record_classes,
+                            db_package_prefix,
+                        )
+                    case _:
+                        raise ValueError(
+                            f"No support yet for the {settings.model_style=}"
+                        )
+
+            if settings.bulk_modules:
+                for table_def in schema_tables_def:
+                    filepath_to_code_map[
+                        settings.path_settings.bulk_table_filepath(
+                            sql_dialect=sql_dialect,
+                            db_name=db_name,
+                            table_name=table_def.table_name,
+                            schema_name=table_def.schema_name,
+                        )
+                    ] = _get_bulk_table_code(
+                        name_to_imports_map,
+                        table_def,
+                        (schema_to_table_to_serial_column_names_map or dict())
+                        .get(schema_name or "", dict())
+                        .get(table_def.table_name, list()),
+                        sql_dialect,
+                        settings.model_style,
+                    )
+
+    return filepath_to_code_map
+
+
+def _get_init_codes(
+    settings: Db2ModelSettings, tables_index: list[TableIndexEntry]
+) -> dict[Path, str]:
+    """filepath -> unformatted code of the __init__.py files of the tables"""
+
+    return _generate_all_init_files(
+        settings.path_settings.python_path,
+        tables_index,
+        settings.db_settings.sql_dialect,
+        settings.lazy_init_files,
+        settings.record_classes,
+        settings.model_style,
+        _has_schema_modules(settings),
+        settings.tables_per_module,
+    )
+
+
+def _get_db_codes(
+    settings: Db2ModelSettings,
+    db_name: str,
+    raw_code: str,
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] | None,
+    schema_to_table_to_serial_column_names_map: dict[str, dict[str, list[str]]] | None,
+    profiler: Profiler,
+    logger: Logger,
+) -> dict[Path, str]:
+    """filepath -> unformatted code of every file generated for the database"""
+
+    db_tables = _get_db_tables_def(
+        settings,
+        db_name,
+        raw_code,
+        settings.table_filter(db_name),
+        profiler,
+        logger,
+    )
+    if db_tables is None:
+        return dict()
+    name_to_imports_map, db_tables_def = db_tables
+    filepath_to_code_map = _get_init_codes(
+        settings, [_get_table_index_entry(table_def) for table_def in db_tables_def]
+    )
+    filepath_to_code_map.update(
+        _get_tables_codes(
+            settings,
+            db_name,
+            name_to_imports_map,
+            _get_python_name_to_table_def_map(db_tables_def),
+            db_tables_def,
+            schema_to_table_to_row_estimate_map,
+            schema_to_table_to_serial_column_names_map,
+            profiler,
+        )
+    )
+    return filepath_to_code_map
+
+
+def _generate_db_models_by_chunks(
+    settings: Db2ModelSettings,
+    db_name: str,
+    schema_names: list[str],
+    pool: ConnectionPool,
+    writer: OutputWriter,
+    format_cache: FormatCache | None,
+    format_executor: Executor | None,
+    profiler: Profiler,
+    logger: Logger,
+) -> None:
+    """Generates the tables `settings.stream_chunk_size` at a time, from reflection
+    to writing, keeping only their index in memory for the __init__.py files.
+
+    With schema modules, tables are kept until every chunk is parsed, their
+    schemas being written at once.
+    """
+
+    # Not retried as a whole, chunks being written as soon as generated
+    with pool.connect(db_name) as connection:
+        with profiler.phase("plan_chunks", db_name) as record:
+            chunks = _get_table_chunks(
+                connection,
+                schema_names,
+                # As the declarative generator does
+                views=True,
+                chunk_size=settings.stream_chunk_size,
+                sql_dialect=settings.db_settings.sql_dialect,
+                table_filter=settings.table_filter(db_name),
+            )
+            record.item_count = len(chunks)
+        schema_to_table_to_row_estimate_map = (
+            _get_row_estimates(connection, settings.db_settings.sql_dialect)
+            if settings.lazy_from_statistics
+            else None
+        )
+        schema_to_table_to_serial_column_names_map = (
+            _get_serial_columns(connection, settings.db_settings.sql_dialect)
+            if settings.bulk_modules
+            else None
+        )
+
+        tables_index: list[TableIndexEntry] = list()
+        schema_name_to_imports_map: dict[str, list[tuple[str | None, str]]] = dict()
+        schema_tables_def: list[TableDef] = list()
+        for index, (
+            table_keys,
+            schema_to_table_names_map,
+            schema_to_key_table_names_map,
+        ) in enumerate(chunks):
+            logger.info(
+                f"Generating chunk {index + 1}/{len(chunks)} of {db_name=}, {len(table_keys)} tables."
+            )
+            db_tables = _get_db_tables_def(
+                settings,
+                db_name,
+                _generate_raw_code(
+                    connection,
+                    db_name,
+                    list(schema_to_table_names_map),
+                    profiler,
+                    schema_to_table_names_map,
+                    schema_to_key_table_names_map=schema_to_key_table_names_map,
+                ),
+                None,
+                profiler,
+                logger,
+            )
+            if db_tables is None:
+                continue
+            name_to_imports_map, tables_def = db_tables
+            chunk_tables_def = [
+                table_def
+                for table_def in tables_def
+                if (table_def.schema_name, table_def.table_name) in table_keys
+            ]
+            if _has_schema_modules(settings):
+                schema_name_to_imports_map.update(name_to_imports_map)
+                schema_tables_def.extend(chunk_tables_def)
+            else:
+                _write_code_files(
+                    _get_tables_codes(
+                        settings,
+                        db_name,
+                        name_to_imports_map,
+                        _get_python_name_to_table_def_map(tables_def),
+                        chunk_tables_def,
+                        schema_to_table_to_row_estimate_map,
+                        schema_to_table_to_serial_column_names_map,
+                        profiler,
+                    ),
+                    writer,
+                    settings.emitter,
+                    format_cache,
+                    format_executor,
+                    profiler,
+                    db_name,
+                    logger,
                 )
+            tables_index.extend(
+                _get_table_index_entry(table_def) for table_def in chunk_tables_def
+            )
 
-        final_imports_raw_text = _join_imports_raw_text(imports_raw_texts)
-        name_to_tables_def_map = _group_table_per_name(db_tables_def)
-        db_all_tables_def = [
-            _fusion_tables(tn, td) for tn, td in name_to_tables_def_map.items()
-        ]
-        python_name_to_table_def_map = _get_python_name_to_table_def_map(
-            db_all_tables_def
+    if schema_tables_def:
+        _write_code_files(
+            _get_tables_codes(
+                settings,
+                db_name,
+                schema_name_to_imports_map,
+                _get_python_name_to_table_def_map(schema_tables_def),
+                schema_tables_def,
+                schema_to_table_to_row_estimate_map,
+                schema_to_table_to_serial_column_names_map,
+                profiler,
+            ),
+            writer,
+            settings.emitter,
+            format_cache,
+            format_executor,
+            profiler,
+            db_name,
+            logger,
         )
+    _write_code_files(
+        _get_init_codes(settings, tables_index),
+        writer,
+        settings.emitter,
+        format_cache,
+        format_executor,
+        profiler,
+        db_name,
+        logger,
+    )
+
+
+def _write_base_file(
+    settings: Db2ModelSettings, format_cache: FormatCache | None
+) -> None:
+    match settings.model_style:
+        case ModelStyle.ORM:
+            code = _code_base_file()
+        case ModelStyle.CORE:
+            code = _code_core_base_file()
+        case _:
+            raise ValueError(f"No support yet for the {settings.model_style=}")
+    python_path = settings.path_settings.python_path
+    filepath_to_code_map = {
+        python_path / "base.py": _render_code(code, settings.emitter, format_cache)
+    }
+    if settings.bulk_modules:
+        filepath_to_code_map[python_path / "bulk" / "base.py"] = _render_code(
+            _code_bulk_base_file(), settings.emitter, format_cache
+        )
+    with OutputWriter() as writer:
+        writer.write(filepath_to_code_map)
+
+
+def _get_db_package_paths(settings: Db2ModelSettings, db_name: str) -> list[Path]:
+    """Packages generated from the database, each written as a whole"""
+
+    python_path = settings.path_settings.python_path
+    return [python_path / db_name, python_path / "bulk" / db_name]
+
 
-        _generate_all_init_files(
+def _generate_db_models(
+    settings: Db2ModelSettings,
+    db_name: str,
+    raw_code: str,
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] | None,
+    schema_to_table_to_serial_column_names_map: dict[str, dict[str, list[str]]] | None,
+    writer: OutputWriter,
+    format_cache: FormatCache | None,
+    format_executor: Executor | None,
+    profiler: Profiler,
+    logger: Logger,
+) -> None:
+    _write_code_files(
+        _get_db_codes(
+            settings,
+            db_name,
+            raw_code,
+            schema_to_table_to_row_estimate_map,
+            schema_to_table_to_serial_column_names_map,
+            profiler,
+            logger,
+        ),
+        writer,
+        settings.emitter,
+        format_cache,
+        format_executor,
+        profiler,
+        db_name,
+        logger,
+    )
+
+
+def _generate_python_models(
+    settings: Db2ModelSettings,
+    db_to_manifest_map: dict[str, DbManifest],
+    snapshot: Snapshot | None,
+    pool: ConnectionPool,
+    profiler: Profiler,
+    logger: Logger,
+) -> None:
+    """Generates the databases whose catalog changed, from the snapshot raw codes
+    if given, from the databases through `pool` otherwise."""
+
+    manifest = _load_manifest(settings.path_settings.manifest_filepath)
+    if settings.skip_unchanged:
+        db_names = _get_changed_db_names(
+            manifest,
+            db_to_manifest_map,
             settings.path_settings.python_path,
-            db_all_tables_def,
-            settings.db_settings.sql_dialect,
+            logger,
         )
+    else:
+        db_names = settings.db_names
+    if not db_names:
+        logger.info("Catalogs unchanged since last generation, nothing to do.")
+        return
 
-        for table_def in db_all_tables_def:
-            _fill_table_imports(table_def, python_name_to_table_def_map)
-            _set_table_inits_false(table_def, settings.init_false_column_names)
-            _set_table_default_none(table_def)
+    db_to_error_map: dict[str, str] = dict()
+    if snapshot is not None:
+        db_to_raw_code_map = {
+            db_name: snapshot.db_to_snapshot_map[db_name].raw_code
+            for db_name in db_names
+            if db_name in snapshot.db_to_snapshot_map
+        }
+    elif settings.stream_chunk_size:
+        # Streamed databases are reflected chunk by chunk while being generated
+        db_to_raw_code_map = dict()
+    else:
+        db_to_raw_code_map, db_to_error_map = _run_sqlacodegen(
+            settings, db_names, pool, profiler, logger
+        )
+        # Failed databases reported once the other ones are written out, their
+        # manifest entries left as they were
+        db_names = [db_name for db_name in db_names if db_name not in db_to_error_map]
 
-            code = _get_table_code(
-                final_imports_raw_text,
-                table_def,
-                settings.db_settings.sql_dialect,
+    db_to_row_estimates_map: dict[str, dict[str, dict[str, float]]] = dict()
+    if settings.lazy_from_statistics:
+        if snapshot is not None:
+            db_to_row_estimates_map = {
+                db_name: snapshot.db_to_snapshot_map[
+                    db_name
+                ].schema_to_table_to_row_estimate_map
+                for db_name in db_to_raw_code_map
+            }
+        elif not settings.stream_chunk_size:
+            db_to_row_estimates_map = _get_db_row_estimates(
+                settings, list(db_to_raw_code_map), pool, profiler, logger
+            )
+    db_to_serial_columns_map: dict[str, dict[str, dict[str, list[str]]]] = dict()
+    if settings.bulk_modules:
+        if snapshot is not None:
+            db_to_serial_columns_map = {
+                db_name: snapshot.db_to_snapshot_map[
+                    db_name
+                ].schema_to_table_to_serial_column_names_map
+                for db_name in db_to_raw_code_map
+            }
+        elif not settings.stream_chunk_size:
+            db_to_serial_columns_map = _get_db_serial_columns(
+                settings, list(db_to_raw_code_map), pool, profiler, logger
             )
+    format_cache = (
+        FormatCache(
+            settings.path_settings.format_cache_path,
+            settings.format_cache_max_size,
+            _formatter_key(),
+        )
+        if settings.format_cache_max_size
+        else None
+    )
+    _check_emitter(settings, logger)
+    if snapshot is None:
+        _check_stream(settings, logger)
+    _write_base_file(settings, format_cache)
 
-            with open(
-                settings.path_settings.table_filepath(
-                    language=Language.PYTHON,
-                    sql_dialect=settings.db_settings.sql_dialect,
-                    db_name=db_name,
-                    table_name=table_def.table_name,
-                    schema_name=table_def.schema_name,
-                ),
-                "w",
-            ) as f:
-                f.write(_formate_code(code))
+    format_executor = (
+        ProcessPoolExecutor(max_workers=settings.format_jobs)
+        if settings.format_jobs > 1
+        else None
+    )
+    try:
+        for db_name in db_names:
+            if db_name in db_to_raw_code_map:
+                with OutputWriter(_get_db_package_paths(settings, db_name)) as writer:
+                    _generate_db_models(
+                        settings,
+                        db_name,
+                        # Released once generated
+                        db_to_raw_code_map.pop(db_name),
+                        (
+                            db_to_row_estimates_map.get(db_name, dict())
+                            if settings.lazy_from_statistics
+                            else None
+                        ),
+                        (
+                            db_to_serial_columns_map.get(db_name, dict())
+                            if settings.bulk_modules
+                            else None
+                        ),
+                        writer,
+                        format_cache,
+                        format_executor,
+                        profiler,
+                        logger,
+                    )
+            else:
+                schema_names = (
+                    _get_schema_names(settings, db_name, logger)
+                    if snapshot is None and settings.stream_chunk_size
+                    else list()
+                )
+                if not schema_names:
+                    logger.info(f"No schemas to generate in {db_name=}, skipping.")
+                    continue
+                with OutputWriter(_get_db_package_paths(settings, db_name)) as writer:
+                    _generate_db_models_by_chunks(
+                        settings,
+                        db_name,
+                        schema_names,
+                        pool,
+                        writer,
+                        format_cache,
+                        format_executor,
+                        profiler,
+                        logger,
+                    )
+            logger.info(
+                f"Published {db_name=}, {writer.written_count} file(s) written, {writer.unchanged_count} unchanged."
+            )
+    finally:
+        if format_executor is not None:
+            format_executor.shutdown()
+
+    if format_cache is not None:
+        with profiler.phase("evict_format_cache"):
+            format_cache.evict()
+
+    _write_manifest(
+        settings.path_settings.manifest_filepath,
+        _merge_manifest(manifest, db_names, db_to_manifest_map),
+    )
+    _raise_failed_dbs(db_to_error_map)
+
+
+def generate_python_models(
+    settings: Db2ModelSettings, logger: Logger, profiler: Profiler | None = None
+) -> None:
+    """Generates the models of every database of the settings.
+
+    Pass a profiler to get the timings and resource usage of every phase, through
+    its hooks or its report once the generation is done.
+    """
+
+    if profiler is None:
+        profiler = Profiler()
+
+    with _get_connection_pool(settings, profiler, logger) as pool:
+        _generate_python_models(
+            settings,
+            (
+                _get_db_manifests(settings, pool, profiler, logger)
+                if settings.skip_unchanged
+                else dict()
+            ),
+            None,
+            pool,
+            profiler,
+            logger,
+        )
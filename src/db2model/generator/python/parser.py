@@ -1,60 +1,779 @@
+import ast
+import importlib
+import keyword
 import re
-from pathlib import Path
+import textwrap
+from logging import Logger
+from typing import Any
 
-from db2model.models import TableDef
-from db2model.types import SqlDialect
+from sqlalchemy import ARRAY
+from sqlalchemy.dialects.postgresql import DOMAIN
+from sqlalchemy.types import TypeEngine
+
+from db2model.models import (
+    ColumnDef,
+    ForeignKeyDef,
+    IndexDef,
+    RelationshipDef,
+    TableDef,
+)
+from db2model.types import ModelStyle, SqlDialect
 
 from .constants import EMPTY_FILE_TEMPLATE
 
+BASE_CLASS_LINE = "class Base(DeclarativeBase):"
+METADATA_LINE = "metadata = MetaData()"
+STRING_LITERAL = r"'(?:[^'\\\n]|\\.)*'" + r'|"(?:[^"\\\n]|\\.)*"'
+STRING_LITERAL_PATTERN = re.compile(STRING_LITERAL)
+# Start of a statement at the top level or in a class, lines being kept together
+# until the next one
+TOP_LEVEL_STATEMENT_START_PATTERN = re.compile(r"\n(?=[^\W\d])")
+CLASS_STATEMENT_START_PATTERN = re.compile(r"\n(?=    [^\W\d])")
+# Positional argument of a call that is a string literal or a list of them
+LITERAL_ARGUMENT_PATTERN = re.compile(
+    rf"((?:{STRING_LITERAL})|\[(?:(?:{STRING_LITERAL})(?:, (?:{STRING_LITERAL}))*)?\])(?:, |$)"
+)
+KEYWORD_ARGUMENT_PATTERN = re.compile(r"[^\W\d]\w*=(?!=)")
+# Columns of self-referential relationships, as a list of attribute names
+REMOTE_SIDE_PATTERN = re.compile(r"\bremote_side=\[([\w, ]*)\]")
+# Modules the column types of Table statements are looked up in, the code
+# rendered by sqlacodegen being read rather than run, as it can come from a
+# snapshot file
+TYPE_MODULE_PREFIXES = ("sqlalchemy", "geoalchemy2")
+# Constraints of __table_args__ the transforms depend on, sqlacodegen rendering
+# each element on a line of its own
+CONSTRAINT_CALL_NAMES = (
+    "PrimaryKeyConstraint",
+    "ForeignKeyConstraint",
+    "UniqueConstraint",
+    "Index",
+)
+
+
+def _get_str_value(string_literal: str) -> str:
+    if "\\" in string_literal:
+        return ast.literal_eval(string_literal)
+    return string_literal[1:-1]
+
+
+def _get_str_literal(code: str) -> str | None:
+    """Value of `code` if it is a single string literal, None otherwise."""
+
+    if not STRING_LITERAL_PATTERN.fullmatch(code):
+        return None
+    return _get_str_value(code)
+
+
+def _get_str_constants(nodes: list[ast.expr]) -> list[str]:
+    return [
+        node.value
+        for node in nodes
+        if isinstance(node, ast.Constant) and isinstance(node.value, str)
+    ]
+
+
+def _get_call_name(node: ast.expr) -> str | None:
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+def _get_keyword(call: ast.Call, name: str) -> ast.expr | None:
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def _split_statements(code: str, statement_start_pattern: re.Pattern) -> list[str]:
+    """Splits code by statement, a statement starting on a line matching
+    `statement_start_pattern`, its continuation lines being indented more or
+    closing brackets. Code is expected to start with a line break."""
+
+    head, *statements = statement_start_pattern.split(code)
+    if head.strip():
+        raise ValueError(f"Unexpected line in generated code. {head=}")
+    return [statement.rstrip() for statement in statements]
+
+
+def _parse_attribute(line: str) -> ColumnDef | RelationshipDef | None:
+    """Columns and relationships, which sqlacodegen renders on a single line. None
+    for any other statement.
+
+    Calls are parsed only when they hold something the transforms depend on.
+    """
+
+    name, _, rest = line.strip().partition(": ")
+    annotation, _, call = rest.partition(" = ")
+    if not (name.isidentifier() and call.endswith(")")):
+        return None
+    nullable = annotation.startswith("Mapped[Optional[")
+
+    if call.startswith("mapped_column("):
+        column_name = name
+        code = call
+        # String literals blanked so that server defaults or comments cannot match
+        if ("=True" in call or "ForeignKey(" in call) and ("'" in call or '"' in call):
+            code = STRING_LITERAL_PATTERN.sub("''", call)
+        if call[len("mapped_column(")] in "'\"":
+            match = STRING_LITERAL_PATTERN.match(call, len("mapped_column("))
+            column_name = (_get_str_literal(match.group()) if match else None) or name
+        return ColumnDef(
+            attribute_name=name,
+            column_name=column_name,
+            annotation=annotation,
+            call=call,
+            nullable=nullable,
+            primary_key="primary_key=True" in code,
+            foreign_key="ForeignKey(" in code,
+            unique="unique=True" in code,
+            index="index=True" in code,
+        )
+
+    if call.startswith("relationship("):
+        # Target is the repr of a class name, so never holds an escaped quote
+        quote = call[len("relationship(")]
+        target_end = call.find(quote, len("relationship(") + 1)
+        if quote not in "'\"" or target_end == -1:
+            raise ValueError(
+                f"Problem during python file generation, could not find relationship table name. {line=}"
+            )
+        return RelationshipDef(
+            attribute_name=name,
+            annotation=annotation,
+            call=call,
+            nullable=nullable,
+            target_python_table_name=call[len("relationship(") + 1 : target_end],
+        )
+
+    return None
+
+
+def _parse_imports(
+    imports_raw_text: str,
+) -> dict[str, list[tuple[str | None, str]]]:
+    """bound_name -> [(module_name, imported)] of the imports binding it,
+    module_name being None for `import imported` statements"""
+
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]] = dict()
+    for node in ast.parse(imports_raw_text).body:
+        match node:
+            case ast.Import():
+                for alias in node.names:
+                    if alias.asname:
+                        name_to_imports_map.setdefault(alias.asname, list()).append(
+                            (None, f"{alias.name} as {alias.asname}")
+                        )
+                    else:
+                        imports = name_to_imports_map.setdefault(
+                            alias.name.split(".")[0], list()
+                        )
+                        if (None, alias.name) not in imports:
+                            imports.append((None, alias.name))
+            case ast.ImportFrom():
+                module_name = "." * node.level + (node.module or "")
+                for alias in node.names:
+                    if alias.asname:
+                        name_to_imports_map.setdefault(alias.asname, list()).append(
+                            (module_name, f"{alias.name} as {alias.asname}")
+                        )
+                    else:
+                        imports = name_to_imports_map.setdefault(alias.name, list())
+                        # Several raw texts can import the same name
+                        if (module_name, alias.name) not in imports:
+                            imports.append((module_name, alias.name))
+            case _:
+                raise ValueError(
+                    f"Problem during python file generation, unexpected statement in imports. {ast.dump(node)=}"
+                )
+    return name_to_imports_map
+
+
+def _add_constraint(
+    call_name: str | None,
+    arguments: list[str | list[str] | None],
+    unique: bool,
+    primary_key_column_names: list[str],
+    foreign_keys: list[ForeignKeyDef],
+    indexes: list[IndexDef],
+) -> None:
+    """Adds a constraint of __table_args__ to the ones of its kind, from its
+    positional arguments, None standing for the ones other than strings and lists
+    of strings"""
+
+    match call_name:
+        case "PrimaryKeyConstraint":
+            primary_key_column_names.extend(
+                argument for argument in arguments if isinstance(argument, str)
+            )
+        case "ForeignKeyConstraint" if len(arguments) >= 2:
+            column_names, referred_column_names = [
+                argument if isinstance(argument, list) else []
+                for argument in arguments[:2]
+            ]
+            foreign_keys.append(
+                ForeignKeyDef(
+                    column_names=column_names,
+                    referred_column_names=referred_column_names,
+                )
+            )
+        case "UniqueConstraint":
+            indexes.append(
+                IndexDef(
+                    column_names=[
+                        argument for argument in arguments if isinstance(argument, str)
+                    ],
+                    unique=True,
+                )
+            )
+        case "Index" if arguments:
+            indexes.append(
+                IndexDef(
+                    # First argument is the name of the index
+                    column_names=[
+                        argument
+                        for argument in arguments[1:]
+                        if isinstance(argument, str)
+                    ],
+                    unique=unique,
+                )
+            )
+
+
+def _parse_table_args(
+    table_args: ast.expr,
+) -> tuple[list[str], list[ForeignKeyDef], list[IndexDef], str | None]:
+    """(primary_key_column_names, foreign_keys, indexes, schema_name) of
+    __table_args__"""
+
+    primary_key_column_names: list[str] = list()
+    foreign_keys: list[ForeignKeyDef] = list()
+    indexes: list[IndexDef] = list()
+    schema_name: str | None = None
+    for table_arg in (
+        table_args.elts if isinstance(table_args, ast.Tuple) else [table_args]
+    ):
+        if isinstance(table_arg, ast.Dict):
+            for key, value in zip(table_arg.keys, table_arg.values):
+                if key is not None and _get_str_constants([key]) == ["schema"]:
+                    schema_names = _get_str_constants([value])
+                    schema_name = schema_names[0] if schema_names else None
+            continue
+        if not isinstance(table_arg, ast.Call):
+            continue
+        unique = _get_keyword(table_arg, "unique")
+        _add_constraint(
+            _get_call_name(table_arg),
+            [
+                (
+                    arg.value
+                    if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+                    else (
+                        _get_str_constants(arg.elts)
+                        if isinstance(arg, ast.List)
+                        else None
+                    )
+                )
+                for arg in table_arg.args
+            ],
+            isinstance(unique, ast.Constant) and unique.value is True,
+            primary_key_column_names,
+            foreign_keys,
+            indexes,
+        )
+    return primary_key_column_names, foreign_keys, indexes, schema_name
+
+
+def _get_literal_arguments(
+    arguments_code: str,
+) -> tuple[list[str | list[str] | None], bool] | None:
+    """(positional_arguments, unique) of the source of the arguments of a call,
+    None unless its positional arguments are all string literals or lists of them
+    and the ones after are keyword arguments."""
+
+    arguments: list[str | list[str] | None] = list()
+    position = 0
+    while match := LITERAL_ARGUMENT_PATTERN.match(arguments_code, position):
+        literal = match.group(1)
+        arguments.append(
+            [
+                _get_str_value(string_literal)
+                for string_literal in STRING_LITERAL_PATTERN.findall(literal)
+            ]
+            if literal.startswith("[")
+            else _get_str_value(literal)
+        )
+        position = match.end()
+        if position == len(arguments_code):
+            break
+    keywords_code = arguments_code[position:]
+    if keywords_code and not KEYWORD_ARGUMENT_PATTERN.match(keywords_code):
+        return None
+    if "'" in keywords_code or '"' in keywords_code:
+        keywords_code = STRING_LITERAL_PATTERN.sub("''", keywords_code)
+    return arguments, "unique=True" in keywords_code
+
+
+def _parse_table_args_lines(
+    lines: list[str],
+) -> tuple[list[str], list[ForeignKeyDef], list[IndexDef], str | None]:
+    """Same as `_parse_table_args` from the lines of the elements of a
+    __table_args__ tuple, one per line. Only the elements with other arguments
+    than string literals are parsed as python."""
+
+    primary_key_column_names: list[str] = list()
+    foreign_keys: list[ForeignKeyDef] = list()
+    indexes: list[IndexDef] = list()
+    schema_name: str | None = None
+    for line in lines:
+        table_arg = line.strip().removesuffix(",")
+        call_name, _, arguments_code = table_arg.partition("(")
+        if call_name in CONSTRAINT_CALL_NAMES and arguments_code.endswith(")"):
+            literal_arguments = _get_literal_arguments(arguments_code[:-1])
+            if literal_arguments is not None:
+                _add_constraint(
+                    call_name,
+                    *literal_arguments,
+                    primary_key_column_names,
+                    foreign_keys,
+                    indexes,
+                )
+                continue
+        elif table_arg.startswith("{'schema': ") and table_arg.endswith("}"):
+            schema_name = _get_str_literal(table_arg[len("{'schema': ") : -1])
+            if schema_name:
+                continue
+        elif not table_arg.startswith("{"):
+            # Other constraints, as check ones
+            continue
+        (
+            table_arg_primary_key_column_names,
+            table_arg_foreign_keys,
+            table_arg_indexes,
+            table_arg_schema_name,
+        ) = _parse_table_args(ast.parse(table_arg, mode="eval").body)
+        primary_key_column_names.extend(table_arg_primary_key_column_names)
+        foreign_keys.extend(table_arg_foreign_keys)
+        indexes.extend(table_arg_indexes)
+        schema_name = table_arg_schema_name or schema_name
+    return primary_key_column_names, foreign_keys, indexes, schema_name
+
+
+def _parse_table(code: str, db_name: str, sql_dialect: SqlDialect) -> TableDef:
+    """Parses a class rendered by sqlacodegen, every line being read once."""
+
+    table_name: str | None = None
+    schema_name: str | None = None
+    primary_key_column_names: list[str] = list()
+    foreign_keys: list[ForeignKeyDef] = list()
+    indexes: list[IndexDef] = list()
+    columns: list[ColumnDef] = list()
+    relationships: list[RelationshipDef] = list()
+    class_line, _, body = code.partition("\n")
+    header_lines = [class_line]
+
+    for statement in _split_statements("\n" + body, CLASS_STATEMENT_START_PATTERN):
+        attribute = _parse_attribute(statement) if "\n" not in statement else None
+        if isinstance(attribute, ColumnDef):
+            columns.append(attribute)
+            continue
+        if isinstance(attribute, RelationshipDef):
+            relationships.append(attribute)
+            continue
 
-def _parse_table(raw: str, db_name: str, sql_dialect: SqlDialect) -> TableDef:
-    name_match = re.search(r"__tablename__\s*=\s*['\"]([^'\"]+)['\"]", raw)
-    if not name_match:
+        statement_lines = [line for line in statement.split("\n") if line.strip()]
+        header_lines.extend(statement_lines)
+        if len(statement_lines) == 1:
+            _, _, value = statement_lines[0].partition(" = ")
+            if statement_lines[0].startswith("    __tablename__ = "):
+                table_name = _get_str_literal(value)
+                if table_name:
+                    continue
+            if statement_lines[0].startswith("    __table_args__ = {'schema': "):
+                schema_name = _get_str_literal(value[len("{'schema': ") : -1])
+                if schema_name and value.endswith("}"):
+                    continue
+        if not statement_lines[0].startswith(
+            ("    __tablename__", "    __table_args__")
+        ):
+            continue
+        if (
+            statement_lines[0] == "    __table_args__ = ("
+            and statement_lines[-1] == "    )"
+            and all(
+                line.startswith("        ")
+                and (line[8:9].isidentifier() or line[8:9] == "{")
+                for line in statement_lines[1:-1]
+            )
+        ):
+            primary_key_column_names, foreign_keys, indexes, schema_name = (
+                _parse_table_args_lines(statement_lines[1:-1])
+            )
+            continue
+        match ast.parse(textwrap.dedent("\n".join(statement_lines))).body:
+            case [ast.Assign(targets=[ast.Name(id="__tablename__")], value=value)]:
+                table_names = _get_str_constants([value])
+                table_name = table_names[0] if table_names else None
+            case [ast.Assign(targets=[ast.Name(id="__table_args__")], value=value)]:
+                primary_key_column_names, foreign_keys, indexes, schema_name = (
+                    _parse_table_args(value)
+                )
+
+    if not table_name:
         raise ValueError(
-            f"Problem during python file generation, could not find __tablename__. {raw=}"
+            f"Problem during python file generation, could not find __tablename__. {class_line=}"
         )
 
     match sql_dialect:
         case SqlDialect.POSTGRESQL:
-            schema_match = re.search(r"['\"]schema['\"]\s*:\s*['\"]([^'\"]+)['\"]", raw)
-            if not schema_match:
+            if not schema_name:
                 raise ValueError(
-                    f"Problem during python file generation using postgresql, could not find schema. {raw=}"
+                    f"Problem during python file generation using postgresql, could not find schema. {table_name=}"
                 )
-            schema_name = schema_match.group(1)
         case _:
             raise ValueError(f"No support yet for the {sql_dialect=}")
 
+    # Given as a string evaluated once the class is mapped, as the attributes
+    # can be declared after the relationship
+    class_name = class_line[len("class ") :].partition("(")[0]
+    for relationship in relationships:
+        if "remote_side=[" in relationship.call:
+            relationship.call = REMOTE_SIDE_PATTERN.sub(
+                lambda match: "remote_side='[{}]'".format(
+                    ", ".join(
+                        f"{class_name}.{name.strip()}"
+                        for name in match.group(1).split(",")
+                    )
+                ),
+                relationship.call,
+            )
+
+    for column in columns:
+        if column.primary_key and column.column_name not in primary_key_column_names:
+            primary_key_column_names.append(column.column_name)
+        # Single column foreign keys with a default name are rendered inline
+        if column.foreign_key:
+            foreign_keys.append(
+                ForeignKeyDef(
+                    column_names=[column.column_name], referred_column_names=[]
+                )
+            )
+        if column.unique or column.index:
+            indexes.append(
+                IndexDef(column_names=[column.column_name], unique=column.unique)
+            )
+
     return TableDef(
-        raw_str=raw,
-        table_name=name_match.group(1),
         db_name=db_name,
         schema_name=schema_name,
+        table_name=table_name,
+        header_str="\n".join(header_lines),
+        primary_key_column_names=primary_key_column_names,
+        foreign_keys=foreign_keys,
+        indexes=indexes,
+        columns=columns,
+        relationships=relationships,
+    )
+
+
+def _get_python_type(column_type: Any) -> tuple[str, set[str]]:
+    """(annotation, imported_modules) of the python values of a column type, as
+    sqlacodegen renders them on classes"""
+
+    # Rendered as the class when built without arguments
+    if isinstance(column_type, type):
+        column_type = column_type()
+    dimensions = 0
+    if isinstance(column_type, ARRAY):
+        dimensions = getattr(column_type, "dimensions", None) or 1
+        column_type = column_type.item_type
+    if isinstance(column_type, DOMAIN):
+        column_type = column_type.data_type
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return "list[" * dimensions + "Any" + "]" * dimensions, set()
+    if python_type.__module__ == "builtins":
+        type_name = python_type.__name__
+        imported_modules = set()
+    else:
+        type_name = f"{python_type.__module__}.{python_type.__name__}"
+        imported_modules = {python_type.__module__}
+    return "list[" * dimensions + type_name + "]" * dimensions, imported_modules
+
+
+def _get_type_namespace(
+    imports_raw_text: str, logger: Logger, db_name: str
+) -> dict[str, Any]:
+    """bound_name -> object of the imports of `imports_raw_text` from the type
+    modules, the other imports being left out"""
+
+    namespace: dict[str, Any] = dict()
+    for name, imports in _parse_imports(imports_raw_text).items():
+        module_name, imported = imports[-1]
+        if module_name is None or not module_name.startswith(TYPE_MODULE_PREFIXES):
+            continue
+        try:
+            namespace[name] = getattr(
+                importlib.import_module(module_name),
+                imported.partition(" as ")[0],
+            )
+        except (ImportError, AttributeError) as e:
+            # Types of packages missing here, as of a snapshot
+            logger.warning(
+                f"Could not import the column type {name=} of {db_name=}, annotated as Any. {str(e)}"
+            )
+    return namespace
+
+
+def _evaluate_type(node: ast.expr, namespace: dict[str, Any]) -> Any:
+    """Column type of the expression, made of names of `namespace`, types called
+    on literals and other types, and public attributes of them. ValueError on any
+    other expression."""
+
+    match node:
+        case ast.Constant():
+            return node.value
+        case ast.UnaryOp(op=ast.USub(), operand=ast.Constant(value=int() | float())):
+            return -node.operand.value
+        case ast.List() | ast.Tuple():
+            values = [_evaluate_type(element, namespace) for element in node.elts]
+            return values if isinstance(node, ast.List) else tuple(values)
+        case ast.Name() if node.id in namespace:
+            return namespace[node.id]
+        case ast.Attribute() if not node.attr.startswith("_"):
+            value = _evaluate_type(node.value, namespace)
+            if isinstance(value, type) and issubclass(value, TypeEngine):
+                return getattr(value, node.attr)
+        case ast.Call():
+            function = _evaluate_type(node.func, namespace)
+            if isinstance(function, type) and issubclass(function, TypeEngine):
+                return function(
+                    *(_evaluate_type(arg, namespace) for arg in node.args),
+                    **{
+                        keyword_node.arg: _evaluate_type(keyword_node.value, namespace)
+                        for keyword_node in node.keywords
+                        if keyword_node.arg is not None
+                    },
+                )
+    raise ValueError(f"Unexpected column type expression. {ast.dump(node)=}")
+
+
+def _parse_table_statement(
+    code: str,
+    statement: ast.Assign,
+    table_call: ast.Call,
+    db_name: str,
+    sql_dialect: SqlDialect,
+    namespace: dict[str, Any] | None,
+) -> tuple[TableDef, set[str]]:
+    """(table_def, imported_modules) of a Table(...) statement, rendered by
+    sqlacodegen for views and tables without primary key.
+
+    Columns get the annotation sqlacodegen gives them on classes, from their type
+    looked up in `namespace`, Any if None or not a type of it.
+    """
+
+    table_names = _get_str_constants(table_call.args[:1])
+    if not table_names:
+        raise ValueError(
+            f"Problem during python file generation, could not find table name. {code=}"
+        )
+    table_name = table_names[0]
+    schema_node = _get_keyword(table_call, "schema")
+    schema_names = _get_str_constants([schema_node]) if schema_node else list()
+    schema_name = schema_names[0] if schema_names else None
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            if not schema_name:
+                raise ValueError(
+                    f"Problem during python file generation using postgresql, could not find schema. {table_name=}"
+                )
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+    columns: list[ColumnDef] = list()
+    table_args: list[ast.expr] = list()
+    imported_modules: set[str] = set()
+    for arg in table_call.args[2:]:
+        column_names = (
+            _get_str_constants(arg.args[:1]) if _get_call_name(arg) == "Column" else []
+        )
+        if not column_names:
+            table_args.append(arg)
+            continue
+        column_name = column_names[0]
+        column_code = ast.get_source_segment(code, arg) or ""
+        arguments_code = ", ".join(
+            ast.get_source_segment(code, node) or ""
+            for node in [*arg.args[1:], *arg.keywords]
+        )
+        primary_key = _get_keyword(arg, "primary_key")
+        is_primary_key = isinstance(primary_key, ast.Constant) and (
+            primary_key.value is True
+        )
+        nullable_node = _get_keyword(arg, "nullable")
+        nullable = not is_primary_key and not (
+            isinstance(nullable_node, ast.Constant) and nullable_node.value is False
+        )
+
+        python_type = "Any"
+        # The type comes first, unless the column only has a foreign key
+        if namespace is not None and arg.args[1:]:
+            if _get_call_name(arg.args[1]) != "ForeignKey":
+                try:
+                    python_type, type_modules = _get_python_type(
+                        _evaluate_type(arg.args[1], namespace)
+                    )
+                    imported_modules.update(type_modules)
+                except Exception:
+                    pass
+
+        attribute_name = re.sub(r"\W", "_", column_name)
+        if not attribute_name.isidentifier():
+            attribute_name = f"_{attribute_name}"
+        if keyword.iskeyword(attribute_name):
+            attribute_name = f"{attribute_name}_"
+        unique = _get_keyword(arg, "unique")
+        index = _get_keyword(arg, "index")
+        columns.append(
+            ColumnDef(
+                attribute_name=attribute_name,
+                column_name=column_name,
+                annotation=(
+                    f"Mapped[Optional[{python_type}]]"
+                    if nullable
+                    else f"Mapped[{python_type}]"
+                ),
+                call=f"mapped_column({arguments_code})",
+                nullable=nullable,
+                primary_key=is_primary_key,
+                foreign_key="ForeignKey("
+                in STRING_LITERAL_PATTERN.sub("''", column_code),
+                unique=isinstance(unique, ast.Constant) and unique.value is True,
+                index=isinstance(index, ast.Constant) and index.value is True,
+            )
+        )
+
+    primary_key_column_names, foreign_keys, indexes, _ = _parse_table_args(
+        ast.Tuple(elts=table_args)
+    )
+    for column in columns:
+        if column.primary_key and column.column_name not in primary_key_column_names:
+            primary_key_column_names.append(column.column_name)
+        if column.foreign_key:
+            foreign_keys.append(
+                ForeignKeyDef(
+                    column_names=[column.column_name], referred_column_names=[]
+                )
+            )
+        if column.unique or column.index:
+            indexes.append(
+                IndexDef(column_names=[column.column_name], unique=column.unique)
+            )
+
+    # The statement without its columns, as the header of classes
+    header_str = (
+        f"{ast.get_source_segment(code, statement.targets[0])} = Table("
+        + ", ".join(
+            ast.get_source_segment(code, node) or ""
+            for node in [*table_call.args[:2], *table_args, *table_call.keywords]
+        )
+        + ")"
+    )
+    table_def = TableDef(
+        db_name=db_name,
+        schema_name=schema_name,
+        table_name=table_name,
+        header_str=header_str,
+        primary_key_column_names=primary_key_column_names,
+        foreign_keys=foreign_keys,
+        indexes=indexes,
+        columns=columns,
     )
+    return table_def, imported_modules
 
 
-def _parse_file(
-    filepath: Path, db_name: str, sql_dialect: SqlDialect
+def _parse_code(
+    full_text: str,
+    db_name: str,
+    sql_dialect: SqlDialect,
+    logger: Logger,
+    model_style: ModelStyle = ModelStyle.ORM,
 ) -> tuple[str, list[TableDef]] | None:
-    """(imports_raw_text, list_tables), None if file has no tables"""
-
-    with open(filepath, "r") as f:
-        full_text = f.read()
-    base_class_text = """class Base(DeclarativeBase):
-    pass"""
-    splits = full_text.split(base_class_text)
-    if len(splits) != 2:
-        if full_text == EMPTY_FILE_TEMPLATE:
-            return None
+    """(imports_raw_text, list_tables), None if code has no tables.
+
+    Views and tables without primary key, rendered by sqlacodegen as Table(...)
+    statements rather than classes, are only parsed for Core tables.
+    """
+
+    lines = full_text.split("\n")
+    if BASE_CLASS_LINE in lines:
+        base_class_index = lines.index(BASE_CLASS_LINE)
+        imports_raw_text = "\n".join(lines[:base_class_index])
+        body = "\n".join(lines[base_class_index + 2 :])
+    elif METADATA_LINE in lines:
+        # Rendered without a declarative base when no table has a primary key
+        metadata_index = lines.index(METADATA_LINE)
+        imports_raw_text = (
+            "\n".join(lines[:metadata_index])
+            if model_style == ModelStyle.CORE
+            else None
+        )
+        body = "\n".join(lines[metadata_index + 1 :])
+    elif full_text == EMPTY_FILE_TEMPLATE:
+        return None
+    else:
         raise ValueError(
             f"Problem during python file generation, could not find class Bass definition. {full_text=}"
         )
-    imports_raw_text, classes_raw_text = splits[0], splits[1]
-    classes_raw_text = "\n" + classes_raw_text.strip()
-    classes_splits = classes_raw_text.split("\nclass ")
-    tables_def = [
-        _parse_table("\nclass " + raw, db_name, sql_dialect)
-        for raw in classes_splits
-        if raw
-    ]
+
+    tables_def: list[TableDef] = list()
+    # Names of the imports, to look up the column types of Table statements
+    namespace: dict[str, Any] | None = None
+    imported_modules: set[str] = set()
+    for code in _split_statements("\n" + body, TOP_LEVEL_STATEMENT_START_PATTERN):
+        if code.startswith("class "):
+            tables_def.append(_parse_table(code, db_name, sql_dialect))
+            continue
+        match ast.parse(code).body:
+            case [
+                ast.Assign(
+                    value=ast.Call(func=ast.Name(id="Table")) as table_call
+                ) as statement
+            ]:
+                match model_style:
+                    case ModelStyle.ORM:
+                        table_names = _get_str_constants(table_call.args[:1])
+                        table_name = table_names[0] if table_names else None
+                        logger.warning(
+                            f"Skipping table without primary key, or view, {db_name=}, {table_name=}."
+                        )
+                    case ModelStyle.CORE:
+                        if namespace is None and imports_raw_text is not None:
+                            namespace = _get_type_namespace(
+                                imports_raw_text, logger, db_name
+                            )
+                        table_def, table_imported_modules = _parse_table_statement(
+                            code, statement, table_call, db_name, sql_dialect, namespace
+                        )
+                        tables_def.append(table_def)
+                        imported_modules.update(table_imported_modules)
+                    case _:
+                        raise ValueError(f"No support yet for the {model_style=}")
+            case _:
+                raise ValueError(
+                    f"Problem during python file generation, unexpected statement. {code=}"
+                )
+    if imports_raw_text is None:
+        return None
+    if namespace is not None:
+        # Of the annotations of the columns of Table statements
+        imports_raw_text = "\n".join(
+            [
+                imports_raw_text,
+                "from typing import Any, Optional",
+                *(f"import {module}" for module in sorted(imported_modules)),
+            ]
+        )
     return imports_raw_text, tables_def
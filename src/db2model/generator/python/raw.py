@@ -1,40 +1,599 @@
-import subprocess
+import warnings
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
 from logging import Logger
+from typing import TYPE_CHECKING
 
-from db2model.config import Db2ModelSettings
-from db2model.types import Language, SqlDialect
+import geoalchemy2  # noqa: F401  Registers the geometry types used during reflection.
+from sqlalchemy import (
+    Column,
+    Connection,
+    ForeignKeyConstraint,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    Table,
+    UniqueConstraint,
+    inspect,
+)
+from sqlalchemy.exc import SAWarning
 
+from db2model.config import Db2ModelSettings, TableFilter
+from db2model.profiling import Profiler
+from db2model.types import SqlDialect
 
-def _run_sqlacodegen(settings: Db2ModelSettings, logger: Logger) -> None:
-    for db_name in settings.db_names:
-        match settings.db_settings.sql_dialect:
-            case SqlDialect.POSTGRESQL:
-                for schema_name in settings.db_to_schemas.get(db_name, list()):
-                    db_url = settings.db_settings.db_url(
-                        db_name,
-                        schema_name,
-                    )
-                    outfile = settings.path_settings.raw_filepath(
-                        Language.PYTHON,
-                        settings.db_settings.sql_dialect,
-                        db_name,
-                        schema_name,
-                    )
-                    logger.info(
-                        f"Generating raw schema for python on {db_name=}, {schema_name=}"
-                    )
-                    subprocess.run(
+from .connections import ConnectionPool
+from .fingerprint import _get_foreign_key_edges
+
+if TYPE_CHECKING:
+    from sqlacodegen.generators import DeclarativeGenerator
+
+try:
+    import citext  # noqa: F401
+except ImportError:
+    pass
+
+try:
+    import pgvector.sqlalchemy  # noqa: F401
+except ImportError:
+    pass
+
+
+def _get_missing_referred_tables(metadata: MetaData) -> dict[str | None, set[str]]:
+    """schema_name -> table_names referred by a foreign key but not reflected yet"""
+
+    schema_to_table_names_map: dict[str | None, set[str]] = dict()
+    for table in metadata.tables.values():
+        for foreign_key in table.foreign_keys:
+            schema_name, table_name, _ = foreign_key._column_tokens
+            table_key = f"{schema_name}.{table_name}" if schema_name else table_name
+            if table_key not in metadata.tables:
+                schema_to_table_names_map.setdefault(schema_name, set()).add(table_name)
+    return schema_to_table_names_map
+
+
+def _is_table_included(
+    table_filter: TableFilter, schema_name: str, table_name: str, _: MetaData
+) -> bool:
+    """`only` of MetaData.reflect, called with the names of the schema tables"""
+
+    return table_filter.is_table_included(schema_name, table_name)
+
+
+def _reflect_schemas(
+    connection: Connection,
+    metadata: MetaData,
+    db_name: str,
+    schema_names: list[str],
+    views: bool,
+    profiler: Profiler,
+    schema_to_table_names_map: dict[str, list[str]] | None = None,
+    table_filter: TableFilter | None = None,
+    schema_to_key_table_names_map: dict[str, list[str]] | None = None,
+) -> None:
+    """Reflects the schemas then the tables they refer to, with a fixed number of
+    catalog queries per schema. Only the tables listed in
+    `schema_to_table_names_map` are reflected if given, else the ones included by
+    `table_filter`, the others being left out of the catalog queries. Tables
+    referred to are reflected either way, the ones of
+    `schema_to_key_table_names_map` with their keys only.
+
+    Resolving foreign keys during reflection would load every referred table
+    outside the reflected schema with its own set of queries.
+    """
+
+    for schema_name in schema_names:
+        _reflect_schema(
+            connection,
+            metadata,
+            db_name,
+            schema_name,
+            views,
+            profiler,
+            (
+                None
+                if schema_to_table_names_map is None
+                else schema_to_table_names_map[schema_name]
+            ),
+            table_filter,
+        )
+    if schema_to_key_table_names_map:
+        _reflect_table_keys(
+            connection, metadata, db_name, schema_to_key_table_names_map, profiler
+        )
+    _reflect_referred_tables(connection, metadata, db_name, views, profiler)
+
+
+def _reflect_table_keys(
+    connection: Connection,
+    metadata: MetaData,
+    db_name: str,
+    schema_to_table_names_map: dict[str, list[str]],
+    profiler: Profiler,
+) -> None:
+    """Reflects the tables with their columns and keys only, primary, unique and
+    foreign ones, the latter only to tables of `metadata` or of the map.
+
+    That is all sqlacodegen looks at in the tables related to the generated ones,
+    to name and order their relationships, without the indexes, constraints,
+    defaults and comments of full reflection.
+    """
+
+    with profiler.phase("reflect_keys", db_name) as record:
+        inspector = inspect(connection)
+        key_to_table_map: dict[tuple[str, str], Table] = dict()
+        key_to_foreign_keys_map: dict[tuple[str, str], list] = dict()
+        for schema_name, table_names in schema_to_table_names_map.items():
+            key_to_columns_map = inspector.get_multi_columns(
+                schema_name, filter_names=table_names
+            )
+            key_to_primary_key_map = inspector.get_multi_pk_constraint(
+                schema_name, filter_names=table_names
+            )
+            key_to_unique_constraints_map = inspector.get_multi_unique_constraints(
+                schema_name, filter_names=table_names
+            )
+            key_to_foreign_keys_map.update(
+                inspector.get_multi_foreign_keys(
+                    schema_name,
+                    filter_names=table_names,
+                    postgresql_ignore_search_path=True,
+                )
+            )
+            for key, columns in key_to_columns_map.items():
+                primary_key = key_to_primary_key_map.get(key) or dict()
+                key_to_table_map[key] = Table(
+                    key[1],
+                    metadata,
+                    *[
+                        Column(
+                            column["name"], column["type"], nullable=column["nullable"]
+                        )
+                        for column in columns
+                    ],
+                    PrimaryKeyConstraint(
+                        *primary_key.get("constrained_columns", list()),
+                        name=primary_key.get("name"),
+                    ),
+                    *[
+                        UniqueConstraint(
+                            *unique_constraint["column_names"],
+                            name=unique_constraint["name"],
+                        )
+                        for unique_constraint in key_to_unique_constraints_map.get(
+                            key, list()
+                        )
+                    ],
+                    schema=schema_name,
+                )
+        for key, foreign_keys in key_to_foreign_keys_map.items():
+            for foreign_key in foreign_keys:
+                referred_table = metadata.tables.get(
+                    f"{foreign_key['referred_schema']}.{foreign_key['referred_table']}"
+                )
+                if referred_table is None:
+                    continue
+                key_to_table_map[key].append_constraint(
+                    ForeignKeyConstraint(
+                        foreign_key["constrained_columns"],
                         [
-                            "sqlacodegen",
-                            db_url,
-                            "--schema",
-                            schema_name,
-                            "--outfile",
-                            str(outfile),
+                            referred_table.c[column_name]
+                            for column_name in foreign_key["referred_columns"]
                         ],
-                        check=True,
+                        name=foreign_key["name"],
                     )
-            case _:
-                raise ValueError(
-                    f"No support yet for the {settings.db_settings.sql_dialect=}"
                 )
+        record.item_count = len(key_to_table_map)
+
+
+def _reflect_schema(
+    connection: Connection,
+    metadata: MetaData,
+    db_name: str,
+    schema_name: str,
+    views: bool,
+    profiler: Profiler,
+    table_names: list[str] | None = None,
+    table_filter: TableFilter | None = None,
+) -> None:
+    """Reflects the tables of the schema alone, `table_names` if given, else the
+    ones included by `table_filter`"""
+
+    with profiler.phase("reflect", db_name, schema_name) as record:
+        table_count = len(metadata.tables)
+        only: list[str] | Callable[[str, MetaData], bool] | None = table_names
+        if only is None and table_filter is not None:
+            only = partial(_is_table_included, table_filter, schema_name)
+        metadata.reflect(
+            connection,
+            schema_name,
+            views,
+            only,
+            resolve_fks=False,
+            postgresql_ignore_search_path=True,
+        )
+        record.item_count = len(metadata.tables) - table_count
+
+
+def _reflect_referred_tables(
+    connection: Connection,
+    metadata: MetaData,
+    db_name: str,
+    views: bool,
+    profiler: Profiler,
+) -> None:
+    """Reflects the tables referred to by the ones of `metadata`, transitively"""
+
+    with profiler.phase("reflect_referred", db_name) as record:
+        table_count = len(metadata.tables)
+        missing_referred_tables = _get_missing_referred_tables(metadata)
+        while missing_referred_tables:
+            for schema_name, table_names in missing_referred_tables.items():
+                metadata.reflect(
+                    connection,
+                    schema_name,
+                    views,
+                    list(table_names),
+                    resolve_fks=False,
+                    postgresql_ignore_search_path=True,
+                )
+            missing_referred_tables = _get_missing_referred_tables(metadata)
+        record.item_count = len(metadata.tables) - table_count
+
+
+def _sort_table_keys(
+    table_keys: list[tuple[str, str]],
+    foreign_key_edges: set[tuple[tuple[str, str], tuple[str, str]]],
+) -> list[tuple[str, str]]:
+    """Keys in the order of MetaData.sorted_tables once the tables are reflected,
+    which is the order sqlacodegen renders them in."""
+
+    metadata = MetaData()
+    key_to_table_map = {
+        key: Table(key[1], metadata, Column("_", Integer), schema=key[0])
+        for key in table_keys
+    }
+    for key, referred_key in foreign_key_edges:
+        if key in key_to_table_map and referred_key in key_to_table_map:
+            key_to_table_map[key].append_constraint(
+                ForeignKeyConstraint(["_"], [key_to_table_map[referred_key].c["_"]])
+            )
+    table_to_key_map = {table: key for key, table in key_to_table_map.items()}
+    with warnings.catch_warnings():
+        # Cycles are warned about by sqlacodegen, on the reflected tables
+        warnings.simplefilter("ignore", SAWarning)
+        return [table_to_key_map[table] for table in metadata.sorted_tables]
+
+
+def _get_table_chunks(
+    connection: Connection,
+    schema_names: list[str],
+    views: bool,
+    chunk_size: int,
+    sql_dialect: SqlDialect,
+    table_filter: TableFilter | None = None,
+) -> list[tuple[set[tuple[str, str]], dict[str, list[str]], dict[str, list[str]]]]:
+    """(table_keys, schema_to_table_names_map, schema_to_key_table_names_map) of
+    every chunk of `chunk_size` tables, table_keys being the (schema_name,
+    table_name) of the tables to generate from the chunk, the first map the
+    tables to reflect for them and the second one their neighbors to reflect with
+    their keys only.
+
+    Tables are the ones of the schemas included by `table_filter` and the ones
+    they refer to, transitively, as reflected at once. Relationships also need
+    the tables referring to the chunk and the tables it refers to, along with the
+    tables they all refer to, transitively, whose names and keys are enough to
+    name and order them. A table referred to by every other one thus comes with
+    their keys only.
+    """
+
+    inspector = inspect(connection)
+    table_keys: list[tuple[str, str]] = list()
+    for schema_name in schema_names:
+        table_names = inspector.get_table_names(schema_name)
+        if views:
+            table_names.extend(inspector.get_view_names(schema_name))
+            table_names.extend(inspector.get_materialized_view_names(schema_name))
+        table_keys.extend(
+            (schema_name, table_name)
+            for table_name in table_names
+            if table_filter is None
+            or table_filter.is_table_included(schema_name, table_name)
+        )
+
+    return _plan_table_chunks(
+        table_keys, _get_foreign_key_edges(connection, sql_dialect), chunk_size
+    )
+
+
+def _plan_table_chunks(
+    table_keys: list[tuple[str, str]],
+    foreign_key_edges: set[tuple[tuple[str, str], tuple[str, str]]],
+    chunk_size: int,
+) -> list[tuple[set[tuple[str, str]], dict[str, list[str]], dict[str, list[str]]]]:
+    """Chunks of `_get_table_chunks`, from the keys of the included tables and
+    the foreign key edges of the database"""
+
+    table_keys = list(table_keys)
+    key_to_referred_keys_map: dict[tuple[str, str], list[tuple[str, str]]] = dict()
+    key_to_referring_keys_map: dict[tuple[str, str], list[tuple[str, str]]] = dict()
+    for key, referred_key in sorted(foreign_key_edges):
+        key_to_referred_keys_map.setdefault(key, list()).append(referred_key)
+        key_to_referring_keys_map.setdefault(referred_key, list()).append(key)
+
+    # Iterating over the list as it grows follows references transitively
+    generated_keys = set(table_keys)
+    for key in table_keys:
+        for referred_key in key_to_referred_keys_map.get(key, list()):
+            if referred_key not in generated_keys:
+                generated_keys.add(referred_key)
+                table_keys.append(referred_key)
+
+    table_keys = _sort_table_keys(table_keys, foreign_key_edges)
+    chunks: list[
+        tuple[set[tuple[str, str]], dict[str, list[str]], dict[str, list[str]]]
+    ] = list()
+    for start in range(0, len(table_keys), chunk_size):
+        chunk_keys = set(table_keys[start : start + chunk_size])
+        neighbor_keys: set[tuple[str, str]] = set()
+        for key in chunk_keys:
+            neighbor_keys.update(
+                referring_key
+                for referring_key in key_to_referring_keys_map.get(key, list())
+                if referring_key in generated_keys
+            )
+            neighbor_keys.update(key_to_referred_keys_map.get(key, list()))
+        # Tables the neighbors refer to, transitively, as sqlacodegen orders
+        # relationships by the depth of their tables among the foreign keys
+        keys_to_visit = list(neighbor_keys)
+        while keys_to_visit:
+            for referred_key in key_to_referred_keys_map.get(
+                keys_to_visit.pop(), list()
+            ):
+                if referred_key not in neighbor_keys:
+                    neighbor_keys.add(referred_key)
+                    keys_to_visit.append(referred_key)
+        neighbor_keys -= chunk_keys
+        chunks.append(
+            (
+                chunk_keys,
+                _get_schema_to_table_names_map(chunk_keys),
+                _get_schema_to_table_names_map(neighbor_keys),
+            )
+        )
+    return chunks
+
+
+def _get_schema_to_table_names_map(
+    table_keys: set[tuple[str, str]],
+) -> dict[str, list[str]]:
+    schema_to_table_names_map: dict[str, list[str]] = dict()
+    for schema_name, table_name in sorted(table_keys):
+        schema_to_table_names_map.setdefault(schema_name, list()).append(table_name)
+    return schema_to_table_names_map
+
+
+def _get_generator(
+    connection: Connection, metadata: MetaData, db_name: str, profiler: Profiler
+) -> "DeclarativeGenerator":
+    # Imported here as sqlacodegen takes seconds to import, which would dominate
+    # runs where every catalog is unchanged.
+    with profiler.phase("import_sqlacodegen", db_name):
+        from sqlacodegen.generators import DeclarativeGenerator
+
+    return DeclarativeGenerator(metadata, connection, list())
+
+
+def _reflect_schema_metadata(
+    connection: Connection,
+    db_name: str,
+    schema_name: str,
+    profiler: Profiler,
+    table_filter: TableFilter | None = None,
+) -> MetaData:
+    """Tables of the schema alone, reflected into a MetaData of their own to be
+    merged with the other schemas of the database by `_generate_raw_code`"""
+
+    metadata = MetaData()
+    _reflect_schema(
+        connection,
+        metadata,
+        db_name,
+        schema_name,
+        _get_generator(connection, metadata, db_name, profiler).views_supported,
+        profiler,
+        table_filter=table_filter,
+    )
+    return metadata
+
+
+def _generate_raw_code(
+    connection: Connection,
+    db_name: str,
+    schema_names: list[str],
+    profiler: Profiler,
+    schema_to_table_names_map: dict[str, list[str]] | None = None,
+    table_filter: TableFilter | None = None,
+    schema_metadatas: list[MetaData] | None = None,
+    schema_to_key_table_names_map: dict[str, list[str]] | None = None,
+) -> str:
+    """Reflects every schema into one shared MetaData, each table exactly once.
+
+    Schemas already reflected by `_reflect_schema_metadata` are given as
+    `schema_metadatas`, in the order of `schema_names`, their tables being copied
+    into the shared MetaData rather than reflected again. Tables of
+    `schema_to_key_table_names_map` are reflected with their keys only.
+    """
+
+    metadata = MetaData()
+    generator = _get_generator(connection, metadata, db_name, profiler)
+    if schema_metadatas is None:
+        _reflect_schemas(
+            connection,
+            metadata,
+            db_name,
+            schema_names,
+            generator.views_supported,
+            profiler,
+            schema_to_table_names_map,
+            table_filter,
+            schema_to_key_table_names_map,
+        )
+    else:
+        with profiler.phase("merge_schemas", db_name) as record:
+            for schema_metadata in schema_metadatas:
+                for table in schema_metadata.tables.values():
+                    table.to_metadata(metadata)
+            record.item_count = len(metadata.tables)
+        _reflect_referred_tables(
+            connection, metadata, db_name, generator.views_supported, profiler
+        )
+    with profiler.phase("codegen", db_name) as record:
+        record.item_count = len(metadata.tables)
+        return generator.generate()
+
+
+def _get_schema_names(
+    settings: Db2ModelSettings, db_name: str, logger: Logger
+) -> list[str]:
+    """Schemas of the database to reflect"""
+
+    match settings.db_settings.sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            table_filter = settings.table_filter(db_name)
+            schema_names: list[str] = list()
+            for schema_name in settings.db_to_schemas.get(db_name, list()):
+                if not table_filter.is_schema_included(schema_name):
+                    logger.info(f"Ignoring schema {schema_name=}.")
+                    continue
+                schema_names.append(schema_name)
+            return schema_names
+        case _:
+            raise ValueError(
+                f"No support yet for the {settings.db_settings.sql_dialect=}"
+            )
+
+
+def _run_sqlacodegen(
+    settings: Db2ModelSettings,
+    db_names: list[str],
+    pool: ConnectionPool,
+    profiler: Profiler,
+    logger: Logger,
+) -> tuple[dict[str, str], dict[str, str]]:
+    """(db_to_raw_code_map, db_to_error_map)
+
+    Every schema is reflected as a task of its own, concurrently by up to
+    `settings.jobs` workers within the connections of `pool`, so that the schemas
+    of a single database are reflected in parallel as well. The code of a database
+    is generated once all of its schemas are reflected. Databases read in one
+    repeatable read transaction are reflected by a single task instead. Every
+    task runs to completion, databases that failed being reported in
+    `db_to_error_map` for the other ones to be written out first.
+    """
+
+    db_to_raw_code_map: dict[str, str] = dict()
+    db_to_error_map: dict[str, str] = dict()
+    db_to_schema_names_map: dict[str, list[str]] = dict()
+    db_to_schema_to_metadata_map: dict[str, dict[str, MetaData]] = dict()
+    # (db_name, schema_name) of the reflection tasks, schema_name being None for
+    # the code generation ones
+    future_to_task_map: dict[Future[MetaData | str], tuple[str, str | None]] = dict()
+
+    with ThreadPoolExecutor(max_workers=settings.jobs) as executor:
+        for db_name in db_names:
+            schema_names = _get_schema_names(settings, db_name, logger)
+            if not schema_names:
+                continue
+            logger.info(
+                f"Generating raw schema for python on {db_name=}, {schema_names=}"
+            )
+            if settings.db_settings.repeatable_read:
+                future = executor.submit(
+                    pool.run,
+                    db_name,
+                    partial(
+                        _generate_raw_code,
+                        db_name=db_name,
+                        schema_names=schema_names,
+                        profiler=profiler,
+                        table_filter=settings.table_filter(db_name),
+                    ),
+                )
+                future_to_task_map[future] = (db_name, None)
+                continue
+            db_to_schema_names_map[db_name] = schema_names
+            db_to_schema_to_metadata_map[db_name] = dict()
+            for schema_name in schema_names:
+                future = executor.submit(
+                    pool.run,
+                    db_name,
+                    partial(
+                        _reflect_schema_metadata,
+                        db_name=db_name,
+                        schema_name=schema_name,
+                        profiler=profiler,
+                        table_filter=settings.table_filter(db_name),
+                    ),
+                )
+                future_to_task_map[future] = (db_name, schema_name)
+
+        pending_futures = set(future_to_task_map)
+        while pending_futures:
+            done_futures, pending_futures = wait(
+                pending_futures, return_when=FIRST_COMPLETED
+            )
+            for future in done_futures:
+                db_name, schema_name = future_to_task_map.pop(future)
+                if db_name in db_to_error_map:
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(
+                        f"Could not generate raw schema on {db_name=}. {str(e)}"
+                    )
+                    db_to_error_map[db_name] = str(e)
+                    continue
+                if schema_name is None:
+                    assert isinstance(result, str)
+                    db_to_raw_code_map[db_name] = result
+                    continue
+                assert isinstance(result, MetaData)
+                schema_to_metadata_map = db_to_schema_to_metadata_map[db_name]
+                schema_to_metadata_map[schema_name] = result
+                schema_names = db_to_schema_names_map[db_name]
+                if len(schema_to_metadata_map) < len(schema_names):
+                    continue
+                future = executor.submit(
+                    pool.run,
+                    db_name,
+                    partial(
+                        _generate_raw_code,
+                        db_name=db_name,
+                        schema_names=schema_names,
+                        profiler=profiler,
+                        # Released once merged
+                        schema_metadatas=[
+                            schema_to_metadata_map.pop(schema_name)
+                            for schema_name in schema_names
+                        ],
+                    ),
+                )
+                future_to_task_map[future] = (db_name, None)
+                pending_futures.add(future)
+
+    return db_to_raw_code_map, db_to_error_map
+
+
+def _raise_failed_dbs(db_to_error_map: dict[str, str]) -> None:
+    """Reports the databases `_run_sqlacodegen` failed on, all together"""
+
+    if db_to_error_map:
+        raise RuntimeError(
+            f"Raw schema generation failed for {len(db_to_error_map)} database(s).\n"
+            + "\n".join(
+                f"{db_name=}: {error}" for db_name, error in db_to_error_map.items()
+            )
+        )
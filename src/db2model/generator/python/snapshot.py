@@ -0,0 +1,150 @@
+import gzip
+from importlib.metadata import PackageNotFoundError, version
+from logging import Logger
+from pathlib import Path
+
+from db2model.config import Db2ModelSettings
+from db2model.models import DbManifest, DbSnapshot, Snapshot
+from db2model.profiling import Profiler
+
+from .bulk import _get_db_serial_columns
+from .connections import _get_connection_pool
+from .fingerprint import _get_db_manifests, _get_settings_hash
+from .generator import _generate_python_models
+from .raw import _get_schema_names, _raise_failed_dbs, _run_sqlacodegen
+from .statistics import _get_db_row_estimates
+
+# Bumped whenever a snapshot written by a version cannot be read by another one
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+def load_snapshot(filepath: Path) -> Snapshot:
+    """Reads a snapshot, gzip compressed if its name ends with .gz"""
+
+    if filepath.suffix == ".gz":
+        with gzip.open(filepath, "rt", encoding="utf-8") as f:
+            snapshot_json = f.read()
+    else:
+        snapshot_json = filepath.read_text(encoding="utf-8")
+    snapshot = Snapshot.model_validate_json(snapshot_json)
+    if snapshot.format_version != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot format, regenerate it. {snapshot.format_version=}, {SNAPSHOT_FORMAT_VERSION=}"
+        )
+    return snapshot
+
+
+def _write_snapshot(filepath: Path, snapshot: Snapshot) -> None:
+    """Writes a snapshot, gzip compressed if its name ends with .gz"""
+
+    snapshot_json = snapshot.model_dump_json()
+    if filepath.suffix == ".gz":
+        # mtime fixed and file name left out of the header, so that the same
+        # snapshot always gives the same bytes
+        with open(filepath, "wb") as f:
+            with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as gzip_f:
+                gzip_f.write(snapshot_json.encode("utf-8"))
+    else:
+        filepath.write_text(snapshot_json, encoding="utf-8")
+
+
+def export_python_snapshot(
+    settings: Db2ModelSettings,
+    snapshot_filepath: Path,
+    logger: Logger,
+    profiler: Profiler | None = None,
+) -> None:
+    """Reflects every database of the settings into a snapshot, from which the
+    models can then be generated without any database."""
+
+    if profiler is None:
+        profiler = Profiler()
+
+    try:
+        sqlacodegen_version = version("sqlacodegen")
+    except PackageNotFoundError:
+        sqlacodegen_version = "unknown"
+
+    # Fingerprints read first, so that changes made during reflection show
+    # on the next export
+    with _get_connection_pool(settings, profiler, logger) as pool:
+        db_to_manifest_map = _get_db_manifests(settings, pool, profiler, logger)
+        db_to_raw_code_map, db_to_error_map = _run_sqlacodegen(
+            settings, settings.db_names, pool, profiler, logger
+        )
+        # Always exported, so that generating from the snapshot can use them or not
+        db_to_row_estimates_map = _get_db_row_estimates(
+            settings, list(db_to_raw_code_map), pool, profiler, logger
+        )
+        db_to_serial_columns_map = _get_db_serial_columns(
+            settings, list(db_to_raw_code_map), pool, profiler, logger
+        )
+    snapshot = Snapshot(
+        format_version=SNAPSHOT_FORMAT_VERSION,
+        sql_dialect=settings.db_settings.sql_dialect,
+        sqlacodegen_version=sqlacodegen_version,
+    )
+    for db_name, raw_code in db_to_raw_code_map.items():
+        snapshot.db_to_snapshot_map[db_name] = DbSnapshot(
+            schema_names=_get_schema_names(settings, db_name, logger),
+            schema_to_fingerprint_map=db_to_manifest_map[
+                db_name
+            ].schema_to_fingerprint_map,
+            raw_code=raw_code,
+            schema_to_table_to_row_estimate_map=db_to_row_estimates_map[db_name],
+            schema_to_table_to_serial_column_names_map=db_to_serial_columns_map[
+                db_name
+            ],
+        )
+
+    logger.info(f"Writing snapshot of {list(db_to_raw_code_map)=}.")
+    _write_snapshot(snapshot_filepath, snapshot)
+    _raise_failed_dbs(db_to_error_map)
+
+
+def generate_python_models_from_snapshot(
+    settings: Db2ModelSettings,
+    snapshot_filepath: Path,
+    logger: Logger,
+    profiler: Profiler | None = None,
+) -> None:
+    """Generates the models of every database of the settings from a snapshot,
+    without connecting to them.
+
+    Only generation options can differ from the export ones, the databases and
+    their schemas being the ones reflected.
+    """
+
+    if profiler is None:
+        profiler = Profiler()
+
+    with profiler.phase("load_snapshot"):
+        snapshot = load_snapshot(snapshot_filepath)
+    if snapshot.sql_dialect != settings.db_settings.sql_dialect:
+        raise ValueError(
+            f"Snapshot taken with another dialect. {snapshot.sql_dialect=}, {settings.db_settings.sql_dialect=}"
+        )
+
+    settings_hash = _get_settings_hash(settings)
+    db_to_manifest_map: dict[str, DbManifest] = dict()
+    for db_name in settings.db_names:
+        schema_names = _get_schema_names(settings, db_name, logger)
+        db_snapshot = snapshot.db_to_snapshot_map.get(db_name)
+        if db_snapshot is None:
+            if schema_names:
+                raise ValueError(f"Database missing from the snapshot. {db_name=}")
+            continue
+        if schema_names != db_snapshot.schema_names:
+            raise ValueError(
+                f"Schemas differ from the snapshot ones. {db_name=}, {schema_names=}, {db_snapshot.schema_names=}"
+            )
+        db_to_manifest_map[db_name] = DbManifest(
+            settings_hash=settings_hash,
+            schema_to_fingerprint_map=db_snapshot.schema_to_fingerprint_map,
+        )
+
+    # Never connected to, every database being in the snapshot
+    with _get_connection_pool(settings, profiler, logger) as pool:
+        _generate_python_models(
+            settings, db_to_manifest_map, snapshot, pool, profiler, logger
+        )
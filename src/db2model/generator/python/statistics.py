@@ -0,0 +1,76 @@
+from functools import partial
+from logging import Logger
+
+from sqlalchemy import Connection, text
+
+from db2model.config import Db2ModelSettings
+from db2model.profiling import Profiler
+from db2model.types import SqlDialect
+
+from .connections import ConnectionPool
+
+# Partitioned tables hold no rows themselves, their partitions are summed
+POSTGRESQL_ROW_ESTIMATE_QUERY = """
+SELECT n.nspname, c.relname,
+    CASE WHEN c.relkind = 'p' THEN (
+        SELECT sum(p.reltuples)
+        FROM pg_catalog.pg_inherits i
+        JOIN pg_catalog.pg_class p ON p.oid = i.inhrelid
+        WHERE i.inhparent = c.oid AND p.reltuples >= 0
+    ) ELSE c.reltuples END
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'm', 'f')
+    AND n.nspname NOT LIKE 'pg\\_%' AND n.nspname <> 'information_schema'
+"""
+
+
+def _get_row_estimates(
+    connection: Connection, sql_dialect: SqlDialect
+) -> dict[str, dict[str, float]]:
+    """schema_name -> table_name -> estimated row count, from the statistics of
+    the last ANALYZE. Tables never analyzed are left out."""
+
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] = dict()
+            for schema_name, table_name, row_estimate in connection.execute(
+                text(POSTGRESQL_ROW_ESTIMATE_QUERY)
+            ):
+                # -1 until the first ANALYZE since postgresql 14
+                if row_estimate is None or row_estimate < 0:
+                    continue
+                schema_to_table_to_row_estimate_map.setdefault(schema_name, dict())[
+                    table_name
+                ] = float(row_estimate)
+            return schema_to_table_to_row_estimate_map
+        case _:
+            raise ValueError(f"No support yet for the {sql_dialect=}")
+
+
+def _get_db_row_estimates(
+    settings: Db2ModelSettings,
+    db_names: list[str],
+    pool: ConnectionPool,
+    profiler: Profiler,
+    logger: Logger,
+) -> dict[str, dict[str, dict[str, float]]]:
+    """db_name -> schema_name -> table_name -> estimated row count"""
+
+    db_to_row_estimates_map: dict[str, dict[str, dict[str, float]]] = dict()
+    for db_name in db_names:
+        logger.info(f"Reading table statistics of {db_name=}.")
+        with profiler.phase("statistics", db_name) as record:
+            db_to_row_estimates_map[db_name] = pool.run(
+                db_name,
+                partial(
+                    _get_row_estimates, sql_dialect=settings.db_settings.sql_dialect
+                ),
+            )
+            record.item_count = sum(
+                len(table_to_row_estimate_map)
+                for table_to_row_estimate_map in db_to_row_estimates_map[
+                    db_name
+                ].values()
+            )
+    return db_to_row_estimates_map
@@ -1,81 +1,314 @@
 import re
 
-from db2model.models import TableDef, TableImport
-from db2model.types import SqlDialect
+from db2model.models import (
+    ColumnDef,
+    RelationshipDef,
+    TableDef,
+    TableImport,
+    TableIndexEntry,
+)
+from db2model.types import LazyStrategy, SqlDialect
 
+from .constants import (
+    JOINED_MAX_ROW_ESTIMATE,
+    RECORD_METHOD_NAMES,
+    SELECTIN_MAX_ROWS_PER_PARENT,
+)
+from .parser import STRING_LITERAL_PATTERN
 from .utils import _python_table_name
 
+# Names loaded by the code, leaving out attributes and keyword arguments
+LOADED_NAME_PATTERN = re.compile(r"(?<![.\w])[A-Za-z_]\w*\b(?!\s*=(?!=))")
+SECONDARY_PATTERN = re.compile(r"\bsecondary=(['\"])([^'\"]+)\1")
+COLLECTION_ANNOTATION_PREFIXES = ("Mapped[list[", "Mapped[List[")
+RAISING_LAZY_STRATEGIES = (LazyStrategy.RAISE, LazyStrategy.RAISE_ON_SQL)
+EAGER_LAZY_STRATEGIES = (
+    LazyStrategy.JOINED,
+    LazyStrategy.SELECTIN,
+    LazyStrategy.SUBQUERY,
+    LazyStrategy.IMMEDIATE,
+)
 
-def _get_table_code(
-    imports_raw_text: str,
-    table_def: TableDef,
-    sql_dialect: SqlDialect,
-) -> str:
-    match sql_dialect:
-        case SqlDialect.POSTGRESQL:
-            return (
-                imports_raw_text
-                + "\n"
-                + _get_table_imports_code(table_def)
-                + "\n"
-                + table_def.raw_str
-            )
-        case _:
+
+def _get_attribute_code(attribute: ColumnDef | RelationshipDef) -> str:
+    return (
+        f"    {attribute.attribute_name}: {attribute.annotation} = {attribute.call[:-1]}"
+        + ("" if attribute.init else ",init=False")
+        + (",default=None" if attribute.default_none else "")
+        + (
+            f",lazy='{attribute.lazy.value.lower()}'"
+            if isinstance(attribute, RelationshipDef) and attribute.lazy is not None
+            else ""
+        )
+        + (
+            f",join_depth={attribute.join_depth}"
+            if isinstance(attribute, RelationshipDef)
+            and attribute.join_depth is not None
+            else ""
+        )
+        # Dataclass __repr__ and __eq__ read every field, which would raise
+        + (
+            ",repr=False,compare=False"
+            if isinstance(attribute, RelationshipDef)
+            and attribute.lazy in RAISING_LAZY_STRATEGIES
+            else ""
+        )
+        + ")"
+    )
+
+
+def _get_record_code(table_def: TableDef, table_code: str) -> str:
+    """Frozen slotted dataclass of the columns of the table, along with the
+    statement selecting them and its mappers from Core rows. `table_code` is the
+    expression of the Table the columns are selected from."""
+
+    python_table_name = _python_table_name(table_def.table_name)
+    record_name = f"{python_table_name}Record"
+    lines = ["@dataclass(frozen=True, slots=True)", f"class {record_name}:"]
+    for column in table_def.columns:
+        if not column.annotation.startswith(
+            "Mapped["
+        ) or not column.annotation.endswith("]"):
             raise ValueError(
-                f"No support yet for the {settings.db_settings.sql_dialect=}"
+                f"Unexpected column annotation. {table_def.table_name=}, {column.annotation=}"
             )
+        field_name = column.attribute_name + (
+            "_" if column.attribute_name in RECORD_METHOD_NAMES else ""
+        )
+        lines.append(f"    {field_name}: {column.annotation[len('Mapped['):-1]}")
+    # Columns of the table rather than of the mapper, so that selecting them does
+    # not configure the models. Rows are mapped by position.
+    selected_columns = ", ".join(
+        f"columns[{column.column_name!r}]" for column in table_def.columns
+    )
+    lines.extend(
+        [
+            "",
+            "    @staticmethod",
+            "    def select_statement() -> Select[Any]:",
+            f"        columns = {table_code}.c",
+            f"        return select({selected_columns})",
+            "",
+            "    @classmethod",
+            f'    def from_row(cls, row: Row[Any]) -> "{record_name}":',
+            "        return cls(*row)",
+            "",
+            "    @classmethod",
+            f'    def from_result(cls, result: Result[Any]) -> list["{record_name}"]:',
+            "        return [cls(*row) for row in result]",
+        ]
+    )
+    return "\n".join(lines)
 
 
-def _group_table_per_name(tables_def: list[TableDef]) -> dict[str, list[TableDef]]:
-    name_to_tables_def_map: dict[str, list[TableDef]] = dict()
+def _get_lookup_parameter_annotation(column: ColumnDef) -> str:
+    # Looked up by value only, unique constraints allowing several null rows
+    annotation = column.annotation[len("Mapped[") : -1]
+    if annotation.startswith("Optional[") and annotation.endswith("]"):
+        return annotation[len("Optional[") : -1]
+    return annotation
 
-    for table_def in tables_def:
-        name_to_tables_def_map.setdefault(table_def.table_name, list()).append(
-            table_def
+
+def _get_lookup_helpers_code(table_def: TableDef) -> tuple[list[str], list[str]]:
+    """Lines of the class methods selecting rows of the table through its primary
+    key, unique constraints and the leading columns of its indexes, and lines of
+    their statements, built once after the class with a bound parameter per
+    column. Lookups on other columns are left out, as no index supports them."""
+
+    column_name_to_column_map = {
+        column.column_name: column for column in table_def.columns
+    }
+    attribute_names = {
+        attribute.attribute_name
+        for attribute in [*table_def.columns, *table_def.relationships]
+    }
+    # Unique keys first, so that a prefix of an index equal to one gives a get_by_
+    column_names_to_unique_map: dict[tuple[str, ...], bool] = dict()
+    for column_names in [
+        table_def.primary_key_column_names,
+        *(index.column_names for index in table_def.indexes if index.unique),
+    ]:
+        if column_names:
+            column_names_to_unique_map.setdefault(tuple(column_names), True)
+    for column_names in [
+        table_def.primary_key_column_names,
+        *(index.column_names for index in table_def.indexes),
+    ]:
+        for i in range(1, len(column_names) + 1):
+            column_names_to_unique_map.setdefault(tuple(column_names[:i]), False)
+
+    python_table_name = _python_table_name(table_def.table_name)
+    lines: list[str] = list()
+    statement_lines: list[str] = list()
+    for column_names, unique in column_names_to_unique_map.items():
+        if not all(
+            column_name in column_name_to_column_map for column_name in column_names
+        ):
+            continue
+        columns = [
+            column_name_to_column_map[column_name] for column_name in column_names
+        ]
+        method_name = ("get_by_" if unique else "list_by_") + "_and_".join(
+            column.attribute_name for column in columns
+        )
+        if method_name in attribute_names:
+            continue
+        parameters = [
+            (
+                column.attribute_name
+                + ("_" if column.attribute_name in ("cls", "session") else ""),
+                column,
+            )
+            for column in columns
+        ]
+        signature = ", ".join(
+            f"{parameter}: {_get_lookup_parameter_annotation(column)}"
+            for parameter, column in parameters
+        )
+        conditions = ", ".join(
+            f"{python_table_name}.{column.attribute_name} == bindparam({column.attribute_name!r})"
+            for column in columns
         )
+        statement_name = f"_{python_table_name}_{method_name}"
+        statement_lines.append(
+            f"{statement_name} = select({python_table_name}).where({conditions})"
+        )
+        values = ", ".join(
+            f"{column.attribute_name!r}: {parameter}"
+            for parameter, column in parameters
+        )
+        statement = f"{statement_name}, {{{values}}}"
+        lines.extend(
+            [
+                "",
+                "    @classmethod",
+                (
+                    f'    def {method_name}(cls, session: Session, {signature}) -> Optional["{python_table_name}"]:'
+                    if unique
+                    else f'    def {method_name}(cls, session: Session, {signature}) -> list["{python_table_name}"]:'
+                ),
+                (
+                    f"        return session.scalars({statement}).one_or_none()"
+                    if unique
+                    else f"        return list(session.scalars({statement}))"
+                ),
+            ]
+        )
+    return lines, statement_lines
 
-    return name_to_tables_def_map
 
+def _get_used_imports_code(
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]],
+    used_names: set[str],
+) -> str:
+    lines: list[str] = list()
+    module_to_imported_map: dict[str, list[str]] = dict()
+    for name in sorted(used_names & name_to_imports_map.keys()):
+        for module_name, imported in name_to_imports_map[name]:
+            if module_name is None:
+                lines.append(f"import {imported}")
+            else:
+                module_to_imported_map.setdefault(module_name, list()).append(imported)
+    lines.extend(
+        f"from {module_name} import {', '.join(imported)}"
+        for module_name, imported in module_to_imported_map.items()
+    )
+    return "\n".join(lines)
 
-def _fusion_tables(table_name: str, tables_def: list[TableDef]) -> TableDef:
-    if not tables_def:
-        raise ValueError(f"No table_def given for {table_name}.")
 
-    table_name = tables_def[0].table_name
-    db_name = tables_def[0].db_name
-    schema_name = tables_def[0].schema_name
+def _get_module_code(
+    name_to_imports_map: dict[str, list[tuple[str | None, str]]],
+    tables_def: list[TableDef],
+    sql_dialect: SqlDialect,
+    record_class: bool = False,
+    lookup_helpers: bool = False,
+    db_package_prefix: str = "..",
+    key_to_module_map: dict[tuple[str, str], tuple[str, str]] | None = None,
+) -> str:
+    """Code of a module of the tables, each with its lookup helpers if
+    `lookup_helpers`, followed by its record class if `record_class`, importing
+    only the names they use.
 
-    relation_ships: set[str] = set()
+    Tables of other modules are imported for type checkers from their schema,
+    relative to the database package through `db_package_prefix`. Their modules
+    are imported as well if `key_to_module_map` is given, see
+    `_get_modules_imports_code`.
+    """
 
-    for table_def in tables_def:
-        if table_def.table_name != table_name:
-            raise ValueError(
-                f"Table def table name is different from the others {table_name=}, {table_def.table_name}."
+    match sql_dialect:
+        case SqlDialect.POSTGRESQL:
+            table_codes: list[str] = list()
+            used_codes: list[str] = list()
+            for table_def in tables_def:
+                # Dataclass fields with a default must come after the ones without
+                attributes: list[ColumnDef | RelationshipDef] = [
+                    *(c for c in table_def.columns if not c.default_none),
+                    *(r for r in table_def.relationships if not r.default_none),
+                    *(c for c in table_def.columns if c.default_none),
+                    *(r for r in table_def.relationships if r.default_none),
+                ]
+                lines = [table_def.header_str, ""]
+                lines.extend(_get_attribute_code(attribute) for attribute in attributes)
+                # Attribute names are bindings, only their annotation and call load
+                # names
+                used_codes.append(table_def.header_str)
+                used_codes.extend(
+                    f"{attribute.annotation} {attribute.call}"
+                    for attribute in attributes
+                )
+                if lookup_helpers:
+                    lookup_helpers_lines, statement_lines = _get_lookup_helpers_code(
+                        table_def
+                    )
+                    used_codes.extend(lookup_helpers_lines)
+                    used_codes.extend(statement_lines)
+                    lines.extend(lookup_helpers_lines)
+                    if statement_lines:
+                        lines.extend(["", "", *statement_lines])
+                if record_class:
+                    record_code = _get_record_code(
+                        table_def,
+                        f"{_python_table_name(table_def.table_name)}.__table__",
+                    )
+                    used_codes.append(record_code)
+                    lines.extend(["", "", record_code])
+                table_codes.append("\n".join(lines))
+
+            used_names = set(
+                LOADED_NAME_PATTERN.findall(
+                    STRING_LITERAL_PATTERN.sub("''", "\n".join(used_codes))
+                )
             )
-        if table_def.db_name != db_name:
-            raise ValueError(
-                f"Table def db name is different from the others {table_name=} {db_name=}, {table_def.db_name}."
+            table_imports_code = _get_table_imports_code(tables_def, db_package_prefix)
+            if table_imports_code:
+                used_names.add("TYPE_CHECKING")
+            modules_imports_code = (
+                _get_modules_imports_code(
+                    tables_def,
+                    {
+                        (table_import.schema_name or "", table_import.table_name)
+                        for table_def in tables_def
+                        for table_import in table_def.imports
+                    },
+                    key_to_module_map,
+                    db_package_prefix,
+                )
+                if key_to_module_map is not None
+                else ""
             )
-        if table_def.schema_name != schema_name:
+            return (
+                _get_used_imports_code(name_to_imports_map, used_names)
+                + "\n"
+                + (modules_imports_code + "\n" if modules_imports_code else "")
+                + table_imports_code
+                + "\n\n"
+                + "\n\n\n".join(table_codes)
+                + "\n"
+            )
+        case _:
             raise ValueError(
-                f"Table def schema name is different from the others {table_name=} {schema_name=}, {table_def.schema_name}."
+                f"No support yet for the {settings.db_settings.sql_dialect=}"
             )
-        splits = table_def.raw_str.split("\n")
-        for line in splits:
-            if "] = relationship(" in line:
-                relation_ships.add(line)
-
-    raw_str = tables_def[0].raw_str
-    for relation_ship in relation_ships:
-        if relation_ship not in raw_str:
-            raw_str = raw_str + "\n" + relation_ship
-
-    return TableDef(
-        raw_str=raw_str,
-        table_name=table_name,
-        db_name=db_name,
-        schema_name=schema_name,
-    )
 
 
 def _get_python_name_to_table_def_map(
@@ -89,105 +322,215 @@ def _get_python_name_to_table_def_map(
     return python_name_to_table_def_map
 
 
+def _get_table_index_entry(table_def: TableDef) -> TableIndexEntry:
+    python_table_name = _python_table_name(table_def.table_name)
+    return TableIndexEntry(
+        db_name=table_def.db_name,
+        schema_name=table_def.schema_name,
+        table_name=table_def.table_name,
+        related_python_table_names=sorted(
+            {
+                relationship.target_python_table_name
+                for relationship in table_def.relationships
+                if relationship.target_python_table_name != python_table_name
+            }
+        ),
+    )
+
+
 def _fill_table_imports(
     table_def: TableDef, python_name_to_table_def_map: dict[str, TableDef]
 ) -> None:
-    tables_to_import_python_names: set[str] = set()
-    splits = table_def.raw_str.split("\n")
-
-    for split in splits:
-        if "] = relationship(" in split:
-            relationship_match = re.search(r"relationship\(\s*'([^']+)'", split)
-            if not relationship_match:
-                raise ValueError(
-                    f"Problem during python file generation, could not find relationship table name. {split=}"
-                )
-            tables_to_import_python_names.add(relationship_match.group(1))
+    tables_to_import_python_names = {
+        relationship.target_python_table_name
+        for relationship in table_def.relationships
+    }
 
-    for python_table_name in tables_to_import_python_names:
+    # Assigned rather than extended, so that a table can be rendered again
+    table_imports: list[TableImport] = list()
+    for python_table_name in sorted(tables_to_import_python_names):
         if not python_table_name in python_name_to_table_def_map:
             raise ValueError(f"Could not find table def. {python_table_name=}")
         table_def_to_import = python_name_to_table_def_map[python_table_name]
-        table_def.imports.append(
+        table_imports.append(
             TableImport(
                 schema_name=table_def_to_import.schema_name,
                 table_name=table_def_to_import.table_name,
             )
         )
+    table_def.imports = table_imports
 
 
 def _set_table_default_none(table_def: TableDef) -> None:
-    lines: list[str] = list()
-    nullable_lines: list[str] = list()
-    not_nullable_lines: list[str] = list()
-    for line in table_def.raw_str.split("\n"):
-        column_match = re.search(r"^ {4}([a-z_]+):", line)
-        if column_match:
-            if "Mapped[Optional" in line:
-                nullable_lines.append("    " + line.strip()[:-1] + ",default=None)")
-            else:
-                not_nullable_lines.append(line)
-        else:
-            lines.append(line)
-    table_def.raw_str = "\n".join(lines + not_nullable_lines + nullable_lines)
+    for attribute in [*table_def.columns, *table_def.relationships]:
+        if attribute.nullable:
+            attribute.default_none = True
 
 
 def _set_table_inits_false(
     table_def: TableDef, init_false_column_names: list[str]
 ) -> None:
     init_false_columns: set[str] = {cn for cn in init_false_column_names}
-    for line in table_def.raw_str.split("\n"):
-        if "PrimaryKeyConstraint(" in line:
-            primary_match = re.search(r"PrimaryKeyConstraint\(\s*'([^']+)'", line)
-            if not primary_match:
-                raise ValueError(
-                    f"Problem during python file generation, could not find primary key column name. {line=}"
-                )
-            init_false_columns.add(primary_match.group(1))
-        if "ForeignKeyConstraint(" in line:
-            foreign_match = re.search(r"ForeignKeyConstraint\(\s*\['([^',]+)'\]", line)
-            if not foreign_match:
-                continue  # Can happen due to multiple columns in foreign key
-            init_false_columns.add(foreign_match.group(1))
-
-    lines_to_init_false: set[str] = set()
-    for line in table_def.raw_str.split("\n"):
-        column_match = re.search(r"^ {4}([a-z_]+):", line)
-        if not column_match:
-            continue
-        column_name = column_match.group(1)
-        # Default init false columns
-        if column_name in init_false_columns:
-            lines_to_init_false.add(line)
-            continue
-        # Foreign parents to prevent typing issues
-        if (
-            "] = relationship(" in line
-            and f"ForeignKeyConstraint(['{column_name}" not in table_def.raw_str
-        ):
-            lines_to_init_false.add(line)
-            continue
+    # Every column of the primary key and of the foreign keys, composite ones
+    # included
+    init_false_columns.update(table_def.primary_key_column_names)
+    for foreign_key in table_def.foreign_keys:
+        init_false_columns.update(foreign_key.column_names)
 
-    lines: list[str] = list()
-    for line in table_def.raw_str.split("\n"):
-        if line in lines_to_init_false:
-            lines.append("    " + line.strip()[:-1] + ",init=False)")
-        else:
-            lines.append(line)
-    table_def.raw_str = "\n".join(lines)
+    for column in table_def.columns:
+        if column.column_name in init_false_columns:
+            column.init = False
 
-
-def _get_table_imports_code(table_def: TableDef) -> str:
-    lines: list[str] = list()
-    for table_import in table_def.imports:
-        if table_import.schema_name:
-            lines.append(
-                f"from ..{table_import.schema_name} import {_python_table_name(table_import.table_name)}"
+    # Relationships are set through their foreign key columns, except the ones
+    # named after the start of them, to prevent typing issues
+    foreign_key_prefixes: set[str] = set()
+    for foreign_key in table_def.foreign_keys:
+        if foreign_key.column_names:
+            first_column_name = foreign_key.column_names[0]
+            foreign_key_prefixes.update(
+                first_column_name[:i] for i in range(1, len(first_column_name) + 1)
             )
-        else:
-            lines.append(
-                f"from .{table_import.table_name} import {_python_table_name(table_import.table_name)}"
+    for relationship in table_def.relationships:
+        if relationship.attribute_name not in foreign_key_prefixes:
+            relationship.init = False
+
+
+def _get_lazy_from_statistics(
+    table_def: TableDef,
+    relationship: RelationshipDef,
+    target_table_def: TableDef,
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]],
+) -> LazyStrategy | None:
+    """Loader strategy of the relationship, given the estimated row counts of the
+    tables, None for the default one.
+
+    Relationships are loaded along with their parents, in a query per
+    relationship rather than per row: many to one ones always, joined for small
+    dimension tables referring to no other table, and collections of a bounded
+    number of rows per parent. Larger collections raise unless loaded
+    explicitly, collections of unknown size are left to the default.
+    """
+
+    def get_row_estimate(schema_name: str | None, table_name: str) -> float | None:
+        return schema_to_table_to_row_estimate_map.get(schema_name or "", dict()).get(
+            table_name
+        )
+
+    if not relationship.annotation.startswith(COLLECTION_ANNOTATION_PREFIXES):
+        if target_table_def is table_def or target_table_def.foreign_keys:
+            return LazyStrategy.SELECTIN
+        row_estimate = get_row_estimate(
+            target_table_def.schema_name, target_table_def.table_name
+        )
+        if row_estimate is not None and row_estimate <= JOINED_MAX_ROW_ESTIMATE:
+            return LazyStrategy.JOINED
+        return LazyStrategy.SELECTIN
+
+    # Many to many collections hold as many rows as their association table
+    secondary_match = SECONDARY_PATTERN.search(relationship.call)
+    if secondary_match is None:
+        collection_row_estimate = get_row_estimate(
+            target_table_def.schema_name, target_table_def.table_name
+        )
+    else:
+        secondary_schema_name, _, secondary_table_name = secondary_match.group(
+            2
+        ).rpartition(".")
+        collection_row_estimate = get_row_estimate(
+            secondary_schema_name or table_def.schema_name, secondary_table_name
+        )
+    row_estimate = get_row_estimate(table_def.schema_name, table_def.table_name)
+    if collection_row_estimate is None or not row_estimate:
+        return None
+    if collection_row_estimate / row_estimate <= SELECTIN_MAX_ROWS_PER_PARENT:
+        return LazyStrategy.SELECTIN
+    return LazyStrategy.RAISE_ON_SQL
+
+
+def _set_table_lazy(
+    table_def: TableDef,
+    python_name_to_table_def_map: dict[str, TableDef],
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] | None,
+    relationship_to_lazy_map: dict[str, LazyStrategy],
+) -> None:
+    """Sets the loader strategy of the relationships, from the row estimates if
+    given, overridden by `relationship_to_lazy_map`."""
+
+    for relationship in table_def.relationships:
+        target_table_def = python_name_to_table_def_map[
+            relationship.target_python_table_name
+        ]
+        lazy = relationship_to_lazy_map.get(
+            f"{table_def.db_name}.{table_def.schema_name}.{table_def.table_name}.{relationship.attribute_name}"
+        )
+        if lazy is None and schema_to_table_to_row_estimate_map is not None:
+            lazy = _get_lazy_from_statistics(
+                table_def,
+                relationship,
+                target_table_def,
+                schema_to_table_to_row_estimate_map,
             )
+        # The default is left out of the code
+        relationship.lazy = None if lazy == LazyStrategy.SELECT else lazy
+        # Eager loaders skip a table already loaded above them, so self references
+        # would be loaded on access without a depth, a level being loaded
+        relationship.join_depth = (
+            1
+            if target_table_def is table_def and lazy in EAGER_LAZY_STRATEGIES
+            else None
+        )
+
+
+def _get_modules_imports_code(
+    tables_def: list[TableDef],
+    referred_keys: set[tuple[str, str]],
+    key_to_module_map: dict[tuple[str, str], tuple[str, str]],
+    db_package_prefix: str,
+) -> str:
+    """Imports of the modules of the tables `tables_def` refer to, besides their
+    own, looked up in `key_to_module_map` as (package, module_name) relative to
+    the database package.
+
+    Importing a module then registers every table it needs, whichever is imported
+    first and whatever the init files load.
+    """
+
+    modules = {
+        key_to_module_map[(table_def.schema_name or "", table_def.table_name)]
+        for table_def in tables_def
+    }
+    referred_modules = {
+        key_to_module_map[key] for key in referred_keys if key in key_to_module_map
+    }
+    return "\n".join(
+        f"from {db_package_prefix}{package} import {module_name}"
+        for package, module_name in sorted(referred_modules - modules)
+    )
+
+
+def _get_table_imports_code(
+    tables_def: list[TableDef], db_package_prefix: str = ".."
+) -> str:
+    """Imports of the tables related to `tables_def`, for type checkers, besides
+    the ones of the same module"""
+
+    module_keys = {
+        (table_def.schema_name, table_def.table_name) for table_def in tables_def
+    }
+    lines: list[str] = list()
+    for table_def in tables_def:
+        for table_import in table_def.imports:
+            key = (table_import.schema_name, table_import.table_name)
+            # A table importing itself is kept in modules of its own, as with a
+            # module per table
+            if key in module_keys and len(tables_def) > 1:
+                continue
+            if table_import.schema_name:
+                line = f"from {db_package_prefix}{table_import.schema_name} import {_python_table_name(table_import.table_name)}"
+            else:
+                line = f"from .{table_import.table_name} import {_python_table_name(table_import.table_name)}"
+            if line not in lines:
+                lines.append(line)
     if lines:
         return "\n    ".join(["if TYPE_CHECKING:"] + lines)
     else:
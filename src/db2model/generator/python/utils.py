@@ -1,29 +1,145 @@
-import autoflake
+from functools import lru_cache
+from logging import Logger
+from typing import TypeVar
+
+import black
+import isort
 from black import FileMode, format_file_contents
 from black.report import NothingChanged
 from isort import code as isort_code
 
 from db2model.config.settings import Db2ModelSettings
+from db2model.types import Emitter, ModelStyle, ModuleLayout
+
+from .cache import FormatCache
+from .emitter import (
+    BLACK_MAJOR_VERSION,
+    ISORT_MAJOR_VERSION,
+    UnsupportedCode,
+    _emit_code,
+)
+
+BLACK_MODE = FileMode()
+
+T = TypeVar("T")
 
 
 def _python_table_name(table_name: str):
     return "".join(w.capitalize() for w in table_name.split("_"))
 
 
-def _formate_code(code: str) -> str:
-    try:
-        code = autoflake.fix_code(
-            code, remove_unused_variables=True, remove_all_unused_imports=True
+def _python_core_table_name(table_name: str):
+    # As sqlacodegen names its Table objects
+    return f"t_{table_name}"
+
+
+def _has_schema_modules(settings: Db2ModelSettings) -> bool:
+    """Whether the tables of a schema are generated together, in its modules"""
+
+    return (
+        settings.model_style == ModelStyle.CORE
+        or settings.module_layout == ModuleLayout.SCHEMA
+    )
+
+
+def _db_package_prefix(settings: Db2ModelSettings) -> str:
+    """Relative import of the database package from a generated table module"""
+
+    if _has_schema_modules(settings) and not settings.tables_per_module:
+        return "."
+    return ".."
+
+
+def _split_schema_tables(
+    schema_name: str, tables: list[T], tables_per_module: int
+) -> list[tuple[str | None, list[T]]]:
+    """(module_name, tables) of the modules of a schema, module_name being None
+    when the schema is a module of its own"""
+
+    if not tables_per_module:
+        return [(None, tables)]
+    return [
+        (f"{schema_name}_{index}", tables[start : start + tables_per_module])
+        for index, start in enumerate(range(0, len(tables), tables_per_module))
+    ]
+
+
+def _formatter_key() -> str:
+    """Everything besides the code itself that the formatted output depends on."""
+
+    return "|".join(
+        [
+            f"isort={isort.__version__}",
+            f"black={black.__version__}",
+            repr(BLACK_MODE),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def _is_emitter_supported() -> bool:
+    """Whether the installed formatters are the ones the native emitter mirrors,
+    other versions possibly formatting the code otherwise"""
+
+    return (
+        int(black.__version__.split(".")[0]) == BLACK_MAJOR_VERSION
+        and int(isort.__version__.split(".")[0]) == ISORT_MAJOR_VERSION
+    )
+
+
+def _check_emitter(settings: Db2ModelSettings, logger: Logger) -> None:
+    if settings.emitter == Emitter.NATIVE and not _is_emitter_supported():
+        logger.warning(
+            f"The native emitter mirrors black {BLACK_MAJOR_VERSION}.x and isort {ISORT_MAJOR_VERSION}.x, not the installed black {black.__version__} and isort {isort.__version__}. Rendering the code with the formatters instead."
+        )
+
+
+def _check_stream(settings: Db2ModelSettings, logger: Logger) -> None:
+    if settings.stream_chunk_size and _has_schema_modules(settings):
+        logger.warning(
+            f"Streamed tables are kept until the last chunk with {settings.model_style.value=} and {settings.module_layout.value=}, as schema modules are written at once. Memory grows with the database rather than with {settings.stream_chunk_size=}, use the TABLE layout of the ORM style to bound it."
         )
-        code = isort_code(code)
+
+
+def _formate_code(code: str, format_cache: FormatCache | None = None) -> str:
+    if format_cache is not None:
+        formatted_code = format_cache.get(code)
+        if formatted_code is not None:
+            return formatted_code
+
+    try:
+        formatted_code = isort_code(code)
         try:
-            code = format_file_contents(code, fast=False, mode=FileMode())
+            formatted_code = format_file_contents(
+                formatted_code, fast=False, mode=BLACK_MODE
+            )
         except NothingChanged:
             pass
-        return code
     except Exception:
         raise Exception(f"Could not parse: {code}")
 
+    if format_cache is not None:
+        format_cache.set(code, formatted_code)
+    return formatted_code
+
+
+def _render_code(
+    code: str, emitter: Emitter, format_cache: FormatCache | None = None
+) -> str:
+    match emitter:
+        case Emitter.FORMATTERS:
+            return _formate_code(code, format_cache)
+        case Emitter.NATIVE:
+            if not _is_emitter_supported():
+                return _formate_code(code, format_cache)
+            try:
+                return _emit_code(code)
+            except UnsupportedCode:
+                return _formate_code(code, format_cache)
+        case _:
+            raise ValueError(f"No support yet for the {emitter=}")
+
 
 def _join_imports_raw_text(raws: set[str]) -> str:
-    return "\n".join(raws)
+    # Sorted so that identical inputs give identical code, and cache hits.
+    return "\n".join(sorted(raws))
@@ -0,0 +1,471 @@
+import select
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from logging import Logger
+from pathlib import Path
+
+from sqlalchemy import Connection
+
+from db2model.config import Db2ModelSettings, TableFilter
+from db2model.models import DbManifest, TableDef
+from db2model.profiling import Profiler
+from db2model.types import Language
+
+from .bulk import _get_serial_columns
+from .cache import FormatCache
+from .connections import ConnectionPool, _get_connection_pool
+from .files import _write_code_files
+from .fingerprint import (
+    _get_foreign_key_edges,
+    _get_schema_fingerprints,
+    _get_settings_hash,
+    _get_table_fingerprints,
+    _load_manifest,
+    _write_manifest,
+)
+from .generator import (
+    _get_db_package_paths,
+    _get_db_tables_def,
+    _get_init_codes,
+    _get_tables_codes,
+    _write_base_file,
+)
+from .raw import _generate_raw_code, _get_schema_names, _sort_table_keys
+from .statistics import _get_row_estimates
+from .table import _get_python_name_to_table_def_map, _get_table_index_entry
+from .utils import _check_emitter, _formatter_key, _has_schema_modules
+from .writer import OutputWriter
+
+TableKey = tuple[str, str]
+
+
+class _WatchedDb:
+    """Catalog state of a database as of its last generation, along with the
+    tables generated from it."""
+
+    def __init__(
+        self,
+        db_name: str,
+        schema_names: list[str],
+        table_filter: TableFilter,
+    ) -> None:
+        self.db_name = db_name
+        self.schema_names = schema_names
+        self.table_filter = table_filter
+        self.table_fingerprints: dict[TableKey, str] = dict()
+        self.foreign_key_edges: set[tuple[TableKey, TableKey]] = set()
+        self.name_to_imports_map: dict[str, list[tuple[str | None, str]]] = dict()
+        # Ordered as by a full generation, so that __init__.py files and schema
+        # modules keep their order
+        self.key_to_table_def_map: dict[TableKey, TableDef] = dict()
+
+    def is_generated(self, key: TableKey) -> bool:
+        """Whether a full generation would give a file for the table, tables out
+        of the watched schemas only being generated when referred to."""
+
+        return (
+            key[0] in self.schema_names and self.table_filter.is_table_included(*key)
+        ) or key in self.key_to_table_def_map
+
+
+def _get_neighbor_keys(
+    keys: set[TableKey], foreign_key_edges: set[tuple[TableKey, TableKey]]
+) -> set[TableKey]:
+    """Tables referring to or referred by one of `keys`"""
+
+    neighbor_keys: set[TableKey] = set()
+    for key, referred_key in foreign_key_edges:
+        if key in keys:
+            neighbor_keys.add(referred_key)
+        if referred_key in keys:
+            neighbor_keys.add(key)
+    return neighbor_keys
+
+
+def _get_changed_keys(
+    previous_fingerprints: dict[TableKey, str], fingerprints: dict[TableKey, str]
+) -> set[TableKey]:
+    """Tables whose fingerprint changed, or which were created or dropped"""
+
+    changed_keys = {
+        key
+        for key in previous_fingerprints.keys() | fingerprints.keys()
+        if previous_fingerprints.get(key) != fingerprints.get(key)
+    }
+    # Objects not tied to a table, such as enums, can be used by any table of
+    # their schema
+    return {
+        (schema_name, table_name)
+        for schema_name, table_name in previous_fingerprints.keys()
+        | fingerprints.keys()
+        if table_name
+        and (
+            (schema_name, table_name) in changed_keys
+            or (schema_name, "") in changed_keys
+        )
+    }
+
+
+def _write_manifest_of_db(
+    settings: Db2ModelSettings, connection: Connection, db_name: str
+) -> None:
+    manifest = _load_manifest(settings.path_settings.manifest_filepath)
+    manifest.db_to_manifest_map[db_name] = DbManifest(
+        settings_hash=_get_settings_hash(settings),
+        schema_to_fingerprint_map=_get_schema_fingerprints(
+            connection, settings.db_settings.sql_dialect
+        ),
+    )
+    _write_manifest(settings.path_settings.manifest_filepath, manifest)
+
+
+def _generate_watched_db(
+    settings: Db2ModelSettings,
+    watched_db: _WatchedDb,
+    pool: ConnectionPool,
+    format_cache: FormatCache | None,
+    format_executor: Executor | None,
+    profiler: Profiler,
+    logger: Logger,
+) -> bool:
+    """Regenerates the tables changed since the last generation, every table on
+    the first one. Returns whether anything was regenerated.
+
+    A table file depends on the tables it refers to and the ones referring to it,
+    through its relationships. Those are regenerated along with the changed
+    tables, after reflecting their own neighbors.
+    """
+
+    sql_dialect = settings.db_settings.sql_dialect
+    db_name = watched_db.db_name
+    start = time.perf_counter()
+    with pool.connect(db_name) as connection:
+        # Read before reflecting, so that changes made meanwhile are caught by the
+        # next poll
+        table_fingerprints = _get_table_fingerprints(connection, sql_dialect)
+        if table_fingerprints == watched_db.table_fingerprints:
+            return False
+        foreign_key_edges = _get_foreign_key_edges(connection, sql_dialect)
+        # Read again with every change, as a change alone does not warrant
+        # regenerating the tables whose estimates drifted
+        schema_to_table_to_row_estimate_map = (
+            _get_row_estimates(connection, sql_dialect)
+            if settings.lazy_from_statistics
+            else None
+        )
+        schema_to_table_to_serial_column_names_map = (
+            _get_serial_columns(connection, sql_dialect)
+            if settings.bulk_modules
+            else None
+        )
+
+        first_generation = not watched_db.table_fingerprints
+        schema_to_table_names_map: dict[str, list[str]] | None = None
+        affected_keys: set[TableKey] = set()
+        if not first_generation:
+            changed_keys = _get_changed_keys(
+                watched_db.table_fingerprints, table_fingerprints
+            )
+            affected_keys = {
+                key
+                for key in changed_keys
+                | _get_neighbor_keys(
+                    changed_keys, foreign_key_edges | watched_db.foreign_key_edges
+                )
+                if watched_db.is_generated(key)
+            }
+            existing_keys = {key for key in affected_keys if key in table_fingerprints}
+            schema_to_table_names_map = dict()
+            for schema_name, table_name in existing_keys | {
+                key
+                for key in _get_neighbor_keys(existing_keys, foreign_key_edges)
+                if watched_db.is_generated(key) and key in table_fingerprints
+            }:
+                schema_to_table_names_map.setdefault(schema_name, list()).append(
+                    table_name
+                )
+
+        logger.info(f"Reflecting {db_name=}, {schema_to_table_names_map=}.")
+        raw_code = (
+            _generate_raw_code(
+                connection,
+                db_name,
+                (
+                    watched_db.schema_names
+                    if schema_to_table_names_map is None
+                    else list(schema_to_table_names_map)
+                ),
+                profiler,
+                schema_to_table_names_map,
+                watched_db.table_filter,
+            )
+            if schema_to_table_names_map is None or schema_to_table_names_map
+            else None
+        )
+
+        # Committed to `watched_db` once written, so that a failed write is
+        # retried on the next poll
+        key_to_table_def_map = dict(watched_db.key_to_table_def_map)
+        name_to_imports_map = dict(watched_db.name_to_imports_map)
+        tables_def_to_render: list[TableDef] = list()
+        # Schemas whose tables were added or dropped
+        resized_schema_names: set[str | None] = set()
+        # Files of dropped tables and schemas, removed along with the write
+        removed_filepaths: list[Path] = list()
+        if raw_code is not None:
+            # Reflected tables are the generated ones, picked by the filter on the
+            # first generation and by their keys on the next ones
+            db_tables = _get_db_tables_def(
+                settings, db_name, raw_code, None, profiler, logger
+            )
+            if db_tables is not None:
+                db_name_to_imports_map, tables_def = db_tables
+                name_to_imports_map.update(db_name_to_imports_map)
+                for table_def in tables_def:
+                    key = (table_def.schema_name or "", table_def.table_name)
+                    if key not in key_to_table_def_map:
+                        resized_schema_names.add(table_def.schema_name)
+                    if (
+                        first_generation
+                        or key in affected_keys
+                        or key not in key_to_table_def_map
+                    ):
+                        key_to_table_def_map[key] = table_def
+                        tables_def_to_render.append(table_def)
+
+        dropped_schema_names: set[str | None] = set()
+        for key in affected_keys - table_fingerprints.keys():
+            table_def = key_to_table_def_map.pop(key, None)
+            if table_def is None:
+                continue
+            logger.info(f"Removing dropped table {key=}.")
+            resized_schema_names.add(table_def.schema_name)
+            if _has_schema_modules(settings):
+                dropped_schema_names.add(table_def.schema_name)
+            else:
+                removed_filepaths.append(
+                    settings.path_settings.table_filepath(
+                        language=Language.PYTHON,
+                        sql_dialect=sql_dialect,
+                        db_name=db_name,
+                        table_name=table_def.table_name,
+                        schema_name=table_def.schema_name,
+                    )
+                )
+            if settings.bulk_modules:
+                removed_filepaths.append(
+                    settings.path_settings.bulk_table_filepath(
+                        sql_dialect=sql_dialect,
+                        db_name=db_name,
+                        table_name=table_def.table_name,
+                        schema_name=table_def.schema_name,
+                    )
+                )
+
+        if resized_schema_names:
+            # Added tables are rendered in place, as by a full generation
+            key_to_table_def_map = {
+                key: key_to_table_def_map[key]
+                for key in _sort_table_keys(
+                    list(key_to_table_def_map), foreign_key_edges
+                )
+            }
+
+        rendered_schema_names: set[str | None] = set()
+        if _has_schema_modules(settings):
+            # Schema modules are generated along with every table of their schema
+            rendered_schema_names = dropped_schema_names | {
+                table_def.schema_name for table_def in tables_def_to_render
+            }
+            if settings.tables_per_module and resized_schema_names:
+                # Tables of resized schemas can move to another module, which the
+                # modules of every schema may import
+                rendered_schema_names |= {
+                    table_def.schema_name for table_def in key_to_table_def_map.values()
+                }
+            tables_def_to_render = [
+                table_def
+                for table_def in key_to_table_def_map.values()
+                if table_def.schema_name in rendered_schema_names
+            ]
+            for schema_name in rendered_schema_names - {
+                table_def.schema_name for table_def in tables_def_to_render
+            }:
+                if settings.tables_per_module:
+                    schema_path = (
+                        settings.path_settings.python_path
+                        / db_name
+                        / (schema_name or "")
+                    )
+                    removed_filepaths.extend(schema_path.glob(f"{schema_name}_*.py"))
+                    removed_filepaths.append(schema_path / "__init__.py")
+                else:
+                    removed_filepaths.append(
+                        settings.path_settings.schema_filepath(
+                            language=Language.PYTHON,
+                            sql_dialect=sql_dialect,
+                            db_name=db_name,
+                            schema_name=schema_name,
+                        )
+                    )
+
+        filepath_to_code_map: dict[Path, str] = dict()
+        if key_to_table_def_map:
+            tables_def = list(key_to_table_def_map.values())
+            filepath_to_code_map = _get_init_codes(
+                settings,
+                [_get_table_index_entry(table_def) for table_def in tables_def],
+            )
+            filepath_to_code_map.update(
+                _get_tables_codes(
+                    settings,
+                    db_name,
+                    name_to_imports_map,
+                    _get_python_name_to_table_def_map(tables_def),
+                    tables_def_to_render,
+                    schema_to_table_to_row_estimate_map,
+                    schema_to_table_to_serial_column_names_map,
+                    profiler,
+                )
+            )
+            if settings.tables_per_module:
+                # Schemas with fewer tables are split into fewer modules
+                for schema_name in rendered_schema_names:
+                    schema_path = (
+                        settings.path_settings.python_path
+                        / db_name
+                        / (schema_name or "")
+                    )
+                    removed_filepaths.extend(
+                        module_path
+                        for module_path in schema_path.glob(f"{schema_name}_*.py")
+                        if module_path not in filepath_to_code_map
+                    )
+        if filepath_to_code_map or removed_filepaths:
+            # The first generation replaces the packages as a whole, dropping the
+            # files of a previous one, the next ones only touch their files
+            with OutputWriter(
+                _get_db_package_paths(settings, db_name) if first_generation else None
+            ) as writer:
+                writer.remove(removed_filepaths)
+                _write_code_files(
+                    filepath_to_code_map,
+                    writer,
+                    settings.emitter,
+                    format_cache,
+                    format_executor,
+                    profiler,
+                    db_name,
+                    logger,
+                )
+        _write_manifest_of_db(settings, connection, db_name)
+
+    watched_db.table_fingerprints = table_fingerprints
+    watched_db.foreign_key_edges = foreign_key_edges
+    watched_db.key_to_table_def_map = key_to_table_def_map
+    watched_db.name_to_imports_map = name_to_imports_map
+    logger.info(
+        f"Regenerated {len(tables_def_to_render)} table(s) of {db_name=} in {time.perf_counter() - start:.2f}s."
+    )
+    return True
+
+
+def _wait_for_changes(
+    notify_connections: list, interval: float, logger: Logger
+) -> None:
+    """Sleeps for `interval` seconds, or less if a notification comes in."""
+
+    if not notify_connections:
+        time.sleep(interval)
+        return
+    readable, _, _ = select.select(notify_connections, [], [], interval)
+    for notify_connection in readable:
+        for notify in notify_connection.notifies(timeout=0):
+            logger.debug(f"Notified of {notify.payload=}.")
+
+
+def watch_python_models(
+    settings: Db2ModelSettings,
+    logger: Logger,
+    interval: float = 1.0,
+    notify_channel: str | None = None,
+    profiler: Profiler | None = None,
+) -> None:
+    """Generates the models, then regenerates the tables whose catalog changed
+    until interrupted.
+
+    Catalogs are polled every `interval` seconds. With a `notify_channel`, see the
+    README for the event trigger sending on it, changes are picked up as soon as
+    they are committed.
+    """
+
+    if interval <= 0:
+        raise ValueError(f"Catalogs must be polled at a positive {interval=}")
+    if profiler is None:
+        profiler = Profiler()
+
+    pool = _get_connection_pool(settings, profiler, logger)
+    watched_dbs: list[_WatchedDb] = list()
+    notify_connections: list = list()
+    for db_name in settings.db_names:
+        schema_names = _get_schema_names(settings, db_name, logger)
+        if not schema_names:
+            logger.info(f"No schemas to watch in {db_name=}, skipping.")
+            continue
+        watched_dbs.append(
+            _WatchedDb(db_name, schema_names, settings.table_filter(db_name))
+        )
+        if notify_channel is not None:
+            from psycopg import sql
+
+            # Kept out of the pool, listening until the end
+            notify_connection = pool.engine(db_name).raw_connection().driver_connection
+            notify_connection.autocommit = True
+            notify_connection.execute(
+                sql.SQL("LISTEN {}").format(sql.Identifier(notify_channel))
+            )
+            notify_connections.append(notify_connection)
+
+    format_cache = (
+        FormatCache(
+            settings.path_settings.format_cache_path,
+            settings.format_cache_max_size,
+            _formatter_key(),
+        )
+        if settings.format_cache_max_size
+        else None
+    )
+    _check_emitter(settings, logger)
+    _write_base_file(settings, format_cache)
+    format_executor = (
+        ProcessPoolExecutor(max_workers=settings.format_jobs)
+        if settings.format_jobs > 1
+        else None
+    )
+    try:
+        while True:
+            for watched_db in watched_dbs:
+                try:
+                    _generate_watched_db(
+                        settings,
+                        watched_db,
+                        pool,
+                        format_cache,
+                        format_executor,
+                        profiler,
+                        logger,
+                    )
+                except Exception as e:
+                    # Retried on the next poll, the state being left untouched
+                    logger.error(
+                        f"Could not regenerate {watched_db.db_name=}. {str(e)}"
+                    )
+            _wait_for_changes(notify_connections, interval, logger)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+    finally:
+        if format_executor is not None:
+            format_executor.shutdown()
+        for notify_connection in notify_connections:
+            notify_connection.close()
+        pool.close()
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from types import TracebackType
+
+
+def _content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _is_unchanged(filepath: Path, content: bytes) -> bool:
+    """Whether `filepath` holds `content`, comparing hashes of the same size files"""
+
+    try:
+        if filepath.stat().st_size != len(content):
+            return False
+        return _content_hash(filepath.read_bytes()) == _content_hash(content)
+    except OSError:
+        return False
+
+
+def _replace_file(filepath: Path, content: bytes) -> None:
+    """Writes through a temporary file renamed over `filepath`, readers seeing
+    either the previous content or the new one."""
+
+    tmp_path = filepath.with_name(f".{filepath.name}.{uuid.uuid4().hex}.tmp")
+    # Permissions of a file created by open(), the umask applying to them
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _link_file(source_path: Path, filepath: Path) -> None:
+    """Hard links `source_path` at `filepath`, copying it with its modification
+    time where links are not supported."""
+
+    filepath.unlink(missing_ok=True)
+    try:
+        os.link(source_path, filepath)
+    except OSError:
+        shutil.copy2(source_path, filepath)
+
+
+def _get_version_path(package_path: Path) -> Path:
+    """New directory of a version of the package, next to it"""
+
+    return package_path.with_name(f".{package_path.name}.{uuid.uuid4().hex}")
+
+
+def _remove_path(path: Path) -> None:
+    if path.is_symlink() or not path.is_dir():
+        path.unlink(missing_ok=True)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class OutputWriter:
+    """Writes generated files, the ones under `package_paths` into a new version
+    of their package published in place of it at once, on leaving the context
+    without error.
+
+    Packages are links to their current version, replaced by a link to the new
+    one in a single rename, so that readers see either version as a whole. The
+    previous version is removed on the next generation, rather than under readers
+    still going through it. Where links are not supported, the package is renamed
+    aside and the new version renamed in its place.
+
+    Files already holding their content are not written again: staged, they are
+    linked from the published package, keeping their inode and modification time
+    for the tools caching on them. Files of a published package not written again,
+    as the ones of dropped tables, are not published, and packages left empty are
+    removed. Files out of those packages are removed through `remove`, only once
+    published as well.
+    """
+
+    def __init__(self, package_paths: list[Path] | None = None) -> None:
+        self.package_to_staging_path_map: dict[Path, Path] = {
+            package_path: _get_version_path(package_path)
+            for package_path in package_paths or list()
+        }
+        # Directories known to exist, each being created once
+        self.dir_paths: set[Path] = set()
+        # Removed on publishing, unless written meanwhile
+        self.removed_filepaths: set[Path] = set()
+        self.written_count = 0
+        self.unchanged_count = 0
+
+    def __enter__(self) -> "OutputWriter":
+        for package_path in self.package_to_staging_path_map:
+            # Previous versions, and the ones left over by an interrupted
+            # generation
+            current_version_name = (
+                os.readlink(package_path) if package_path.is_symlink() else None
+            )
+            version_pattern = re.compile(
+                rf"\.{re.escape(package_path.name)}\.([0-9a-f]{{32}}|link|previous|staging)"
+            )
+            if package_path.parent.is_dir():
+                for path in package_path.parent.iterdir():
+                    if (
+                        version_pattern.fullmatch(path.name)
+                        and path.name != current_version_name
+                    ):
+                        _remove_path(path)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+
+    def _staged_filepath(self, filepath: Path) -> Path:
+        for package_path, staging_path in self.package_to_staging_path_map.items():
+            if filepath.is_relative_to(package_path):
+                return staging_path / filepath.relative_to(package_path)
+        return filepath
+
+    def write(self, filepath_to_code_map: dict[Path, str]) -> None:
+        """Writes the codes, creating the directories they need up front"""
+
+        filepath_to_staged_filepath_map = {
+            filepath: self._staged_filepath(filepath)
+            for filepath in filepath_to_code_map
+        }
+        self.removed_filepaths -= filepath_to_code_map.keys()
+        for dir_path in sorted(
+            {
+                staged_filepath.parent
+                for staged_filepath in filepath_to_staged_filepath_map.values()
+            }
+            - self.dir_paths
+        ):
+            dir_path.mkdir(parents=True, exist_ok=True)
+            self.dir_paths.update([dir_path, *dir_path.parents])
+
+        for filepath, code in filepath_to_code_map.items():
+            content = code.encode()
+            staged_filepath = filepath_to_staged_filepath_map[filepath]
+            if _is_unchanged(filepath, content):
+                self.unchanged_count += 1
+                if staged_filepath != filepath:
+                    _link_file(filepath, staged_filepath)
+                continue
+            self.written_count += 1
+            _replace_file(staged_filepath, content)
+
+    def remove(self, filepaths: list[Path]) -> None:
+        """Removes the files on publishing, the ones of staged packages being left
+        out of them already"""
+
+        self.removed_filepaths.update(
+            filepath
+            for filepath in filepaths
+            if self._staged_filepath(filepath) == filepath
+        )
+
+    def publish(self) -> None:
+        """Swaps every staged package in place of the published one"""
+
+        for package_path, staging_path in self.package_to_staging_path_map.items():
+            if not staging_path.exists():
+                _remove_path(package_path)
+                continue
+            link_path = package_path.with_name(f".{package_path.name}.link")
+            link_path.unlink(missing_ok=True)
+            try:
+                # Relative, so that the output can be moved
+                os.symlink(staging_path.name, link_path, target_is_directory=True)
+            except OSError:
+                link_path = None
+            if package_path.is_dir() and not package_path.is_symlink():
+                # Written before links, or where they are not supported
+                previous_path = package_path.with_name(f".{package_path.name}.previous")
+                _remove_path(previous_path)
+                package_path.rename(previous_path)
+            if link_path is None:
+                staging_path.rename(package_path)
+            else:
+                os.replace(link_path, package_path)
+        self.package_to_staging_path_map = dict()
+        for filepath in self.removed_filepaths:
+            filepath.unlink(missing_ok=True)
+        self.removed_filepaths = set()
+
+    def discard(self) -> None:
+        """Removes the staged packages, the published ones and the files to remove
+        being left untouched"""
+
+        for staging_path in self.package_to_staging_path_map.values():
+            shutil.rmtree(staging_path, ignore_errors=True)
+        self.package_to_staging_path_map = dict()
+        self.removed_filepaths = set()
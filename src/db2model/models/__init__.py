@@ -1,7 +1,26 @@
+from .column_def import ColumnDef
+from .foreign_key_def import ForeignKeyDef
+from .index_def import IndexDef
+from .manifest import DbManifest, Manifest
+from .profile_report import PhaseRecord, ProfileReport
+from .relationship_def import RelationshipDef
+from .snapshot import DbSnapshot, Snapshot
 from .table_def import TableDef
+from .table_index_entry import TableIndexEntry
 from .table_import import TableImport
 
 __all__ = [
+    "ColumnDef",
+    "DbManifest",
+    "DbSnapshot",
+    "ForeignKeyDef",
+    "IndexDef",
+    "Manifest",
+    "PhaseRecord",
+    "ProfileReport",
+    "RelationshipDef",
+    "Snapshot",
     "TableDef",
     "TableImport",
+    "TableIndexEntry",
 ]
@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+# A plain dataclass rather than a model, as one is built for every column of every
+# table parsed and validating them took most of the parsing time
+@dataclass(slots=True)
+class ColumnDef:
+    attribute_name: str
+    column_name: str
+    # Source of the Mapped[...] annotation and of the mapped_column(...) call
+    annotation: str
+    call: str
+    nullable: bool
+    primary_key: bool
+    # Rendered inline as ForeignKey(...) in the call
+    foreign_key: bool
+    # Single column unique constraint or index rendered inline in the call
+    unique: bool = False
+    index: bool = False
+
+    init: bool = True
+    default_none: bool = False
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class ForeignKeyDef(BaseModel):
+    column_names: list[str]
+    referred_column_names: list[str]
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class IndexDef(BaseModel):
+    # In the order of the index, only its leading columns being able to use it alone
+    column_names: list[str]
+    unique: bool
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class DbManifest(BaseModel):
+    settings_hash: str
+    schema_to_fingerprint_map: dict[str, str]
+
+
+class Manifest(BaseModel):
+    db_to_manifest_map: dict[str, DbManifest] = dict()
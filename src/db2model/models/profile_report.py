@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+
+
+class PhaseRecord(BaseModel):
+    phase: str
+    db_name: str | None = None
+    schema_name: str | None = None
+
+    wall_seconds: float = 0.0
+    # CPU time of the thread running the phase, work done in format_jobs
+    # processes is not included
+    cpu_seconds: float = 0.0
+    # Peak resident set size of the process when the phase ended, None where the
+    # platform does not report it
+    peak_rss_bytes: int | None = None
+    # Number of schemas, tables or files the phase went through
+    item_count: int = 0
+
+
+class ProfileReport(BaseModel):
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_bytes: int | None
+    phases: list[PhaseRecord] = list()
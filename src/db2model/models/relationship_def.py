@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+from db2model.types import LazyStrategy
+
+
+# A plain dataclass rather than a model, as is ColumnDef
+@dataclass(slots=True)
+class RelationshipDef:
+    attribute_name: str
+    # Source of the Mapped[...] annotation and of the relationship(...) call
+    annotation: str
+    call: str
+    nullable: bool
+    target_python_table_name: str
+
+    init: bool = True
+    default_none: bool = False
+    # Rendered as lazy=..., SQLAlchemy default if None
+    lazy: LazyStrategy | None = None
+    # Rendered as join_depth=..., levels of a self reference loaded eagerly
+    join_depth: int | None = None
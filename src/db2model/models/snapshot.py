@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+from db2model.types import SqlDialect
+
+
+class DbSnapshot(BaseModel):
+    schema_names: list[str]
+    schema_to_fingerprint_map: dict[str, str]
+    # Code rendered by sqlacodegen from the reflected schemas
+    raw_code: str
+    # Estimated row counts of the tables, schema_name -> table_name -> rows
+    schema_to_table_to_row_estimate_map: dict[str, dict[str, float]] = dict()
+    # Columns defaulting to the next value of a sequence, for the bulk modules,
+    # schema_name -> table_name -> column names
+    schema_to_table_to_serial_column_names_map: dict[str, dict[str, list[str]]] = dict()
+
+
+class Snapshot(BaseModel):
+    format_version: int
+    sql_dialect: SqlDialect
+    # sqlacodegen version which rendered the raw code, for information
+    sqlacodegen_version: str
+    db_to_snapshot_map: dict[str, DbSnapshot] = dict()
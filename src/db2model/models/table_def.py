@@ -1,12 +1,26 @@
 from pydantic import BaseModel
 
+from .column_def import ColumnDef
+from .foreign_key_def import ForeignKeyDef
+from .index_def import IndexDef
+from .relationship_def import RelationshipDef
 from .table_import import TableImport
 
 
 class TableDef(BaseModel):
-    raw_str: str
     db_name: str
     schema_name: str | None
     table_name: str
 
+    # Class statement without its attributes, __tablename__ and __table_args__, or
+    # Table(...) statement without its columns for views and tables without
+    # primary key
+    header_str: str
+    primary_key_column_names: list[str] = list()
+    foreign_keys: list[ForeignKeyDef] = list()
+    # Unique constraints and indexes, inline ones included
+    indexes: list[IndexDef] = list()
+    columns: list[ColumnDef] = list()
+    relationships: list[RelationshipDef] = list()
+
     imports: list[TableImport] = list()
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class TableIndexEntry(BaseModel):
+    """What the __init__.py files need to know of a generated table"""
+
+    db_name: str
+    schema_name: str | None
+    table_name: str
+
+    # Classes its relationships refer to, itself excluded
+    related_python_table_names: list[str] = list()
@@ -0,0 +1,6 @@
+from .profiler import PhaseHook, Profiler
+
+__all__ = [
+    "PhaseHook",
+    "Profiler",
+]
@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from db2model.models import PhaseRecord, ProfileReport
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PhaseHook = Callable[[PhaseRecord], None]
+
+
+def _get_peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes everywhere else
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class Profiler:
+    """Records wall time, CPU time, peak RSS and item count of every phase of a
+    generation, per database and per schema where the phase allows it.
+
+    Each hook is called with the record of a phase as soon as the phase ends,
+    from the thread that ran it.
+    """
+
+    def __init__(self, hooks: list[PhaseHook] | None = None) -> None:
+        self.hooks: list[PhaseHook] = list(hooks or list())
+        self.records: list[PhaseRecord] = list()
+        self._lock = threading.Lock()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def add_hook(self, hook: PhaseHook) -> None:
+        self.hooks.append(hook)
+
+    @contextmanager
+    def phase(
+        self, phase: str, db_name: str | None = None, schema_name: str | None = None
+    ) -> Iterator[PhaseRecord]:
+        """Times the block, whose item_count can be set on the yielded record."""
+
+        record = PhaseRecord(phase=phase, db_name=db_name, schema_name=schema_name)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - start_wall
+            record.cpu_seconds = time.thread_time() - start_cpu
+            record.peak_rss_bytes = _get_peak_rss_bytes()
+            with self._lock:
+                self.records.append(record)
+                hooks = list(self.hooks)
+            for hook in hooks:
+                hook(record)
+
+    def report(self) -> ProfileReport:
+        with self._lock:
+            records = list(self.records)
+        return ProfileReport(
+            wall_seconds=time.perf_counter() - self._start_wall,
+            cpu_seconds=time.process_time() - self._start_cpu,
+            peak_rss_bytes=_get_peak_rss_bytes(),
+            phases=records,
+        )
@@ -7,3 +7,29 @@ class SqlDialect(str, Enum):
 
 class Language(str, Enum):
     PYTHON = "PYTHON"
+
+
+class Emitter(str, Enum):
+    FORMATTERS = "FORMATTERS"
+    NATIVE = "NATIVE"
+
+
+class LazyStrategy(str, Enum):
+    SELECT = "SELECT"
+    JOINED = "JOINED"
+    SELECTIN = "SELECTIN"
+    SUBQUERY = "SUBQUERY"
+    IMMEDIATE = "IMMEDIATE"
+    RAISE = "RAISE"
+    RAISE_ON_SQL = "RAISE_ON_SQL"
+    NOLOAD = "NOLOAD"
+
+
+class ModelStyle(str, Enum):
+    ORM = "ORM"
+    CORE = "CORE"
+
+
+class ModuleLayout(str, Enum):
+    TABLE = "TABLE"
+    SCHEMA = "SCHEMA"
@@ -0,0 +1,62 @@
+import importlib
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+from db2model.config import Db2ModelSettings, DbSettings, PathSettings
+from db2model.types import SqlDialect
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def shop_raw_code() -> str:
+    """sqlacodegen output of the catalog of data/shop.sql, on PostgreSQL"""
+
+    return (DATA_PATH / "shop.txt").read_text()
+
+
+@pytest.fixture
+def logger() -> logging.Logger:
+    return logging.getLogger("db2model.tests")
+
+
+@pytest.fixture
+def make_settings(tmp_path: Path):
+    def make_settings(**settings_kwargs) -> Db2ModelSettings:
+        return Db2ModelSettings(
+            path_settings=PathSettings(output_folder_root_path=tmp_path / "output"),
+            db_names=["db_tests"],
+            db_settings=DbSettings(
+                user="user",
+                password="password",
+                host="localhost",
+                port=5432,
+                sql_dialect=SqlDialect.POSTGRESQL,
+            ),
+            **settings_kwargs,
+        )
+
+    return make_settings
+
+
+@pytest.fixture
+def import_generated():
+    """Imports the generated package of a database, forgotten afterwards"""
+
+    imported_names: list[str] = list()
+
+    def import_generated(settings, db_name: str):
+        output_path = str(settings.path_settings.output_folder_root_path)
+        sys.path.insert(0, output_path)
+        imported_names.append(output_path)
+        return importlib.import_module(f"python.{db_name}")
+
+    yield import_generated
+    for output_path in imported_names:
+        sys.path.remove(output_path)
+    for name in list(sys.modules):
+        if name == "python" or name.startswith("python."):
+            del sys.modules[name]
@@ -0,0 +1,55 @@
+-- Catalog whose sqlacodegen output is shop.txt, regenerated with
+-- _generate_raw_code(connection, "db_tests", ["shop"], Profiler()) once loaded
+-- into a db_tests database
+CREATE SCHEMA shop;
+CREATE TABLE shop.users (
+    id serial PRIMARY KEY,
+    email text NOT NULL UNIQUE,
+    name text,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE shop.orders (
+    id bigserial PRIMARY KEY,
+    user_id integer NOT NULL REFERENCES shop.users (id),
+    total numeric(12, 2) NOT NULL,
+    note text
+);
+CREATE TABLE shop.order_items (
+    order_id bigint NOT NULL,
+    line_no smallint NOT NULL,
+    sku text NOT NULL,
+    quantity integer NOT NULL DEFAULT 1,
+    CONSTRAINT order_items_pk PRIMARY KEY (order_id, line_no),
+    CONSTRAINT order_items_order_fk FOREIGN KEY (order_id) REFERENCES shop.orders (id)
+);
+CREATE TABLE shop.shipments (
+    id integer GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    order_id bigint NOT NULL,
+    line_no smallint NOT NULL,
+    carrier text,
+    CONSTRAINT shipments_item_fk FOREIGN KEY (order_id, line_no)
+        REFERENCES shop.order_items (order_id, line_no)
+);
+CREATE TABLE shop.countries (code char(2) PRIMARY KEY, name text NOT NULL);
+CREATE TABLE shop.categories (
+    id smallserial PRIMARY KEY,
+    parent_id smallint REFERENCES shop.categories (id),
+    label text NOT NULL
+);
+CREATE TABLE shop.tags (id integer PRIMARY KEY, label text NOT NULL);
+CREATE TABLE shop.user_tags (
+    user_id integer NOT NULL REFERENCES shop.users (id),
+    tag_id integer NOT NULL REFERENCES shop.tags (id),
+    PRIMARY KEY (user_id, tag_id)
+);
+CREATE SEQUENCE shop.invoice_numbers;
+CREATE TABLE shop.invoices (
+    number bigint PRIMARY KEY DEFAULT nextval('shop.invoice_numbers'),
+    order_id bigint NOT NULL REFERENCES shop.orders (id),
+    country_code char(2) REFERENCES shop.countries (code)
+);
+CREATE TABLE shop.events (
+    user_id integer REFERENCES shop.users (id),
+    payload text
+);
+CREATE VIEW shop.active_users AS SELECT id, email FROM shop.users;
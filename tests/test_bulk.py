@@ -0,0 +1,218 @@
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, Text
+from sqlalchemy.dialects import postgresql
+
+from db2model.generator.python.bulk import (
+    _code_bulk_base_file,
+    _get_bulk_table_code,
+    _has_default,
+)
+from db2model.generator.python.parser import _parse_code, _parse_imports
+from db2model.types import SqlDialect
+
+# Read by _get_serial_columns from the catalog of data/shop.sql
+SHOP_TABLE_TO_SERIAL_COLUMN_NAMES_MAP = {
+    "users": ["id"],
+    "orders": ["id"],
+    "categories": ["id"],
+    "invoices": ["number"],
+}
+
+
+@pytest.fixture
+def shop_tables_def(shop_raw_code, logger):
+    _, tables_def = _parse_code(
+        shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+    )
+    return {table_def.table_name: table_def for table_def in tables_def}
+
+
+@pytest.fixture
+def base():
+    namespace: dict = dict()
+    exec(_code_bulk_base_file(), namespace)
+    return namespace
+
+
+@pytest.fixture
+def table():
+    return Table(
+        "users",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("name", Text),
+        Column("email", Text),
+        schema="app",
+    )
+
+
+def _get_optional_column_names(table_def) -> list[str]:
+    serial_column_names = SHOP_TABLE_TO_SERIAL_COLUMN_NAMES_MAP.get(
+        table_def.table_name, list()
+    )
+    return [
+        column.column_name
+        for column in table_def.columns
+        if _has_default(column, serial_column_names)
+    ]
+
+
+@pytest.mark.parametrize(
+    "table_name, optional_column_names",
+    [
+        # Serial, bigserial and smallserial
+        ("users", ["id", "created_at", "name"]),
+        ("orders", ["id", "note"]),
+        ("categories", ["id", "parent_id"]),
+        # Identity, and a sequence of another name
+        ("shipments", ["id", "carrier"]),
+        ("invoices", ["number", "country_code"]),
+        # Keys without any default
+        ("tags", []),
+        ("order_items", ["quantity"]),
+        ("countries", []),
+    ],
+)
+def test_columns_filled_by_the_database(
+    shop_tables_def, table_name, optional_column_names
+):
+    assert (
+        _get_optional_column_names(shop_tables_def[table_name]) == optional_column_names
+    )
+
+
+def test_serial_primary_key_is_left_out_of_the_required_row(
+    shop_tables_def, shop_raw_code, logger
+):
+    imports_raw_text, _ = _parse_code(
+        shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+    )
+    code = _get_bulk_table_code(
+        _parse_imports(imports_raw_text),
+        shop_tables_def["users"],
+        SHOP_TABLE_TO_SERIAL_COLUMN_NAMES_MAP["users"],
+        SqlDialect.POSTGRESQL,
+    )
+
+    assert (
+        "class UsersRequiredRow(TypedDict):\n"
+        "    email: str\n"
+        "\n"
+        "\n"
+        "class UsersRow(UsersRequiredRow, total=False):\n"
+        "    id: int\n"
+    ) in code
+
+
+class _Connection:
+    def __init__(self) -> None:
+        self.executed: list[tuple[str, list[dict]]] = list()
+        self.copied: list[list] = list()
+        self.connection = self
+        self.driver_connection = self
+
+    def execute(self, statement, parameters) -> None:
+        self.executed.append(
+            (
+                # Compiled with the columns of the rows, as when executed
+                str(
+                    statement.compile(
+                        dialect=postgresql.dialect(), column_keys=list(parameters[0])
+                    )
+                ),
+                parameters,
+            )
+        )
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    @contextmanager
+    def copy(self, statement):
+        yield self
+
+    def write_row(self, row: list) -> None:
+        self.copied.append(row)
+
+
+def test_base_imports_psycopg_for_copy_only(monkeypatch, table):
+    # None in sys.modules makes the import fail
+    monkeypatch.setitem(sys.modules, "psycopg", None)
+    namespace: dict = dict()
+    exec(_code_bulk_base_file(), namespace)
+
+    assert namespace["insert_rows"](_Connection(), table, [{"name": "a"}], 1000) == 1
+    with pytest.raises(ImportError):
+        namespace["copy_rows"](_Connection(), table, [{"name": "a"}])
+
+
+def test_batches_split_on_size_and_keys(base):
+    rows = [
+        {"id": 1, "name": "a"},
+        {"id": 2, "name": "b"},
+        {"id": 3, "name": "c"},
+        {"name": "d"},
+        {"name": "e", "id": 5},
+    ]
+
+    assert list(base["_get_batches"](rows, 2)) == [
+        rows[0:2],
+        rows[2:3],
+        rows[3:4],
+        rows[4:5],
+    ]
+    assert list(base["_get_batches"](list(), 2)) == list()
+
+
+def test_insert_binds_the_keys_of_each_row(base, table):
+    connection = _Connection()
+    rows = [{"name": "a"}, {"name": "b", "email": "b@shop"}, {"name": "c"}]
+
+    assert base["insert_rows"](connection, table, rows, 1000) == 3
+    assert [parameters for _, parameters in connection.executed] == [
+        rows[0:1],
+        rows[1:2],
+        rows[2:3],
+    ]
+    assert "email" not in connection.executed[0][0]
+    assert "email" in connection.executed[1][0]
+
+
+def test_upsert_updates_the_columns_of_each_row(base, table):
+    connection = _Connection()
+    rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "b", "email": "b@shop"}]
+
+    assert base["upsert_rows"](connection, table, rows, ["id"], 1000) == 2
+    (first_statement, _), (second_statement, _) = connection.executed
+    assert "SET name = excluded.name" in first_statement
+    assert "email" not in first_statement
+    assert "email = excluded.email" in second_statement
+
+
+def test_upsert_of_key_columns_only_does_nothing_on_conflict(base, table):
+    connection = _Connection()
+
+    base["upsert_rows"](connection, table, [{"id": 1}], ["id"], 1000)
+
+    assert "ON CONFLICT (id) DO NOTHING" in connection.executed[0][0]
+
+
+def test_copy_writes_the_columns_of_the_first_row(base, table):
+    connection = _Connection()
+    rows = [{"name": "a", "id": 1}, {"id": 2, "name": "b"}]
+
+    assert base["copy_rows"](connection, table, rows) == 2
+    assert connection.copied == [["a", 1], ["b", 2]]
+    assert base["copy_rows"](connection, table, list()) == 0
+
+
+def test_copy_rejects_rows_with_other_keys(base, table):
+    connection = _Connection()
+    rows = [{"id": 1, "name": "a"}, {"id": 2}]
+
+    with pytest.raises(ValueError, match="same keys"):
+        base["copy_rows"](connection, table, rows)
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from db2model.generator.python.cache import FormatCache
+
+
+def test_folder_is_created_with_the_first_entry(tmp_path: Path):
+    format_cache = FormatCache(tmp_path / "cache", 1024, "key")
+    assert format_cache.get("x=1") is None
+    format_cache.evict()
+    assert not (tmp_path / "cache").exists()
+
+    format_cache.set("x=1", "x = 1\n")
+    assert format_cache.get("x=1") == "x = 1\n"
+
+
+def test_entries_removed_meanwhile_are_skipped_on_eviction(tmp_path: Path, monkeypatch):
+    format_cache = FormatCache(tmp_path / "cache", 0, "key")
+    format_cache.set("x=1", "x = 1\n")
+    format_cache.set("x=2", "x = 2\n")
+    removed_path = format_cache._entry_path("x=1")
+    stat = Path.stat
+
+    def stat_removed_meanwhile(path: Path, *args, **kwargs):
+        if path == removed_path:
+            path.unlink()
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "stat", stat_removed_meanwhile)
+    format_cache.evict()
+
+    monkeypatch.undo()
+    assert not list((tmp_path / "cache").glob("*/*"))
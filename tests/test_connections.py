@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+
+from db2model.generator.python.connections import _is_transient
+from db2model.types import SqlDialect
+
+
+class _DriverError(Exception):
+    def __init__(self, sqlstate: str | None) -> None:
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+@pytest.mark.parametrize(
+    "sqlstate",
+    ["08006", "53300", "40001", "40P01", "55P03", "57014", "57P01", "57P03"],
+)
+def test_transient_sqlstates(sqlstate: str):
+    error = OperationalError("SELECT 1", dict(), _DriverError(sqlstate))
+
+    assert _is_transient(error, SqlDialect.POSTGRESQL)
+
+
+@pytest.mark.parametrize("sqlstate", ["42P01", "42501", "25006", "23505"])
+def test_permanent_sqlstates(sqlstate: str):
+    error = ProgrammingError("SELECT 1", dict(), _DriverError(sqlstate))
+
+    assert not _is_transient(error, SqlDialect.POSTGRESQL)
+
+
+def test_errors_without_sqlstate_are_transient_when_operational():
+    assert _is_transient(
+        OperationalError("SELECT 1", dict(), _DriverError(None)),
+        SqlDialect.POSTGRESQL,
+    )
+    assert not _is_transient(
+        ProgrammingError("SELECT 1", dict(), _DriverError(None)),
+        SqlDialect.POSTGRESQL,
+    )
+
+
+def test_invalidated_connections_are_transient():
+    error = DBAPIError(
+        "SELECT 1", dict(), _DriverError("42P01"), connection_invalidated=True
+    )
+
+    assert _is_transient(error, SqlDialect.POSTGRESQL)
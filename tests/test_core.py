@@ -0,0 +1,159 @@
+from typing import Optional
+
+import pytest
+
+from db2model.generator.python.generator import _get_db_codes, _write_base_file
+from db2model.generator.python.parser import _parse_code
+from db2model.generator.python.utils import _render_code
+from db2model.generator.python.writer import OutputWriter
+from db2model.profiling import Profiler
+from db2model.types import ModelStyle, SqlDialect
+
+KEYLESS_RAW_CODE = """from sqlalchemy import ARRAY, Column, Integer, MetaData, Table, Text
+
+metadata = MetaData()
+
+
+t_logs = Table(
+    'logs', metadata,
+    Column('id', Integer, nullable=False),
+    Column('tags', ARRAY(Text())),
+    Column('class', Text),
+    schema='app'
+)
+"""
+
+
+def _get_table_defs(raw_code, logger, model_style):
+    _, tables_def = _parse_code(
+        raw_code, "db_tests", SqlDialect.POSTGRESQL, logger, model_style
+    )
+    return {table_def.table_name: table_def for table_def in tables_def}
+
+
+def test_orm_models_skip_table_statements(shop_raw_code, logger):
+    assert "events" not in _get_table_defs(shop_raw_code, logger, ModelStyle.ORM)
+    assert (
+        _parse_code(
+            KEYLESS_RAW_CODE, "db_tests", SqlDialect.POSTGRESQL, logger, ModelStyle.ORM
+        )
+        is None
+    )
+
+
+def test_core_tables_keep_views_and_tables_without_primary_key(shop_raw_code, logger):
+    table_defs = _get_table_defs(shop_raw_code, logger, ModelStyle.CORE)
+
+    assert list(table_defs) == [
+        "active_users",
+        "categories",
+        "countries",
+        "tags",
+        "users",
+        "events",
+        "orders",
+        "user_tags",
+        "invoices",
+        "order_items",
+        "shipments",
+    ]
+    events = table_defs["events"]
+    assert events.schema_name == "shop"
+    assert events.primary_key_column_names == list()
+    assert [foreign_key.column_names for foreign_key in events.foreign_keys] == [
+        ["user_id"]
+    ]
+    assert [(column.column_name, column.annotation) for column in events.columns] == [
+        ("user_id", "Mapped[Optional[int]]"),
+        ("payload", "Mapped[Optional[str]]"),
+    ]
+    user_tags = table_defs["user_tags"]
+    assert user_tags.primary_key_column_names == ["user_id", "tag_id"]
+    assert [column.annotation for column in user_tags.columns] == [
+        "Mapped[int]",
+        "Mapped[int]",
+    ]
+
+
+def test_table_statements_without_declarative_base(logger):
+    imports_raw_text, tables_def = _parse_code(
+        KEYLESS_RAW_CODE, "db_tests", SqlDialect.POSTGRESQL, logger, ModelStyle.CORE
+    )
+
+    assert "from typing import Any, Optional" in imports_raw_text
+    (table_def,) = tables_def
+    assert [
+        (column.attribute_name, column.annotation, column.call)
+        for column in table_def.columns
+    ] == [
+        ("id", "Mapped[int]", "mapped_column(Integer, nullable=False)"),
+        ("tags", "Mapped[Optional[list[str]]]", "mapped_column(ARRAY(Text()))"),
+        ("class_", "Mapped[Optional[str]]", "mapped_column(Text)"),
+    ]
+
+
+def test_column_types_are_looked_up_without_running_the_code(
+    logger, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    raw_code = """import os
+from sqlalchemy import ARRAY, Column, Enum, Integer, MetaData, Numeric, Table, Text
+from sqlalchemy.dialects.postgresql import DOMAIN, INET
+
+metadata = MetaData()
+
+
+t_logs = Table(
+    'logs', metadata,
+    Column('amount', Numeric(10, 2)),
+    Column('matrix', ARRAY(Integer(), dimensions=2)),
+    Column('status', Enum('new', 'done', name='status')),
+    Column('address', INET),
+    Column('code', DOMAIN('code', Text(), not_null=True)),
+    Column('payload', os.system('touch pwned')),
+    Column('other', __import__('os').system('touch pwned')),
+    schema='app'
+)
+"""
+    _, (table_def,) = _parse_code(
+        raw_code, "db_tests", SqlDialect.POSTGRESQL, logger, ModelStyle.CORE
+    )
+
+    assert [column.annotation for column in table_def.columns] == [
+        "Mapped[Optional[decimal.Decimal]]",
+        "Mapped[Optional[list[list[int]]]]",
+        "Mapped[Optional[str]]",
+        "Mapped[Optional[Any]]",
+        "Mapped[Optional[str]]",
+        "Mapped[Optional[Any]]",
+        "Mapped[Optional[Any]]",
+    ]
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_generated_core_tables(shop_raw_code, make_settings, logger, import_generated):
+    settings = make_settings(model_style=ModelStyle.CORE, record_classes=True)
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+    _write_base_file(settings, None)
+    with OutputWriter() as writer:
+        writer.write(
+            {
+                filepath: _render_code(code, settings.emitter)
+                for filepath, code in filepath_to_code_map.items()
+            }
+        )
+
+    module = import_generated(settings, "db_tests")
+
+    assert module.t_events.c.keys() == ["user_id", "payload"]
+    assert [
+        foreign_key.target_fullname for foreign_key in module.t_events.foreign_keys
+    ] == ["shop.users.id"]
+    assert module.t_active_users.c.keys() == ["id", "email"]
+    assert list(module.t_user_tags.primary_key.columns.keys()) == ["user_id", "tag_id"]
+    assert module.EventsRecord.__annotations__ == {
+        "user_id": Optional[int],
+        "payload": Optional[str],
+    }
@@ -0,0 +1,72 @@
+import black
+import pytest
+
+from conftest import DATA_PATH
+from db2model.generator.python.emitter import (
+    BLACK_MAJOR_VERSION,
+    UnsupportedCode,
+    _emit_code,
+)
+from db2model.generator.python.utils import (
+    _formate_code,
+    _is_emitter_supported,
+    _render_code,
+)
+from db2model.types import Emitter
+
+# Unformatted code generated from the catalog of data/shop.sql, next to the code
+# the formatters give for it
+GOLDEN_PATH = DATA_PATH / "emitter"
+GOLDEN_NAMES = sorted(
+    path.name.removesuffix(".expected.txt")
+    for path in GOLDEN_PATH.glob("*.expected.txt")
+)
+
+
+def _read_golden(name: str) -> tuple[str, str]:
+    return (
+        (GOLDEN_PATH / f"{name}.txt").read_text(),
+        (GOLDEN_PATH / f"{name}.expected.txt").read_text(),
+    )
+
+
+@pytest.mark.parametrize("name", GOLDEN_NAMES)
+def test_emitter_gives_the_golden_code(name: str):
+    code, expected_code = _read_golden(name)
+
+    assert _emit_code(code) == expected_code
+
+
+# Run against every version the dependencies allow, rather than skipped on the
+# other ones
+@pytest.mark.parametrize("name", GOLDEN_NAMES)
+def test_formatters_give_the_golden_code(name: str):
+    code, expected_code = _read_golden(name)
+
+    assert _formate_code(code) == expected_code
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "x = 1  # comment\n",
+        "x = 'é'\n",
+        "def f():\n    return 1\n",
+        "import os\nx = 1\nimport sys\n",
+    ],
+)
+def test_unsupported_code_falls_back_to_the_formatters(code: str):
+    with pytest.raises(UnsupportedCode):
+        _emit_code(code)
+    assert _render_code(code, Emitter.NATIVE) == _formate_code(code)
+
+
+def test_other_formatter_versions_fall_back_to_the_formatters(monkeypatch):
+    code, _ = _read_golden("orm_table")
+    _is_emitter_supported.cache_clear()
+    monkeypatch.setattr(black, "__version__", f"{BLACK_MAJOR_VERSION + 1}.1.0")
+    try:
+        assert not _is_emitter_supported()
+        assert _render_code(code, Emitter.NATIVE) == _formate_code(code)
+    finally:
+        _is_emitter_supported.cache_clear()
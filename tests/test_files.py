@@ -0,0 +1,80 @@
+import importlib
+import sys
+
+import pytest
+
+from db2model.generator.python.generator import _get_db_codes, _write_base_file
+from db2model.generator.python.utils import _render_code
+from db2model.generator.python.writer import OutputWriter
+from db2model.profiling import Profiler
+from db2model.types import Emitter
+
+
+@pytest.fixture
+def lazy_db(shop_raw_code, make_settings, logger, import_generated):
+    settings = make_settings(lazy_init_files=True)
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+    _write_base_file(settings, None)
+    with OutputWriter() as writer:
+        writer.write(
+            {
+                filepath: _render_code(code, settings.emitter)
+                for filepath, code in filepath_to_code_map.items()
+            }
+        )
+    return import_generated(settings, "db_tests")
+
+
+def test_lazy_init_loads_a_class_with_its_related_classes(lazy_db):
+    assert "python.db_tests.shop.users" not in sys.modules
+
+    users_class = lazy_db.Users
+
+    assert users_class.__module__ == "python.db_tests.shop.users"
+    # Orders refers to Invoices and OrderItems, which refer to Countries and
+    # Shipments
+    assert {
+        "Users",
+        "Orders",
+        "Tags",
+        "Invoices",
+        "OrderItems",
+        "Countries",
+        "Shipments",
+    } <= set(vars(lazy_db))
+    assert "Categories" not in vars(lazy_db)
+
+
+def test_lazy_schema_init_goes_through_the_db_package(lazy_db):
+    shop = importlib.import_module("python.db_tests.shop")
+
+    assert shop.Categories is lazy_db.Categories
+
+
+def test_lazy_init_rejects_unknown_names(lazy_db):
+    with pytest.raises(AttributeError, match="has no attribute 'Missing'"):
+        lazy_db.Missing
+    with pytest.raises(AttributeError, match="has no attribute 'Missing'"):
+        importlib.import_module("python.db_tests.shop").Missing
+
+
+def test_lazy_init_lists_names_not_loaded_yet(lazy_db):
+    assert set(lazy_db.__all__) <= set(dir(lazy_db))
+    assert "Categories" in dir(lazy_db)
+    assert "Categories" not in vars(lazy_db)
+    assert dir(lazy_db) == sorted(dir(lazy_db))
+
+
+def test_emitters_give_the_same_lazy_init_files(shop_raw_code, make_settings, logger):
+    settings = make_settings(lazy_init_files=True)
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+
+    for filepath, code in filepath_to_code_map.items():
+        if filepath.name == "__init__.py":
+            assert _render_code(code, Emitter.NATIVE) == _render_code(
+                code, Emitter.FORMATTERS
+            )
@@ -0,0 +1,70 @@
+from db2model.config import TableFilter
+
+
+def _table_filter(
+    ignored_schemas: list[str] = list(),
+    ignored_tables: list[str] = list(),
+    schema_to_ignored_tables: dict[str, list[str]] = dict(),
+    included_tables: list[str] = list(),
+) -> TableFilter:
+    return TableFilter(
+        ignored_schema_patterns=ignored_schemas,
+        ignored_table_patterns=ignored_tables,
+        schema_to_ignored_table_patterns_map=schema_to_ignored_tables,
+        included_table_patterns=included_tables,
+    )
+
+
+def test_without_patterns_everything_is_included():
+    table_filter = _table_filter()
+
+    assert table_filter.is_schema_included("app")
+    assert table_filter.is_table_included("app", "users")
+    assert table_filter.is_table_included(None, "users")
+
+
+def test_exact_names_match_themselves_only():
+    table_filter = _table_filter(ignored_schemas=["audit"], ignored_tables=["users"])
+
+    assert not table_filter.is_schema_included("audit")
+    assert table_filter.is_schema_included("audit_2024")
+    assert not table_filter.is_table_included("app", "users")
+    assert table_filter.is_table_included("app", "users_archive")
+
+
+def test_globs_match_whole_names():
+    table_filter = _table_filter(ignored_tables=["tmp_*", "log_?"])
+
+    assert not table_filter.is_table_included("app", "tmp_import")
+    assert table_filter.is_table_included("app", "old_tmp_import")
+    assert not table_filter.is_table_included("app", "log_1")
+    assert table_filter.is_table_included("app", "log_12")
+
+
+def test_regular_expressions_are_prefixed():
+    table_filter = _table_filter(ignored_tables=[r"re:audit_\d{4}"])
+
+    assert not table_filter.is_table_included("app", "audit_2024")
+    assert table_filter.is_table_included("app", "audit_2024_old")
+    # Without the prefix, the same pattern is a glob matching nothing
+    assert _table_filter(ignored_tables=[r"audit_\d{4}"]).is_table_included(
+        "app", "audit_2024"
+    )
+
+
+def test_schema_patterns_only_apply_to_their_schema():
+    table_filter = _table_filter(schema_to_ignored_tables={"app": ["items"]})
+
+    assert not table_filter.is_table_included("app", "items")
+    assert table_filter.is_table_included("core", "items")
+
+
+def test_included_tables_are_still_ignored_by_ignore_patterns():
+    table_filter = _table_filter(
+        ignored_tables=["users_*"], included_tables=["users*", "orders"]
+    )
+
+    assert table_filter.is_table_included("app", "users")
+    assert table_filter.is_table_included("app", "orders")
+    assert not table_filter.is_table_included("app", "users_archive")
+    assert not table_filter.is_table_included("app", "items")
@@ -0,0 +1,90 @@
+import inspect
+from pathlib import Path
+
+from db2model import cli
+from db2model.generator.python.fingerprint import (
+    _get_changed_db_names,
+    _load_manifest,
+    _merge_manifest,
+    _write_manifest,
+)
+from db2model.models import DbManifest, Manifest
+
+
+def _db_manifest(fingerprint: str) -> DbManifest:
+    return DbManifest(
+        settings_hash="settings",
+        schema_to_fingerprint_map={"public": fingerprint},
+    )
+
+
+def test_skipping_unchanged_is_off_by_default(make_settings):
+    assert not make_settings().skip_unchanged
+    for command in (cli.generate, cli.generate_from_snapshot):
+        assert (
+            not inspect.signature(command).parameters["skip_unchanged"].default.default
+        )
+
+
+def test_merge_keeps_databases_of_other_runs():
+    manifest = Manifest(
+        db_to_manifest_map={"db_a": _db_manifest("a1"), "db_b": _db_manifest("b1")}
+    )
+
+    merged = _merge_manifest(manifest, ["db_a"], {"db_a": _db_manifest("a2")})
+
+    assert merged.db_to_manifest_map == {
+        "db_a": _db_manifest("a2"),
+        "db_b": _db_manifest("b1"),
+    }
+
+
+def test_merge_drops_databases_generated_without_fingerprint():
+    manifest = Manifest(
+        db_to_manifest_map={"db_a": _db_manifest("a1"), "db_b": _db_manifest("b1")}
+    )
+
+    merged = _merge_manifest(manifest, ["db_a"], dict())
+
+    assert merged.db_to_manifest_map == {"db_b": _db_manifest("b1")}
+
+
+def test_merge_keeps_the_entries_of_databases_not_generated():
+    manifest = Manifest(db_to_manifest_map={"db_a": _db_manifest("a1")})
+
+    # db_a failed, its files are still those of the manifest fingerprint
+    merged = _merge_manifest(manifest, list(), {"db_a": _db_manifest("a2")})
+
+    assert merged.db_to_manifest_map == {"db_a": _db_manifest("a1")}
+
+
+def test_changed_databases(tmp_path: Path, logger):
+    for db_name in ["db_a", "db_b", "db_c"]:
+        (tmp_path / db_name).mkdir()
+    manifest = Manifest(
+        db_to_manifest_map={"db_a": _db_manifest("a1"), "db_b": _db_manifest("b1")}
+    )
+
+    changed_db_names = _get_changed_db_names(
+        manifest,
+        {
+            "db_a": _db_manifest("a1"),
+            "db_b": _db_manifest("b2"),
+            "db_c": _db_manifest("c1"),
+        },
+        tmp_path,
+        logger,
+    )
+
+    assert changed_db_names == ["db_b", "db_c"]
+
+
+def test_manifest_folder_is_created_on_write(make_settings):
+    path_settings = make_settings().path_settings
+    manifest_filepath = path_settings.manifest_filepath
+    path_settings.format_cache_path
+    assert not path_settings.output_folder_root_path.exists()
+
+    manifest = Manifest(db_to_manifest_map={"db_tests": _db_manifest("a")})
+    _write_manifest(manifest_filepath, manifest)
+    assert _load_manifest(manifest_filepath) == manifest
@@ -0,0 +1,245 @@
+import importlib
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Table, inspect
+from sqlalchemy.orm import configure_mappers
+
+from db2model.generator.python.generator import _get_db_codes, _write_base_file
+from db2model.generator.python.parser import (
+    _parse_code,
+    _parse_imports,
+    _parse_table_args_lines,
+)
+from db2model.generator.python.table import (
+    _get_used_imports_code,
+    _set_table_inits_false,
+)
+from db2model.generator.python.utils import _render_code
+from db2model.generator.python.writer import OutputWriter
+from db2model.profiling import Profiler
+from db2model.types import Emitter, SqlDialect
+
+
+def test_imports_are_mapped_by_bound_name():
+    name_to_imports_map = _parse_imports(
+        "import datetime\n"
+        "import sqlalchemy as sa\n"
+        "from typing import Optional\n"
+        "from sqlalchemy import Integer, Text as Txt\n"
+        "from ..base import Base\n"
+        "from sqlalchemy import Integer"
+    )
+
+    assert name_to_imports_map == {
+        "datetime": [(None, "datetime")],
+        "sa": [(None, "sqlalchemy as sa")],
+        "Optional": [("typing", "Optional")],
+        "Integer": [("sqlalchemy", "Integer")],
+        "Txt": [("sqlalchemy", "Text as Txt")],
+        "Base": [("..base", "Base")],
+    }
+
+
+def test_only_used_imports_are_kept():
+    name_to_imports_map = _parse_imports(
+        "import datetime\n"
+        "from typing import Optional\n"
+        "from sqlalchemy import BigInteger, Integer, Text\n"
+        "from sqlalchemy.orm import Mapped, mapped_column"
+    )
+
+    assert _get_used_imports_code(
+        name_to_imports_map, {"Text", "Mapped", "Integer", "mapped_column", "self"}
+    ) == (
+        "from sqlalchemy import Integer, Text\n"
+        "from sqlalchemy.orm import Mapped, mapped_column"
+    )
+    assert _get_used_imports_code(name_to_imports_map, {"datetime"}) == (
+        "import datetime"
+    )
+
+
+def test_statements_other_than_imports_are_rejected():
+    with pytest.raises(ValueError):
+        _parse_imports("x = 1")
+
+
+def test_classes_are_parsed_in_order(shop_raw_code, logger):
+    imports_raw_text, tables_def = _parse_code(
+        shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+    )
+
+    assert imports_raw_text.startswith("from typing import Optional")
+    assert [table_def.table_name for table_def in tables_def] == [
+        "categories",
+        "countries",
+        "tags",
+        "users",
+        "orders",
+        "invoices",
+        "order_items",
+        "shipments",
+    ]
+    assert {table_def.schema_name for table_def in tables_def} == {"shop"}
+
+
+def _get_shop_table_def(shop_raw_code, logger, table_name):
+    _, tables_def = _parse_code(
+        shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+    )
+    return next(
+        table_def for table_def in tables_def if table_def.table_name == table_name
+    )
+
+
+def test_named_composite_constraints_are_parsed(shop_raw_code, logger):
+    table_def = _get_shop_table_def(shop_raw_code, logger, "order_items")
+
+    assert table_def.schema_name == "shop"
+    assert table_def.primary_key_column_names == ["order_id", "line_no"]
+    assert [
+        (foreign_key.column_names, foreign_key.referred_column_names)
+        for foreign_key in table_def.foreign_keys
+    ] == [(["order_id"], ["shop.orders.id"])]
+
+
+def test_composite_foreign_keys_are_parsed(shop_raw_code, logger):
+    table_def = _get_shop_table_def(shop_raw_code, logger, "shipments")
+
+    assert table_def.primary_key_column_names == ["id"]
+    assert [
+        (foreign_key.column_names, foreign_key.referred_column_names)
+        for foreign_key in table_def.foreign_keys
+    ] == [
+        (
+            ["order_id", "line_no"],
+            ["shop.order_items.order_id", "shop.order_items.line_no"],
+        )
+    ]
+
+
+def test_every_primary_and_foreign_key_column_is_init_false(shop_raw_code, logger):
+    order_items_def = _get_shop_table_def(shop_raw_code, logger, "order_items")
+    shipments_def = _get_shop_table_def(shop_raw_code, logger, "shipments")
+    _set_table_inits_false(order_items_def, list())
+    _set_table_inits_false(shipments_def, list())
+
+    assert [
+        column.column_name for column in order_items_def.columns if not column.init
+    ] == ["order_id", "line_no"]
+    assert [
+        column.column_name for column in shipments_def.columns if not column.init
+    ] == ["id", "order_id", "line_no"]
+
+
+def test_remote_sides_are_evaluated_once_mapped(shop_raw_code, logger):
+    table_def = _get_shop_table_def(shop_raw_code, logger, "categories")
+
+    assert [relationship.call for relationship in table_def.relationships] == [
+        "relationship('Categories', remote_side='[Categories.id]', back_populates='parent_reverse')",
+        "relationship('Categories', remote_side='[Categories.parent_id]', back_populates='parent')",
+    ]
+
+
+def test_tables_without_primary_key_are_skipped(shop_raw_code, logger, caplog):
+    with caplog.at_level("WARNING", logger=logger.name):
+        _, tables_def = _parse_code(
+            shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+        )
+
+    table_names = {table_def.table_name for table_def in tables_def}
+    assert not table_names & {"active_users", "events", "user_tags"}
+    assert {
+        record.getMessage().partition("table_name=")[2] for record in caplog.records
+    } == {"'active_users'.", "'events'.", "'user_tags'."}
+
+
+def test_table_args_lines_are_parsed_as_python():
+    lines = [
+        "        ForeignKeyConstraint(['a', 'b'], ['s.t.a', 's.t.b'], "
+        "ondelete='CASCADE', name='t_fk'),",
+        "        PrimaryKeyConstraint('id', name='t_pkey'),",
+        "        CheckConstraint('a > 0', name='t_check'),",
+        "        Index('t_a_idx', 'a', unique=True),",
+        "        Index('t_lower_b_idx', text('lower(b)')),",
+        "        {'schema': 's'}",
+    ]
+
+    primary_key_column_names, foreign_keys, indexes, schema_name = (
+        _parse_table_args_lines(lines)
+    )
+    assert primary_key_column_names == ["id"]
+    assert [
+        (foreign_key.column_names, foreign_key.referred_column_names)
+        for foreign_key in foreign_keys
+    ] == [(["a", "b"], ["s.t.a", "s.t.b"])]
+    assert [(index.column_names, index.unique) for index in indexes] == [
+        (["a"], True),
+        ([], False),
+    ]
+    assert schema_name == "s"
+
+
+@pytest.mark.parametrize("emitter", [Emitter.FORMATTERS, Emitter.NATIVE])
+def test_generated_modules_compile(shop_raw_code, make_settings, logger, emitter):
+    settings = make_settings(emitter=emitter, record_classes=True)
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+
+    assert filepath_to_code_map
+    for filepath, code in filepath_to_code_map.items():
+        compile(_render_code(code, emitter), str(filepath), "exec")
+
+
+def test_emitters_give_the_same_files(shop_raw_code, make_settings, logger):
+    settings = make_settings(record_classes=True, lookup_helpers=True)
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+
+    for code in filepath_to_code_map.values():
+        assert _render_code(code, Emitter.NATIVE) == _render_code(
+            code, Emitter.FORMATTERS
+        )
+
+
+def test_generated_models_import(
+    shop_raw_code, make_settings, logger, import_generated
+):
+    settings = make_settings()
+    filepath_to_code_map = _get_db_codes(
+        settings, "db_tests", shop_raw_code, None, None, Profiler(), logger
+    )
+    _write_base_file(settings, None)
+    with OutputWriter() as writer:
+        writer.write(
+            {
+                filepath: _render_code(code, settings.emitter)
+                for filepath, code in filepath_to_code_map.items()
+            }
+        )
+
+    shop = import_generated(settings, "db_tests").shop
+    # Association tables, without primary key, are not generated as classes
+    Table(
+        "user_tags",
+        importlib.import_module("python.base").Base.metadata,
+        Column("user_id", ForeignKey("shop.users.id"), primary_key=True),
+        Column("tag_id", ForeignKey("shop.tags.id"), primary_key=True),
+        schema="shop",
+    )
+    configure_mappers()
+
+    # Self-referential relationships refer to columns declared after them
+    assert [
+        column.name
+        for column in inspect(shop.Categories)
+        .relationships["parent_reverse"]
+        .remote_side
+    ] == ["parent_id"]
+    # Columns of composite keys are set through their relationships
+    category = shop.Categories(label="books")
+    assert category.id is None and category.parent_id is None
+    order_item = shop.OrderItems(sku="sku", quantity=1, order=None)
+    assert order_item.order_id is None and order_item.line_no is None
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from db2model.models import ProfileReport
+from db2model.profiling import Profiler
+
+
+def test_phases_are_recorded_with_their_item_count():
+    profiler = Profiler()
+
+    with profiler.phase("reflect", "db_a", "shop") as record:
+        record.item_count = 3
+    with profiler.phase("write", "db_a"):
+        pass
+
+    reflect_record, write_record = profiler.records
+    assert (
+        reflect_record.phase,
+        reflect_record.db_name,
+        reflect_record.schema_name,
+        reflect_record.item_count,
+    ) == ("reflect", "db_a", "shop", 3)
+    assert (write_record.phase, write_record.schema_name) == ("write", None)
+    assert reflect_record.wall_seconds >= 0
+    assert reflect_record.cpu_seconds >= 0
+
+
+def test_failed_phase_is_recorded():
+    profiler = Profiler()
+
+    with pytest.raises(RuntimeError):
+        with profiler.phase("reflect", "db_a"):
+            raise RuntimeError
+
+    assert [record.phase for record in profiler.records] == ["reflect"]
+
+
+def test_hooks_get_each_record_when_its_phase_ends():
+    phases: list[str] = list()
+    profiler = Profiler([lambda record: phases.append(f"first {record.phase}")])
+    profiler.add_hook(lambda record: phases.append(f"second {record.phase}"))
+
+    with profiler.phase("outer"):
+        with profiler.phase("inner"):
+            pass
+        assert phases == ["first inner", "second inner"]
+
+    assert phases == ["first inner", "second inner", "first outer", "second outer"]
+
+
+def test_hooks_are_called_from_the_thread_of_the_phase():
+    thread_names: list[str] = list()
+    profiler = Profiler(
+        [lambda record: thread_names.append(threading.current_thread().name)]
+    )
+
+    def run_phase() -> None:
+        with profiler.phase("reflect"):
+            pass
+
+    thread = threading.Thread(target=run_phase, name="reflection")
+    thread.start()
+    thread.join()
+
+    assert thread_names == ["reflection"]
+
+
+def test_report_round_trips_through_json():
+    profiler = Profiler()
+    with profiler.phase("reflect", "db_a") as record:
+        record.item_count = 2
+
+    report = profiler.report()
+
+    assert report.phases == profiler.records
+    assert report.wall_seconds >= report.phases[0].wall_seconds
+    assert ProfileReport.model_validate_json(report.model_dump_json()) == report
@@ -0,0 +1,163 @@
+import threading
+
+from sqlalchemy import MetaData
+
+from db2model.generator.python import raw
+from db2model.generator.python.raw import (
+    _plan_table_chunks,
+    _run_sqlacodegen,
+    _sort_table_keys,
+)
+from db2model.profiling import Profiler
+
+FOREIGN_KEY_EDGES = {
+    (("app", "orders"), ("app", "users")),
+    (("app", "orders"), ("core", "countries")),
+    (("app", "items"), ("app", "orders")),
+}
+
+
+def test_referred_tables_sort_first():
+    table_keys = _sort_table_keys(
+        [("app", "items"), ("app", "tags"), ("app", "orders"), ("app", "users")],
+        FOREIGN_KEY_EDGES,
+    )
+
+    assert table_keys.index(("app", "users")) < table_keys.index(("app", "orders"))
+    assert table_keys.index(("app", "orders")) < table_keys.index(("app", "items"))
+    assert set(table_keys) == {
+        ("app", "items"),
+        ("app", "tags"),
+        ("app", "orders"),
+        ("app", "users"),
+    }
+
+
+def test_edges_to_unlisted_tables_are_ignored():
+    assert _sort_table_keys([("app", "orders")], FOREIGN_KEY_EDGES) == [
+        ("app", "orders")
+    ]
+
+
+def test_chunks_generate_every_table_once():
+    chunks = _plan_table_chunks(
+        [("app", "items"), ("app", "tags"), ("app", "users")], FOREIGN_KEY_EDGES, 2
+    )
+
+    assert [len(chunk_keys) for chunk_keys, _, _ in chunks] == [2, 2, 1]
+    generated_keys = [key for chunk_keys, _, _ in chunks for key in chunk_keys]
+    # Tables referred to by included ones are generated with them, transitively
+    assert sorted(generated_keys) == [
+        ("app", "items"),
+        ("app", "orders"),
+        ("app", "tags"),
+        ("app", "users"),
+        ("core", "countries"),
+    ]
+
+
+def test_chunks_reflect_the_keys_of_referring_and_referred_tables():
+    chunks = _plan_table_chunks(
+        [("app", "items"), ("app", "tags"), ("app", "users")], FOREIGN_KEY_EDGES, 2
+    )
+
+    assert chunks[0] == (
+        {("app", "tags"), ("app", "users")},
+        {"app": ["tags", "users"]},
+        # orders refers to users, and comes with the tables it refers to
+        {"app": ["orders"], "core": ["countries"]},
+    )
+    for chunk_keys, schema_to_table_names_map, schema_to_key_table_names_map in chunks:
+        reflected_keys = {
+            (schema_name, table_name)
+            for schema_name, table_names in schema_to_table_names_map.items()
+            for table_name in table_names
+        }
+        key_keys = {
+            (schema_name, table_name)
+            for schema_name, table_names in schema_to_key_table_names_map.items()
+            for table_name in table_names
+        }
+        assert reflected_keys == chunk_keys
+        assert not reflected_keys & key_keys
+        for key, referred_key in FOREIGN_KEY_EDGES:
+            if key in reflected_keys | key_keys:
+                assert referred_key in reflected_keys | key_keys
+            if referred_key in chunk_keys:
+                assert key in reflected_keys | key_keys
+
+
+def test_hub_tables_come_with_the_keys_of_the_tables_referring_to_them():
+    table_keys = [("app", "users")] + [("app", f"t{index}") for index in range(50)]
+    foreign_key_edges = {
+        (("app", f"t{index}"), ("app", "users")) for index in range(50)
+    }
+
+    chunks = _plan_table_chunks(table_keys, foreign_key_edges, 10)
+
+    for chunk_keys, schema_to_table_names_map, _ in chunks:
+        assert len(chunk_keys) <= 10
+        assert sum(map(len, schema_to_table_names_map.values())) == len(chunk_keys)
+    _, _, schema_to_key_table_names_map = chunks[0]
+    assert len(schema_to_key_table_names_map["app"]) == 50 - 9
+
+
+def test_without_foreign_keys_chunks_hold_their_tables_only():
+    chunks = _plan_table_chunks([("app", "a"), ("app", "b"), ("app", "c")], set(), 2)
+
+    assert chunks == [
+        ({("app", "a"), ("app", "b")}, {"app": ["a", "b"]}, dict()),
+        ({("app", "c")}, {"app": ["c"]}, dict()),
+    ]
+
+
+class _Pool:
+    """Runs the work without any connection, as the reflection is faked"""
+
+    def run(self, db_name, work):
+        return work(None)
+
+
+def _fake_reflection(monkeypatch, failing_db_name: str | None = None):
+    reflected_schemas = threading.Barrier(2, timeout=5)
+
+    def reflect_schema_metadata(connection, db_name, schema_name, profiler, **_):
+        if db_name == failing_db_name:
+            raise RuntimeError("Connection refused")
+        if db_name == "db_tests":
+            # Returns once both schemas are reflected at the same time
+            reflected_schemas.wait()
+        return MetaData(schema=schema_name)
+
+    def generate_raw_code(connection, db_name, schema_names, profiler, **kwargs):
+        return ",".join(
+            schema_metadata.schema for schema_metadata in kwargs["schema_metadatas"]
+        )
+
+    monkeypatch.setattr(raw, "_reflect_schema_metadata", reflect_schema_metadata)
+    monkeypatch.setattr(raw, "_generate_raw_code", generate_raw_code)
+
+
+def test_schemas_of_a_database_are_reflected_concurrently(
+    make_settings, logger, monkeypatch
+):
+    _fake_reflection(monkeypatch)
+    settings = make_settings(db_to_schemas={"db_tests": ["shop", "public"]}, jobs=2)
+
+    assert _run_sqlacodegen(settings, ["db_tests"], _Pool(), Profiler(), logger) == (
+        {"db_tests": "shop,public"},
+        dict(),
+    )
+
+
+def test_failed_databases_are_reported_with_the_other_results(
+    make_settings, logger, monkeypatch
+):
+    _fake_reflection(monkeypatch, failing_db_name="db_down")
+    settings = make_settings(
+        db_to_schemas={"db_down": ["public", "shop"], "db_up": ["public"]}, jobs=2
+    )
+
+    assert _run_sqlacodegen(
+        settings, ["db_down", "db_up"], _Pool(), Profiler(), logger
+    ) == ({"db_up": "public"}, {"db_down": "Connection refused"})
@@ -0,0 +1,82 @@
+import pytest
+
+from db2model.generator.python.snapshot import (
+    SNAPSHOT_FORMAT_VERSION,
+    _write_snapshot,
+    generate_python_models_from_snapshot,
+    load_snapshot,
+)
+from db2model.models import DbSnapshot, Snapshot
+from db2model.types import SqlDialect
+
+
+@pytest.fixture
+def snapshot(shop_raw_code):
+    return Snapshot(
+        format_version=SNAPSHOT_FORMAT_VERSION,
+        sql_dialect=SqlDialect.POSTGRESQL,
+        sqlacodegen_version="3.0.0",
+        db_to_snapshot_map={
+            "db_tests": DbSnapshot(
+                schema_names=["shop"],
+                schema_to_fingerprint_map={"shop": "fingerprint"},
+                raw_code=shop_raw_code,
+                schema_to_table_to_row_estimate_map={"shop": {"users": 10.0}},
+                schema_to_table_to_serial_column_names_map={"shop": {"users": ["id"]}},
+            )
+        },
+    )
+
+
+@pytest.mark.parametrize("filename", ["snapshot.json", "snapshot.json.gz"])
+def test_snapshot_round_trip(tmp_path, snapshot, filename):
+    _write_snapshot(tmp_path / filename, snapshot)
+
+    assert load_snapshot(tmp_path / filename) == snapshot
+
+
+def test_compressed_snapshot_bytes_are_reproducible(tmp_path, snapshot):
+    _write_snapshot(tmp_path / "first.json.gz", snapshot)
+    _write_snapshot(tmp_path / "second.json.gz", snapshot)
+
+    assert (tmp_path / "first.json.gz").read_bytes() == (
+        tmp_path / "second.json.gz"
+    ).read_bytes()
+
+
+def test_snapshot_of_another_format_is_rejected(tmp_path, snapshot):
+    snapshot.format_version = SNAPSHOT_FORMAT_VERSION - 1
+    _write_snapshot(tmp_path / "snapshot.json", snapshot)
+
+    with pytest.raises(ValueError, match="Unsupported snapshot format"):
+        load_snapshot(tmp_path / "snapshot.json")
+
+
+def test_models_are_generated_from_the_snapshot_only(
+    tmp_path, snapshot, make_settings, logger, import_generated
+):
+    _write_snapshot(tmp_path / "snapshot.json.gz", snapshot)
+    # No server listens on the settings one
+    settings = make_settings(db_to_schemas={"db_tests": ["shop"]}, bulk_modules=True)
+
+    generate_python_models_from_snapshot(
+        settings, tmp_path / "snapshot.json.gz", logger
+    )
+
+    assert import_generated(settings, "db_tests").shop.Users.__tablename__ == "users"
+    bulk_code = (
+        settings.path_settings.python_path / "bulk" / "db_tests" / "shop" / "users.py"
+    ).read_text()
+    assert "class UsersRow(UsersRequiredRow, total=False):\n    id: int\n" in bulk_code
+
+
+def test_schemas_differing_from_the_snapshot_are_rejected(
+    tmp_path, snapshot, make_settings, logger
+):
+    _write_snapshot(tmp_path / "snapshot.json", snapshot)
+    settings = make_settings(db_to_schemas={"db_tests": ["shop", "billing"]})
+
+    with pytest.raises(ValueError, match="Schemas differ from the snapshot ones"):
+        generate_python_models_from_snapshot(
+            settings, tmp_path / "snapshot.json", logger
+        )
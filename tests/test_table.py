@@ -0,0 +1,166 @@
+import pytest
+
+from db2model.generator.python.parser import _parse_code
+from db2model.generator.python.table import (
+    _get_lazy_from_statistics,
+    _get_lookup_helpers_code,
+    _get_python_name_to_table_def_map,
+    _set_table_lazy,
+)
+from db2model.types import LazyStrategy, SqlDialect
+
+
+@pytest.fixture
+def shop_tables_def(shop_raw_code, logger):
+    _, tables_def = _parse_code(
+        shop_raw_code, "db_tests", SqlDialect.POSTGRESQL, logger
+    )
+    return {table_def.table_name: table_def for table_def in tables_def}
+
+
+def _get_lazy(
+    shop_tables_def,
+    table_name: str,
+    attribute_name: str,
+    table_to_row_estimate_map: dict[str, float],
+) -> LazyStrategy:
+    table_def = shop_tables_def[table_name]
+    relationship = next(
+        relationship
+        for relationship in table_def.relationships
+        if relationship.attribute_name == attribute_name
+    )
+    target_table_def = next(
+        target_table_def
+        for target_table_def in shop_tables_def.values()
+        if target_table_def.table_name.replace("_", "")
+        == relationship.target_python_table_name.lower()
+    )
+    return _get_lazy_from_statistics(
+        table_def,
+        relationship,
+        target_table_def,
+        {"shop": table_to_row_estimate_map},
+    )
+
+
+@pytest.mark.parametrize(
+    "table_name, attribute_name, table_to_row_estimate_map, lazy",
+    [
+        # Small dimension tables are joined
+        ("invoices", "countries", {"countries": 250}, LazyStrategy.JOINED),
+        ("orders", "user", {"users": 10_000}, LazyStrategy.JOINED),
+        # Large ones, or of unknown size, are selected in
+        ("orders", "user", {"users": 10_001}, LazyStrategy.SELECTIN),
+        ("orders", "user", dict(), LazyStrategy.SELECTIN),
+        # Tables referring to others are selected in, so as not to chain joins
+        ("order_items", "order", {"orders": 10}, LazyStrategy.SELECTIN),
+        ("shipments", "order_items", {"order_items": 10}, LazyStrategy.SELECTIN),
+        # Self references too
+        ("categories", "parent", {"categories": 10}, LazyStrategy.SELECTIN),
+    ],
+)
+def test_many_to_one(
+    shop_tables_def, table_name, attribute_name, table_to_row_estimate_map, lazy
+):
+    assert (
+        _get_lazy(
+            shop_tables_def, table_name, attribute_name, table_to_row_estimate_map
+        )
+        == lazy
+    )
+
+
+@pytest.mark.parametrize(
+    "table_to_row_estimate_map, lazy",
+    [
+        # Bounded collections are selected in
+        ({"users": 1_000, "orders": 1_000}, LazyStrategy.SELECTIN),
+        ({"users": 1_000, "orders": 100_000}, LazyStrategy.SELECTIN),
+        # Unbounded ones raise unless loaded explicitly
+        ({"users": 1_000, "orders": 100_001}, LazyStrategy.RAISE_ON_SQL),
+        # Collections of unknown size keep the default
+        ({"users": 1_000}, None),
+        ({"users": 0, "orders": 100_001}, None),
+    ],
+)
+def test_collections(shop_tables_def, table_to_row_estimate_map, lazy):
+    assert (
+        _get_lazy(shop_tables_def, "users", "orders", table_to_row_estimate_map) == lazy
+    )
+
+
+def test_self_referencing_collections(shop_tables_def):
+    assert (
+        _get_lazy(shop_tables_def, "categories", "parent_reverse", {"categories": 10})
+        == LazyStrategy.SELECTIN
+    )
+
+
+def test_many_to_many_collections_hold_their_association_rows(shop_tables_def):
+    assert (
+        _get_lazy(
+            shop_tables_def,
+            "tags",
+            "user",
+            {"tags": 10, "users": 1_000_000, "user_tags": 1_000},
+        )
+        == LazyStrategy.SELECTIN
+    )
+    assert (
+        _get_lazy(
+            shop_tables_def,
+            "tags",
+            "user",
+            {"tags": 10, "users": 10, "user_tags": 1_001},
+        )
+        == LazyStrategy.RAISE_ON_SQL
+    )
+
+
+def test_overrides_win_and_the_default_is_left_out(shop_tables_def):
+    users_def = shop_tables_def["users"]
+    _set_table_lazy(
+        users_def,
+        _get_python_name_to_table_def_map(list(shop_tables_def.values())),
+        {"shop": {"users": 1_000, "orders": 1_000}},
+        {
+            "db_tests.shop.users.orders": LazyStrategy.SELECT,
+            "db_tests.shop.users.tag": LazyStrategy.NOLOAD,
+        },
+    )
+
+    relationship_to_lazy_map = {
+        relationship.attribute_name: relationship.lazy
+        for relationship in users_def.relationships
+    }
+    assert relationship_to_lazy_map["orders"] is None
+    assert relationship_to_lazy_map["tag"] == LazyStrategy.NOLOAD
+
+
+def test_eager_self_references_load_a_level(shop_tables_def):
+    categories_def = shop_tables_def["categories"]
+    _set_table_lazy(
+        categories_def,
+        _get_python_name_to_table_def_map(list(shop_tables_def.values())),
+        {"shop": {"categories": 10}},
+        {"db_tests.shop.categories.parent": LazyStrategy.SELECT},
+    )
+
+    assert [
+        (relationship.attribute_name, relationship.lazy, relationship.join_depth)
+        for relationship in categories_def.relationships
+    ] == [("parent", None, None), ("parent_reverse", LazyStrategy.SELECTIN, 1)]
+
+
+def test_lookup_helpers_execute_statements_built_once(shop_tables_def):
+    lines, statement_lines = _get_lookup_helpers_code(shop_tables_def["order_items"])
+
+    assert statement_lines == [
+        "_OrderItems_get_by_order_id_and_line_no = select(OrderItems).where(OrderItems.order_id == bindparam('order_id'), OrderItems.line_no == bindparam('line_no'))",
+        "_OrderItems_list_by_order_id = select(OrderItems).where(OrderItems.order_id == bindparam('order_id'))",
+    ]
+    assert (
+        "        return list(session.scalars(_OrderItems_list_by_order_id, {'order_id': order_id}))"
+        in lines
+    )
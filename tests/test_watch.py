@@ -0,0 +1,69 @@
+import pytest
+
+from db2model.generator.python.watch import (
+    _get_changed_keys,
+    _get_neighbor_keys,
+    watch_python_models,
+)
+
+
+def test_changed_created_and_dropped_tables():
+    previous_fingerprints = {
+        ("app", "users"): "a",
+        ("app", "orders"): "b",
+        ("app", "items"): "c",
+    }
+    fingerprints = {
+        ("app", "users"): "a",
+        ("app", "orders"): "B",
+        ("app", "tags"): "d",
+    }
+
+    assert _get_changed_keys(previous_fingerprints, fingerprints) == {
+        ("app", "orders"),
+        ("app", "items"),
+        ("app", "tags"),
+    }
+
+
+def test_unchanged_fingerprints():
+    fingerprints = {("app", ""): "e", ("app", "users"): "a"}
+
+    assert _get_changed_keys(fingerprints, dict(fingerprints)) == set()
+
+
+def test_schema_objects_change_every_table_of_their_schema():
+    previous_fingerprints = {
+        ("app", ""): "e",
+        ("app", "users"): "a",
+        ("app", "orders"): "b",
+        ("core", ""): "f",
+        ("core", "items"): "c",
+    }
+    fingerprints = {**previous_fingerprints, ("app", ""): "E"}
+
+    assert _get_changed_keys(previous_fingerprints, fingerprints) == {
+        ("app", "users"),
+        ("app", "orders"),
+    }
+
+
+def test_neighbors_are_referring_and_referred_tables():
+    foreign_key_edges = {
+        (("app", "orders"), ("app", "users")),
+        (("app", "items"), ("app", "orders")),
+        (("app", "tags"), ("core", "labels")),
+    }
+
+    assert _get_neighbor_keys({("app", "orders")}, foreign_key_edges) == {
+        ("app", "users"),
+        ("app", "items"),
+    }
+    assert _get_neighbor_keys({("app", "users")}, foreign_key_edges) == {
+        ("app", "orders")
+    }
+
+
+def test_interval_must_be_positive(make_settings, logger):
+    with pytest.raises(ValueError):
+        watch_python_models(make_settings(), logger, interval=0)
@@ -0,0 +1,148 @@
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from db2model.generator.python.writer import OutputWriter
+
+
+def test_removed_files_are_removed_on_publishing(tmp_path: Path):
+    dropped_filepath = tmp_path / "dropped.py"
+    rewritten_filepath = tmp_path / "rewritten.py"
+    dropped_filepath.write_text("x = 1\n")
+    rewritten_filepath.write_text("x = 1\n")
+
+    with OutputWriter() as writer:
+        writer.remove([dropped_filepath, rewritten_filepath, tmp_path / "missing.py"])
+        writer.write({rewritten_filepath: "x = 2\n"})
+        assert dropped_filepath.exists()
+
+    assert not dropped_filepath.exists()
+    assert rewritten_filepath.read_text() == "x = 2\n"
+
+
+def test_removed_files_are_kept_on_failure(tmp_path: Path):
+    dropped_filepath = tmp_path / "dropped.py"
+    dropped_filepath.write_text("x = 1\n")
+
+    with pytest.raises(RuntimeError):
+        with OutputWriter() as writer:
+            writer.remove([dropped_filepath])
+            raise RuntimeError("Failed write")
+
+    assert dropped_filepath.exists()
+
+
+def _write_package(package_path: Path, filepath_to_code_map: dict[str, str]) -> None:
+    with OutputWriter([package_path]) as writer:
+        writer.write(
+            {package_path / name: code for name, code in filepath_to_code_map.items()}
+        )
+
+
+def test_packages_are_staged_and_published(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"__init__.py": "", "users.py": "x = 1\n"})
+    previous_version_path = package_path.resolve()
+
+    with OutputWriter([package_path]) as writer:
+        writer.write({package_path / "users.py": "x = 2\n"})
+        assert (package_path / "users.py").read_text() == "x = 1\n"
+
+    assert package_path.is_symlink()
+    assert package_path.resolve() != previous_version_path
+    assert (package_path / "users.py").read_text() == "x = 2\n"
+    # Kept for readers still going through it, until the next generation
+    assert (previous_version_path / "users.py").read_text() == "x = 1\n"
+
+
+def test_unchanged_files_are_linked(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"users.py": "x = 1\n", "orders.py": "x = 1\n"})
+    users_stat = (package_path / "users.py").stat()
+
+    with OutputWriter([package_path]) as writer:
+        writer.write(
+            {
+                package_path / "users.py": "x = 1\n",
+                package_path / "orders.py": "x = 2\n",
+            }
+        )
+
+    assert (writer.unchanged_count, writer.written_count) == (1, 1)
+    new_users_stat = (package_path / "users.py").stat()
+    assert new_users_stat.st_ino == users_stat.st_ino
+    assert new_users_stat.st_mtime_ns == users_stat.st_mtime_ns
+
+
+def test_files_of_dropped_tables_are_not_published(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"users.py": "x = 1\n", "dropped.py": "x = 1\n"})
+
+    _write_package(package_path, {"users.py": "x = 1\n"})
+
+    assert sorted(path.name for path in package_path.iterdir()) == ["users.py"]
+
+
+def test_packages_are_kept_on_failure(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"users.py": "x = 1\n"})
+    version_path = package_path.resolve()
+
+    with pytest.raises(RuntimeError):
+        with OutputWriter([package_path]) as writer:
+            writer.write({package_path / "users.py": "x = 2\n"})
+            raise RuntimeError("Failed generation")
+
+    assert package_path.resolve() == version_path
+    assert (package_path / "users.py").read_text() == "x = 1\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        ["db", version_path.name]
+    )
+
+
+def test_written_files_follow_the_umask(tmp_path: Path):
+    previous_umask = os.umask(0o027)
+    try:
+        _write_package(tmp_path / "db", {"users.py": "x = 1\n"})
+    finally:
+        os.umask(previous_umask)
+
+    assert stat.S_IMODE((tmp_path / "db" / "users.py").stat().st_mode) == 0o640
+
+
+def test_plain_directory_packages_are_replaced(tmp_path: Path):
+    package_path = tmp_path / "db"
+    package_path.mkdir()
+    (package_path / "users.py").write_text("x = 1\n")
+
+    _write_package(package_path, {"users.py": "x = 2\n"})
+
+    assert package_path.is_symlink()
+    assert (package_path / "users.py").read_text() == "x = 2\n"
+
+
+def test_empty_packages_are_removed(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"users.py": "x = 1\n"})
+
+    _write_package(package_path, dict())
+
+    assert not package_path.exists()
+    assert not package_path.is_symlink()
+
+
+def test_previous_versions_are_removed_on_the_next_generation(tmp_path: Path):
+    package_path = tmp_path / "db"
+    _write_package(package_path, {"users.py": "x = 1\n"})
+    _write_package(package_path, {"users.py": "x = 2\n"})
+    previous_version_name = package_path.resolve().name
+    (tmp_path / ".db.staging").mkdir()
+    (tmp_path / ".other.staging").mkdir()
+
+    _write_package(package_path, {"users.py": "x = 3\n"})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [".other.staging", "db", previous_version_name, package_path.resolve().name]
+    )